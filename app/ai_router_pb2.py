@@ -14,7 +14,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0f\x61i_router.proto\x12\tai_router\"\xbd\x01\n\tAIRequest\x12\x10\n\x08provider\x18\x01 \x01(\t\x12\r\n\x05model\x18\x02 \x01(\t\x12\x0e\n\x06prompt\x18\x03 \x01(\t\x12\x12\n\nmax_tokens\x18\x04 \x01(\x05\x12\x38\n\nparameters\x18\x05 \x03(\x0b\x32$.ai_router.AIRequest.ParametersEntry\x1a\x31\n\x0fParametersEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\">\n\nAIResponse\x12\x0f\n\x07\x63ontent\x18\x01 \x01(\t\x12\x10\n\x08provider\x18\x02 \x01(\t\x12\r\n\x05model\x18\x03 \x01(\t2\x93\x01\n\x08\x41IRouter\x12=\n\x0cRouteRequest\x12\x14.ai_router.AIRequest\x1a\x15.ai_router.AIResponse\"\x00\x12H\n\x15StreamingRouteRequest\x12\x14.ai_router.AIRequest\x1a\x15.ai_router.AIResponse\"\x00\x30\x01\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0f\x61i_router.proto\x12\tai_router\"\x8d\x02\n\tAIRequest\x12\x10\n\x08provider\x18\x01 \x01(\t\x12\r\n\x05model\x18\x02 \x01(\t\x12\x0e\n\x06prompt\x18\x03 \x01(\t\x12\x12\n\nmax_tokens\x18\x04 \x01(\x05\x12\x38\n\nparameters\x18\x05 \x03(\x0b\x32$.ai_router.AIRequest.ParametersEntry\x12\x14\n\x0c\x62ypass_cache\x18\x06 \x01(\x08\x12$\n\x08messages\x18\x07 \x03(\x0b\x32\x12.ai_router.Message\x12\x12\n\nsession_id\x18\x08 \x01(\t\x1a\x31\n\x0fParametersEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"(\n\x07Message\x12\x0c\n\x04role\x18\x01 \x01(\t\x12\x0f\n\x07\x63ontent\x18\x02 \x01(\t\"_\n\nAIResponse\x12\x0f\n\x07\x63ontent\x18\x01 \x01(\t\x12\x10\n\x08provider\x18\x02 \x01(\t\x12\r\n\x05model\x18\x03 \x01(\t\x12\x1f\n\x05usage\x18\x04 \x01(\x0b\x32\x10.ai_router.Usage\"\x80\x01\n\x05Usage\x12\x15\n\rprompt_tokens\x18\x01 \x01(\x05\x12\x19\n\x11\x63ompletion_tokens\x18\x02 \x01(\x05\x12\x14\n\x0ctotal_tokens\x18\x03 \x01(\x05\x12\x11\n\testimated\x18\x04 \x01(\x08\x12\x1c\n\x14\x63\x61\x63hed_prompt_tokens\x18\x05 \x01(\x05\"h\n\x0c\x42\x61tchRequest\x12&\n\x08requests\x18\x01 \x03(\x0b\x32\x14.ai_router.AIRequest\x12\x17\n\x0fmax_concurrency\x18\x02 \x01(\x05\x12\x17\n\x0ftimeout_seconds\x18\x03 \x01(\x01\"l\n\x0f\x42\x61tchItemResult\x12\r\n\x05index\x18\x01 \x01(\x05\x12\'\n\x08response\x18\x02 \x01(\x0b\x32\x15.ai_router.AIResponse\x12\x12\n\nerror_code\x18\x03 \x01(\t\x12\r\n\x05\x65rror\x18\x04 \x01(\t\"<\n\rBatchResponse\x12+\n\x07results\x18\x01 \x03(\x0b\x32\x1a.ai_router.BatchItemResult2\xb4\x02\n\x08\x41IRouter\x12=\n\x0cRouteRequest\x12\x14.ai_router.AIRequest\x1a\x15.ai_router.AIResponse\"\x00\x12H\n\x15StreamingRouteRequest\x12\x14.ai_router.AIRequest\x1a\x15.ai_router.AIResponse\"\x00\x30\x01\x12H\n\x11\x42\x61tchRouteRequest\x12\x17.ai_router.BatchRequest\x1a\x18.ai_router.BatchResponse\"\x00\x12U\n\x1aStreamingBatchRouteRequest\x12\x17.ai_router.BatchRequest\x1a\x1a.ai_router.BatchItemResult\"\x00\x30\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -24,11 +24,21 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_AIREQUEST_PARAMETERSENTRY']._loaded_options = None
   _globals['_AIREQUEST_PARAMETERSENTRY']._serialized_options = b'8\001'
   _globals['_AIREQUEST']._serialized_start=31
-  _globals['_AIREQUEST']._serialized_end=220
-  _globals['_AIREQUEST_PARAMETERSENTRY']._serialized_start=171
-  _globals['_AIREQUEST_PARAMETERSENTRY']._serialized_end=220
-  _globals['_AIRESPONSE']._serialized_start=222
-  _globals['_AIRESPONSE']._serialized_end=284
-  _globals['_AIROUTER']._serialized_start=287
-  _globals['_AIROUTER']._serialized_end=434
+  _globals['_AIREQUEST']._serialized_end=300
+  _globals['_AIREQUEST_PARAMETERSENTRY']._serialized_start=251
+  _globals['_AIREQUEST_PARAMETERSENTRY']._serialized_end=300
+  _globals['_MESSAGE']._serialized_start=302
+  _globals['_MESSAGE']._serialized_end=342
+  _globals['_AIRESPONSE']._serialized_start=344
+  _globals['_AIRESPONSE']._serialized_end=439
+  _globals['_USAGE']._serialized_start=442
+  _globals['_USAGE']._serialized_end=570
+  _globals['_BATCHREQUEST']._serialized_start=572
+  _globals['_BATCHREQUEST']._serialized_end=676
+  _globals['_BATCHITEMRESULT']._serialized_start=678
+  _globals['_BATCHITEMRESULT']._serialized_end=786
+  _globals['_BATCHRESPONSE']._serialized_start=788
+  _globals['_BATCHRESPONSE']._serialized_end=848
+  _globals['_AIROUTER']._serialized_start=851
+  _globals['_AIROUTER']._serialized_end=1159
 # @@protoc_insertion_point(module_scope)
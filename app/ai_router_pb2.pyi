@@ -37,12 +37,22 @@ class AIRequest(google.protobuf.message.Message):
     PROMPT_FIELD_NUMBER: builtins.int
     MAX_TOKENS_FIELD_NUMBER: builtins.int
     PARAMETERS_FIELD_NUMBER: builtins.int
+    BYPASS_CACHE_FIELD_NUMBER: builtins.int
+    MESSAGES_FIELD_NUMBER: builtins.int
+    SESSION_ID_FIELD_NUMBER: builtins.int
     provider: builtins.str
     model: builtins.str
     prompt: builtins.str
     max_tokens: builtins.int
+    bypass_cache: builtins.bool
+    session_id: builtins.str
+    """Server-side conversation to continue; its history is prepended and this turn appended to it."""
     @property
     def parameters(self) -> google.protobuf.internal.containers.ScalarMap[builtins.str, builtins.str]: ...
+    @property
+    def messages(self) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[global___Message]:
+        """Chat turns sent instead of prompt; with session_id, the new turn(s) after the stored history."""
+
     def __init__(
         self,
         *,
@@ -51,11 +61,33 @@ class AIRequest(google.protobuf.message.Message):
         prompt: builtins.str = ...,
         max_tokens: builtins.int = ...,
         parameters: collections.abc.Mapping[builtins.str, builtins.str] | None = ...,
+        bypass_cache: builtins.bool = ...,
+        messages: collections.abc.Iterable[global___Message] | None = ...,
+        session_id: builtins.str = ...,
     ) -> None: ...
-    def ClearField(self, field_name: typing.Literal["max_tokens", b"max_tokens", "model", b"model", "parameters", b"parameters", "prompt", b"prompt", "provider", b"provider"]) -> None: ...
+    def ClearField(self, field_name: typing.Literal["bypass_cache", b"bypass_cache", "max_tokens", b"max_tokens", "messages", b"messages", "model", b"model", "parameters", b"parameters", "prompt", b"prompt", "provider", b"provider", "session_id", b"session_id"]) -> None: ...
 
 global___AIRequest = AIRequest
 
+@typing.final
+class Message(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    ROLE_FIELD_NUMBER: builtins.int
+    CONTENT_FIELD_NUMBER: builtins.int
+    role: builtins.str
+    """"system", "user" or "assistant"."""
+    content: builtins.str
+    def __init__(
+        self,
+        *,
+        role: builtins.str = ...,
+        content: builtins.str = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["content", b"content", "role", b"role"]) -> None: ...
+
+global___Message = Message
+
 @typing.final
 class AIResponse(google.protobuf.message.Message):
     DESCRIPTOR: google.protobuf.descriptor.Descriptor
@@ -63,16 +95,125 @@ class AIResponse(google.protobuf.message.Message):
     CONTENT_FIELD_NUMBER: builtins.int
     PROVIDER_FIELD_NUMBER: builtins.int
     MODEL_FIELD_NUMBER: builtins.int
+    USAGE_FIELD_NUMBER: builtins.int
     content: builtins.str
     provider: builtins.str
+    """In StreamingRouteRequest, provider and model are only set on the first message."""
     model: builtins.str
+    @property
+    def usage(self) -> global___Usage:
+        """Tokens consumed upstream; unset for cached responses. In StreamingRouteRequest,
+        only set on a final message with empty content.
+        """
+
     def __init__(
         self,
         *,
         content: builtins.str = ...,
         provider: builtins.str = ...,
         model: builtins.str = ...,
+        usage: global___Usage | None = ...,
     ) -> None: ...
-    def ClearField(self, field_name: typing.Literal["content", b"content", "model", b"model", "provider", b"provider"]) -> None: ...
+    def HasField(self, field_name: typing.Literal["usage", b"usage"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["content", b"content", "model", b"model", "provider", b"provider", "usage", b"usage"]) -> None: ...
 
 global___AIResponse = AIResponse
+
+@typing.final
+class Usage(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    PROMPT_TOKENS_FIELD_NUMBER: builtins.int
+    COMPLETION_TOKENS_FIELD_NUMBER: builtins.int
+    TOTAL_TOKENS_FIELD_NUMBER: builtins.int
+    ESTIMATED_FIELD_NUMBER: builtins.int
+    CACHED_PROMPT_TOKENS_FIELD_NUMBER: builtins.int
+    prompt_tokens: builtins.int
+    completion_tokens: builtins.int
+    total_tokens: builtins.int
+    estimated: builtins.bool
+    """Counted locally because the provider did not report usage."""
+    cached_prompt_tokens: builtins.int
+    """Part of prompt_tokens served from the provider's prompt cache."""
+    def __init__(
+        self,
+        *,
+        prompt_tokens: builtins.int = ...,
+        completion_tokens: builtins.int = ...,
+        total_tokens: builtins.int = ...,
+        estimated: builtins.bool = ...,
+        cached_prompt_tokens: builtins.int = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["cached_prompt_tokens", b"cached_prompt_tokens", "completion_tokens", b"completion_tokens", "estimated", b"estimated", "prompt_tokens", b"prompt_tokens", "total_tokens", b"total_tokens"]) -> None: ...
+
+global___Usage = Usage
+
+@typing.final
+class BatchRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    REQUESTS_FIELD_NUMBER: builtins.int
+    MAX_CONCURRENCY_FIELD_NUMBER: builtins.int
+    TIMEOUT_SECONDS_FIELD_NUMBER: builtins.int
+    max_concurrency: builtins.int
+    """Upper bound on items in flight; 0 uses the server default."""
+    timeout_seconds: builtins.float
+    """Deadline for the whole batch; 0 uses the server default."""
+    @property
+    def requests(self) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[global___AIRequest]: ...
+    def __init__(
+        self,
+        *,
+        requests: collections.abc.Iterable[global___AIRequest] | None = ...,
+        max_concurrency: builtins.int = ...,
+        timeout_seconds: builtins.float = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["max_concurrency", b"max_concurrency", "requests", b"requests", "timeout_seconds", b"timeout_seconds"]) -> None: ...
+
+global___BatchRequest = BatchRequest
+
+@typing.final
+class BatchItemResult(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    INDEX_FIELD_NUMBER: builtins.int
+    RESPONSE_FIELD_NUMBER: builtins.int
+    ERROR_CODE_FIELD_NUMBER: builtins.int
+    ERROR_FIELD_NUMBER: builtins.int
+    index: builtins.int
+    """Position of the item in BatchRequest.requests."""
+    error_code: builtins.str
+    """gRPC status code name (e.g. "RESOURCE_EXHAUSTED"); empty on success."""
+    error: builtins.str
+    @property
+    def response(self) -> global___AIResponse: ...
+    def __init__(
+        self,
+        *,
+        index: builtins.int = ...,
+        response: global___AIResponse | None = ...,
+        error_code: builtins.str = ...,
+        error: builtins.str = ...,
+    ) -> None: ...
+    def HasField(self, field_name: typing.Literal["response", b"response"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["error", b"error", "error_code", b"error_code", "index", b"index", "response", b"response"]) -> None: ...
+
+global___BatchItemResult = BatchItemResult
+
+@typing.final
+class BatchResponse(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    RESULTS_FIELD_NUMBER: builtins.int
+    @property
+    def results(self) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[global___BatchItemResult]:
+        """In request order."""
+
+    def __init__(
+        self,
+        *,
+        results: collections.abc.Iterable[global___BatchItemResult] | None = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["results", b"results"]) -> None: ...
+
+global___BatchResponse = BatchResponse
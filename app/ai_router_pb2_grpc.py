@@ -2,8 +2,8 @@
 """Client and server classes corresponding to protobuf-defined services."""
 import grpc
 import warnings
-import grpc.experimental
-import ai_router_pb2 as ai__router__pb2
+
+from . import ai_router_pb2 as ai__router__pb2
 
 GRPC_GENERATED_VERSION = '1.65.5'
 GRPC_VERSION = grpc.__version__
@@ -49,6 +49,16 @@ class AIRouterStub(object):
                 request_serializer=ai__router__pb2.AIRequest.SerializeToString,
                 response_deserializer=ai__router__pb2.AIResponse.FromString,
                 _registered_method=True)
+        self.BatchRouteRequest = channel.unary_unary(
+                '/ai_router.AIRouter/BatchRouteRequest',
+                request_serializer=ai__router__pb2.BatchRequest.SerializeToString,
+                response_deserializer=ai__router__pb2.BatchResponse.FromString,
+                _registered_method=True)
+        self.StreamingBatchRouteRequest = channel.unary_stream(
+                '/ai_router.AIRouter/StreamingBatchRouteRequest',
+                request_serializer=ai__router__pb2.BatchRequest.SerializeToString,
+                response_deserializer=ai__router__pb2.BatchItemResult.FromString,
+                _registered_method=True)
 
 
 class AIRouterServicer(object):
@@ -66,6 +76,18 @@ class AIRouterServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def BatchRouteRequest(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def StreamingBatchRouteRequest(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_AIRouterServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -79,6 +101,16 @@ def add_AIRouterServicer_to_server(servicer, server):
                     request_deserializer=ai__router__pb2.AIRequest.FromString,
                     response_serializer=ai__router__pb2.AIResponse.SerializeToString,
             ),
+            'BatchRouteRequest': grpc.unary_unary_rpc_method_handler(
+                    servicer.BatchRouteRequest,
+                    request_deserializer=ai__router__pb2.BatchRequest.FromString,
+                    response_serializer=ai__router__pb2.BatchResponse.SerializeToString,
+            ),
+            'StreamingBatchRouteRequest': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamingBatchRouteRequest,
+                    request_deserializer=ai__router__pb2.BatchRequest.FromString,
+                    response_serializer=ai__router__pb2.BatchItemResult.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'ai_router.AIRouter', rpc_method_handlers)
@@ -143,3 +175,57 @@ class AIRouter(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def BatchRouteRequest(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ai_router.AIRouter/BatchRouteRequest',
+            ai__router__pb2.BatchRequest.SerializeToString,
+            ai__router__pb2.BatchResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def StreamingBatchRouteRequest(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/ai_router.AIRouter/StreamingBatchRouteRequest',
+            ai__router__pb2.BatchRequest.SerializeToString,
+            ai__router__pb2.BatchItemResult.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,40 @@
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+def _normalize_value(value: Any) -> str:
+    text = str(value).strip()
+    try:
+        return repr(float(text))
+    except ValueError:
+        return text
+
+def make_cache_key(provider: str, model: str, prompt: str, max_tokens: int, parameters: Dict[str, Any]) -> str:
+    """Stable hash of a fully resolved request. Numeric parameters are normalized so "0" and "0.0" match."""
+    normalized_parameters = sorted((str(key), _normalize_value(value)) for key, value in parameters.items())
+    payload = json.dumps([provider, model, prompt, max_tokens, normalized_parameters], separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+class BaseResponseCache(ABC):
+    def __init__(self):
+        self.counters = CacheStats()
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: str) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return asdict(self.counters)
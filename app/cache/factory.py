@@ -0,0 +1,38 @@
+from .base import BaseResponseCache
+from .memory_cache import InMemoryResponseCache
+from .redis_cache import RedisResponseCache
+from .sqlite_cache import SqliteResponseCache
+from app.exceptions import ConfigurationException
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    from .semantic_cache import SemanticResponseCache
+
+def create_response_cache(cache_config: Dict[str, Any]) -> Optional[BaseResponseCache]:
+    if not cache_config.get("enabled", False):
+        return None
+    backend = cache_config.get("backend", "memory")
+    ttl_seconds = float(cache_config.get("ttl_seconds", 300))
+    if backend == "memory":
+        return InMemoryResponseCache(
+            max_entries=int(cache_config.get("max_entries", 10000)),
+            max_bytes=int(cache_config.get("max_bytes", 64 * 1024 * 1024)),
+            ttl_seconds=ttl_seconds
+        )
+    if backend == "redis":
+        return RedisResponseCache.from_url(cache_config.get("redis_url", "redis://localhost:6379/0"), ttl_seconds)
+    if backend == "sqlite":
+        return SqliteResponseCache(
+            path=cache_config.get("sqlite_path", "ai-router-cache.db"),
+            ttl_seconds=ttl_seconds,
+            max_entries=int(cache_config.get("max_entries", 10000)),
+            mmap_bytes=int(cache_config.get("sqlite_mmap_bytes", 64 * 1024 * 1024))
+        )
+    raise ConfigurationException(f"Unsupported cache backend: {backend}")
+
+def create_semantic_cache(semantic_config: Dict[str, Any]) -> Optional["SemanticResponseCache"]:
+    if not semantic_config.get("enabled", False):
+        return None
+    # Imported here so numpy is only loaded when the stage is enabled.
+    from .semantic_cache import SemanticResponseCache
+    return SemanticResponseCache.from_config(semantic_config)
@@ -0,0 +1,47 @@
+import logging
+from .base import BaseResponseCache
+from app.exceptions import ConfigurationException
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class RedisResponseCache(BaseResponseCache):
+    """Cache shared between replicas through Redis.
+
+    Entries expire through Redis TTLs; LRU eviction and the memory bound are
+    left to the server's `maxmemory`/`maxmemory-policy allkeys-lru` settings.
+    Any client exposing async `get`/`set(..., ex=)` works, so a local
+    stand-in can be passed in place of a real connection.
+    """
+
+    def __init__(self, client: Any, ttl_seconds: float, prefix: str = "ai-router:cache:"):
+        super().__init__()
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, ttl_seconds: float) -> "RedisResponseCache":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise ConfigurationException("The redis cache backend requires the 'redis' package")
+        return cls(redis.from_url(url), ttl_seconds)
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            value = await self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Redis cache lookup failed: {e}")
+            value = None
+        if value is None:
+            self.counters.misses += 1
+            return None
+        self.counters.hits += 1
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    async def set(self, key: str, value: str) -> None:
+        try:
+            await self.client.set(self.prefix + key, value, ex=max(1, int(self.ttl_seconds)))
+        except Exception as e:
+            logger.warning(f"Redis cache store failed: {e}")
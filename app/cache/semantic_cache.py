@@ -0,0 +1,209 @@
+import logging
+import os
+import random
+import re
+import time
+import unicodedata
+import zlib
+from collections import deque
+from dataclasses import asdict, dataclass
+from app.exceptions import ConfigurationException
+from app.metrics import SEMANTIC_CACHE_AUDITS_TOTAL, SEMANTIC_CACHE_LOOKUPS_TOTAL, SEMANTIC_CACHE_SIMILARITY
+from typing import Any, Deque, Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_WORD = re.compile(r"\w+")
+
+def normalize_prompt(prompt: str) -> str:
+    """Fold case, Unicode compatibility forms and whitespace runs, so templated prompts that differ only in those match exactly."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", prompt).casefold()).strip()
+
+class HashedNgramVectorizer:
+    """Unit-length vectors of hashed character n-grams and word uni/bigrams.
+
+    crc32 is used rather than hash() so vectors are the same in every
+    process and across restarts, which a memory-mapped index relies on.
+    One hash bit picks the sign of each feature so collisions tend to
+    cancel out instead of inflating similarity.
+    """
+
+    def __init__(self, dimensions: int, char_ngram: int = 3, max_chars: int = 4096):
+        self.dimensions = dimensions
+        self.char_ngram = char_ngram
+        self.max_chars = max_chars
+
+    def _features(self, text: str) -> List[bytes]:
+        text = text[:self.max_chars]
+        padded = f" {text} "
+        features = [padded[index:index + self.char_ngram].encode() for index in range(max(1, len(padded) - self.char_ngram + 1))]
+        words = _WORD.findall(text)
+        features.extend(f"w:{word}".encode() for word in words)
+        features.extend(f"b:{first} {second}".encode() for first, second in zip(words, words[1:]))
+        return features
+
+    def vectorize(self, normalized: str) -> "np.ndarray":
+        hashes = np.fromiter((zlib.crc32(feature) for feature in self._features(normalized)), dtype=np.uint32)
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        vector = np.bincount(hashes % self.dimensions, weights=signs, minlength=self.dimensions).astype(np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+@dataclass
+class SemanticHit:
+    index: int
+    similarity: float
+    response: str
+    matched_prompt: str
+    # Audited hits are answered upstream anyway and the two responses compared.
+    audit: bool = False
+
+@dataclass
+class SemanticCacheStats:
+    hits: int = 0
+    misses: int = 0
+    audits: int = 0
+    audit_mismatches: int = 0
+    evictions: int = 0
+
+class SemanticResponseCache:
+    """Near-duplicate prompt cache over a bounded, NumPy-backed similarity index.
+
+    Entries are scoped by a key of provider, model, max_tokens and
+    parameters, so only prompts sent with identical settings can match. The
+    index is a ring of `max_entries` rows; once full, the oldest entry is
+    overwritten. With `index_path` the vector matrix is a memory-mapped file
+    (recreated at startup) so the OS can page it instead of it sitting on the
+    Python heap. A share of hits (`audit_sample_rate`) is sent upstream
+    regardless and the fresh response compared with the cached one; those
+    that differ are kept in `audit_samples` for review of the threshold.
+    """
+
+    def __init__(self, threshold: float = 0.92, dimensions: int = 512, max_entries: int = 10000, ttl_seconds: float = 3600,
+                 char_ngram: int = 3, min_prompt_chars: int = 16, index_path: Optional[str] = None,
+                 audit_sample_rate: float = 0.01, audit_match_threshold: float = 0.8, audit_log_size: int = 100):
+        if np is None:
+            raise ConfigurationException("The semantic cache requires the 'numpy' package")
+        if not 0 < threshold <= 1:
+            raise ConfigurationException(f"semantic_cache.threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.min_prompt_chars = min_prompt_chars
+        self.audit_sample_rate = audit_sample_rate
+        self.audit_match_threshold = audit_match_threshold
+        self.vectorizer = HashedNgramVectorizer(dimensions, char_ngram)
+        self.index_path = index_path
+        if index_path:
+            os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+            self._vectors = np.memmap(index_path, dtype=np.float32, mode="w+", shape=(max_entries, dimensions))
+        else:
+            self._vectors = np.zeros((max_entries, dimensions), dtype=np.float32)
+        self._scopes = np.zeros(max_entries, dtype=np.int64)
+        self._expires_at = np.zeros(max_entries, dtype=np.float64)
+        self._responses: List[Optional[str]] = [None] * max_entries
+        self._prompts: List[Optional[str]] = [None] * max_entries
+        self._size = 0
+        self._next = 0
+        self.counters = SemanticCacheStats()
+        self.audit_samples: Deque[Dict[str, Any]] = deque(maxlen=audit_log_size)
+
+    @classmethod
+    def from_config(cls, semantic_config: Dict[str, Any]) -> "SemanticResponseCache":
+        return cls(
+            threshold=float(semantic_config.get("threshold", 0.92)),
+            dimensions=int(semantic_config.get("dimensions", 512)),
+            max_entries=int(semantic_config.get("max_entries", 10000)),
+            ttl_seconds=float(semantic_config.get("ttl_seconds", 3600)),
+            char_ngram=int(semantic_config.get("char_ngram", 3)),
+            min_prompt_chars=int(semantic_config.get("min_prompt_chars", 16)),
+            index_path=semantic_config.get("index_path") or None,
+            audit_sample_rate=float(semantic_config.get("audit_sample_rate", 0.01)),
+            audit_match_threshold=float(semantic_config.get("audit_match_threshold", 0.8)),
+            audit_log_size=int(semantic_config.get("audit_log_size", 100))
+        )
+
+    @staticmethod
+    def _scope_id(scope: str) -> int:
+        return int(scope[:15], 16)
+
+    def lookup(self, provider: str, scope: str, prompt: str) -> Optional[SemanticHit]:
+        normalized = normalize_prompt(prompt)
+        if len(normalized) < self.min_prompt_chars or self._size == 0:
+            return self._miss(provider)
+        valid = (self._scopes[:self._size] == self._scope_id(scope)) & (self._expires_at[:self._size] > time.monotonic())
+        if not valid.any():
+            return self._miss(provider)
+        # One matrix-vector product over the contiguous rows is cheaper than gathering the matching rows first.
+        similarities = self._vectors[:self._size] @ self.vectorizer.vectorize(normalized)
+        similarities[~valid] = -1.0
+        index = int(np.argmax(similarities))
+        similarity = float(similarities[index])
+        SEMANTIC_CACHE_SIMILARITY.observe((provider,), similarity)
+        if similarity < self.threshold:
+            return self._miss(provider)
+        hit = SemanticHit(index, similarity, self._responses[index], self._prompts[index],
+                          audit=random.random() < self.audit_sample_rate)
+        if hit.audit:
+            self.counters.audits += 1
+            SEMANTIC_CACHE_LOOKUPS_TOTAL.inc((provider, "audit"))
+        else:
+            self.counters.hits += 1
+            SEMANTIC_CACHE_LOOKUPS_TOTAL.inc((provider, "hit"))
+        return hit
+
+    def _miss(self, provider: str) -> None:
+        self.counters.misses += 1
+        SEMANTIC_CACHE_LOOKUPS_TOTAL.inc((provider, "miss"))
+        return None
+
+    def add(self, scope: str, prompt: str, response: str) -> None:
+        normalized = normalize_prompt(prompt)
+        if len(normalized) < self.min_prompt_chars or not response:
+            return
+        index = self._next
+        if self._responses[index] is not None:
+            self.counters.evictions += 1
+        self._vectors[index] = self.vectorizer.vectorize(normalized)
+        self._scopes[index] = self._scope_id(scope)
+        self._expires_at[index] = time.monotonic() + self.ttl_seconds
+        self._responses[index] = response
+        self._prompts[index] = normalized
+        self._next = (index + 1) % self.max_entries
+        self._size = max(self._size, index + 1)
+
+    def record_audit(self, provider: str, hit: SemanticHit, prompt: str, response: str) -> bool:
+        """Compare an audited hit's cached response with the fresh one; returns whether they agree."""
+        agreement = float(self.vectorizer.vectorize(normalize_prompt(hit.response)) @ self.vectorizer.vectorize(normalize_prompt(response)))
+        matched = agreement >= self.audit_match_threshold
+        SEMANTIC_CACHE_AUDITS_TOTAL.inc((provider, "match" if matched else "mismatch"))
+        if not matched:
+            self.counters.audit_mismatches += 1
+            self.audit_samples.append({
+                "prompt": normalize_prompt(prompt),
+                "matched_prompt": hit.matched_prompt,
+                "similarity": round(hit.similarity, 4),
+                "response_agreement": round(agreement, 4),
+                "at": time.time()
+            })
+            logger.warning(f"Semantic cache audit mismatch (similarity {hit.similarity:.3f}, response agreement {agreement:.3f})")
+            # Stop serving the entry, unless its slot has been reused since.
+            if self._prompts[hit.index] == hit.matched_prompt:
+                self._expires_at[hit.index] = 0
+        return matched
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters.hits + self.counters.misses + self.counters.audits
+        return {
+            **asdict(self.counters),
+            "entries": self._size,
+            "hit_rate": round(self.counters.hits / lookups, 4) if lookups else 0.0,
+            "threshold": self.threshold,
+            "recent_audit_mismatches": list(self.audit_samples)[-10:]
+        }
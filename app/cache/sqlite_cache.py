@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .base import BaseResponseCache
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class SqliteResponseCache(BaseResponseCache):
+    """Cache kept in a local SQLite file, so entries survive restarts and are shared by the workers of one host.
+
+    Queries run on one dedicated thread so disk I/O never blocks the event
+    loop. The file is opened in WAL mode and memory-mapped up to
+    `mmap_bytes`, so lookups of hot entries are served from the page cache.
+    Expired entries are skipped on read and deleted, together with the
+    oldest entries beyond `max_entries`, every `prune_every` writes.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int, mmap_bytes: int = 64 * 1024 * 1024, prune_every: int = 256):
+        super().__init__()
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.mmap_bytes = mmap_bytes
+        self.prune_every = prune_every
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-cache")
+        self._connection: Optional[sqlite3.Connection] = None
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA busy_timeout=1000")
+            connection.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+            connection.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID")
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)")
+            self._connection = connection
+        return self._connection
+
+    def _get(self, key: str) -> Optional[str]:
+        # Wall-clock expiry, since entries outlive the process.
+        row = self._connect().execute("SELECT value FROM entries WHERE key = ? AND expires_at > ?", (key, time.time())).fetchone()
+        return row[0] if row is not None else None
+
+    def _set(self, key: str, value: str) -> None:
+        connection = self._connect()
+        connection.execute("INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)", (key, value, time.time() + self.ttl_seconds))
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self._prune(connection)
+
+    def _prune(self, connection: sqlite3.Connection) -> None:
+        self.counters.expirations += connection.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),)).rowcount
+        excess = connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+        if excess > 0:
+            connection.execute("DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY expires_at LIMIT ?)", (excess,))
+            self.counters.evictions += excess
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            value = await asyncio.get_running_loop().run_in_executor(self._executor, self._get, key)
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache lookup failed: {e}")
+            value = None
+        if value is None:
+            self.counters.misses += 1
+            return None
+        self.counters.hits += 1
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._set, key, value)
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite cache store failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "path": self.path}
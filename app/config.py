@@ -1,31 +1,159 @@
+import logging
 import os
+import time
 import yaml
 from dotenv import load_dotenv
+from app.exceptions import ConfigurationException
+from types import MappingProxyType
+from typing import Any, Dict, Optional
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+class _Frozen:
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+class ProviderSnapshot(_Frozen):
+    """One provider's settings with environment overrides and defaults already applied."""
+
+    __slots__ = ("name", "default_model", "default_max_tokens", "base_url")
+
+    def __init__(self, name: str, provider_config: Dict[str, Any]):
+        prefix = name.upper()
+        default_model = os.getenv(f"{prefix}_DEFAULT_MODEL", provider_config.get("default_model"))
+        if default_model is not None and not isinstance(default_model, str):
+            raise ConfigurationException(f"providers.{name}.default_model must be a string")
+        try:
+            default_max_tokens = int(os.getenv(f"{prefix}_DEFAULT_MAX_TOKENS", provider_config.get("default_max_tokens", 1000)))
+        except (TypeError, ValueError):
+            raise ConfigurationException(f"providers.{name}.default_max_tokens must be an integer")
+        if default_max_tokens <= 0:
+            raise ConfigurationException(f"providers.{name}.default_max_tokens must be positive")
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "default_model", default_model or None)
+        object.__setattr__(self, "default_max_tokens", default_max_tokens)
+        object.__setattr__(self, "base_url", os.getenv(f"{prefix}_BASE_URL", provider_config.get("base_url")))
+
+class ConfigSnapshot(_Frozen):
+    """Immutable, validated view of config.yaml that the request path reads.
+
+    Reloads build a new snapshot and swap the reference, so a request that
+    has already read `config.snapshot` keeps a consistent view until it ends.
+    """
+
+    __slots__ = ("providers", "version", "loaded_at")
+
+    def __init__(self, yaml_config: Any, version: int):
+        if not isinstance(yaml_config, dict):
+            raise ConfigurationException("config.yaml must contain a mapping")
+        for section, value in yaml_config.items():
+            if value is not None and not isinstance(value, dict):
+                raise ConfigurationException(f"Section '{section}' must be a mapping")
+        server_config = yaml_config.get("server") or {}
+        for key in ("grpc_port", "http_port"):
+            if not isinstance(server_config.get(key), int):
+                raise ConfigurationException(f"server.{key} must be an integer")
+        providers_config = yaml_config.get("providers") or {}
+        if not providers_config:
+            raise ConfigurationException("At least one provider must be configured")
+        for name, provider_config in providers_config.items():
+            if provider_config is not None and not isinstance(provider_config, dict):
+                raise ConfigurationException(f"providers.{name} must be a mapping")
+        providers = {name: ProviderSnapshot(name, provider_config or {}) for name, provider_config in providers_config.items()}
+        object.__setattr__(self, "providers", MappingProxyType(providers))
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "loaded_at", time.time())
+
 class Config:
-    def __init__(self):
+    """Settings from config.yaml and the environment, read on first access rather than at import."""
+
+    def __getattr__(self, name: str):
+        # Only called for attributes that are not set yet, i.e. before the first load.
+        if name.startswith("__") or "yaml_config" in self.__dict__:
+            raise AttributeError(name)
+        self.load()
+        return getattr(self, name)
+
+    def load(self):
         self.load_yaml_config()
         self.load_env_config()
 
+    @property
+    def path(self) -> str:
+        return os.getenv("CONFIG_PATH", "config.yaml")
+
+    def _read_yaml(self) -> Any:
+        with open(self.path, "r") as config_file:
+            return yaml.safe_load(config_file)
+
     def load_yaml_config(self):
-        config_path = os.getenv("CONFIG_PATH", "config.yaml")
-        with open(config_path, "r") as config_file:
-            self.yaml_config = yaml.safe_load(config_file)
+        yaml_config = self._read_yaml()
+        self.snapshot = ConfigSnapshot(yaml_config, version=1)
+        self.yaml_config = yaml_config
+
+    def reload(self) -> bool:
+        """Re-read config.yaml and swap in a new snapshot; on any error the current one stays in effect.
+
+        Provider defaults (default_model, default_max_tokens) apply to the
+        next request. Other sections are read when components are built and
+        need a restart, which is logged when they change.
+        """
+        try:
+            yaml_config = self._read_yaml()
+            snapshot = ConfigSnapshot(yaml_config, version=self.snapshot.version + 1)
+        except (OSError, yaml.YAMLError, ConfigurationException) as e:
+            logger.error(f"Rejected reload of {self.path}, keeping version {self.snapshot.version}: {e}")
+            return False
+        previous = self.yaml_config
+        added = set(snapshot.providers) - set(self.snapshot.providers)
+        removed = set(self.snapshot.providers) - set(snapshot.providers)
+        if added or removed:
+            logger.warning(f"Providers added or removed in {self.path} take effect on restart: "
+                           f"added {sorted(added)}, removed {sorted(removed)}")
+        restart_sections = sorted(name for name in set(previous) | set(yaml_config)
+                                  if name != "providers" and previous.get(name) != yaml_config.get(name))
+        if restart_sections:
+            logger.warning(f"Changes to {', '.join(restart_sections)} in {self.path} take effect on restart")
+        self.snapshot = snapshot
+        self.yaml_config = yaml_config
+        logger.info(f"Reloaded {self.path} (version {snapshot.version})")
+        return True
 
     def load_env_config(self):
         self.openai_api_key = os.getenv("OPENAI_API_KEY", "")
         self.anthropic_api_key = os.getenv("ANTHROPIC_API_KEY", "")
         self.grpc_port = int(os.getenv("GRPC_PORT", self.yaml_config["server"]["grpc_port"]))
         self.http_port = int(os.getenv("HTTP_PORT", self.yaml_config["server"]["http_port"]))
+        self.workers = int(os.getenv("WORKERS", self.yaml_config["server"].get("workers", 1)))
+        self.worker_shutdown_timeout = float(self.yaml_config["server"].get("worker_shutdown_timeout", 45))
+
+        gateway_config = self.yaml_config.get("gateway", {})
+        self.grpc_target = os.getenv("GRPC_TARGET", gateway_config.get("grpc_target", f"localhost:{self.grpc_port}"))
+        self.gateway_transport = os.getenv("GATEWAY_TRANSPORT", gateway_config.get("transport", "grpc"))
+        self.grpc_pool_size = int(os.getenv("GRPC_POOL_SIZE", gateway_config.get("grpc_pool_size", 4)))
+
+    def get_section(self, name: str) -> dict:
+        return self.yaml_config.get(name) or {}
+
+    def provider(self, name: str) -> ProviderSnapshot:
+        provider = self.snapshot.providers.get(name)
+        return provider if provider is not None else ProviderSnapshot(name, {})
+
+    def get_default_model(self, provider: str) -> Optional[str]:
+        return self.provider(provider).default_model
 
-    def get_default_model(self, provider: str) -> str:
-        return os.getenv(f"{provider.upper()}_DEFAULT_MODEL",
-                         self.yaml_config["providers"][provider]["default_model"])
+    def get_base_url(self, provider: str) -> Optional[str]:
+        """API base URL override, e.g. to point a provider at a local mock; None uses the SDK default."""
+        return self.provider(provider).base_url
 
     def get_default_max_tokens(self, provider: str) -> int:
-        return int(os.getenv(f"{provider.upper()}_DEFAULT_MAX_TOKENS",
-                             self.yaml_config["providers"][provider].get("default_max_tokens", 1000)))
+        return self.provider(provider).default_max_tokens
 
 config = Config()
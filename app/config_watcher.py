@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import os
+import signal
+from app.config import Config
+from app.metrics import CONFIG_RELOADS_TOTAL, REGISTRY, GaugeFamily
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class ConfigWatcher:
+    """Reloads the config when its file changes (polled) or on SIGHUP.
+
+    Polling compares stat() results rather than relying on inotify, so it
+    also catches editors that replace the file and Kubernetes ConfigMap
+    symlink swaps. A reload only replaces `config.snapshot`, so requests in
+    flight finish with the snapshot they started with.
+    """
+
+    def __init__(self, config: Config, poll_interval: float = 2.0):
+        self.config = config
+        self.poll_interval = poll_interval
+        self._signature = self._stat()
+        self._task: Optional[asyncio.Task] = None
+        self._sighup_installed = False
+        REGISTRY.register(GaugeFamily("ai_router_config_version", "Version of the config snapshot in use, incremented per applied reload",
+                                      (), lambda: [((), self.config.snapshot.version)]))
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.config.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def reload(self) -> bool:
+        self._signature = self._stat()
+        applied = self.config.reload()
+        CONFIG_RELOADS_TOTAL.inc(("applied" if applied else "rejected",))
+        return applied
+
+    def check(self) -> bool:
+        """Reload if the file changed since the last check; returns whether a new snapshot was applied."""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        return self.reload()
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            self.check()
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGHUP, self._on_sighup)
+            self._sighup_installed = True
+        except (AttributeError, NotImplementedError, RuntimeError):
+            # No SIGHUP on Windows, and no signal handlers outside the main thread.
+            pass
+        if self.poll_interval > 0:
+            self._task = asyncio.ensure_future(self._poll())
+        triggers = []
+        if self.poll_interval > 0:
+            triggers.append(f"polled every {self.poll_interval}s")
+        if self._sighup_installed:
+            triggers.append("on SIGHUP")
+        logger.info(f"Reloading {self.config.path} {' and '.join(triggers) or 'never'}")
+
+    def _on_sighup(self) -> None:
+        logger.info("Received SIGHUP, reloading config")
+        self.reload()
+
+    async def stop(self) -> None:
+        if self._sighup_installed:
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+            self._sighup_installed = False
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -10,5 +10,29 @@ class ModelNotFoundException(AIRouterException):
 class AIGenerationException(AIRouterException):
     """Raised when there's an error generating AI response"""
 
+class InvalidRequestException(AIRouterException):
+    """Raised when a request is malformed"""
+
+class IdempotencyKeyReusedException(AIRouterException):
+    """Raised when an idempotency key is sent again with a different request"""
+
 class ConfigurationException(AIRouterException):
     """Raised when there's a configuration error"""
+
+class RateLimitedException(AIGenerationException):
+    """Raised when a provider rejects a request with HTTP 429"""
+
+class AdmissionTimeoutException(AIRouterException):
+    """Raised when a request cannot be admitted to a provider before its queue deadline"""
+
+class DeadlineUnattainableException(AIRouterException):
+    """Raised when a request is shed because it cannot finish before its deadline"""
+
+class CircuitOpenException(AIRouterException):
+    """Raised when a provider/model circuit breaker is open and the call is rejected without being sent"""
+
+class BatchTooLargeException(AIRouterException):
+    """Raised when a batch has more items than the configured maximum"""
+
+class TokenBudgetExceededException(AIRouterException):
+    """Raised when a request does not fit in its tenant's token budget"""
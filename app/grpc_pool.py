@@ -0,0 +1,87 @@
+import itertools
+import logging
+import grpc
+from app import ai_router_pb2_grpc
+from app.exceptions import ConfigurationException
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHANNEL_OPTIONS = [
+    ('grpc.max_send_message_length', 50 * 1024 * 1024),
+    ('grpc.max_receive_message_length', 50 * 1024 * 1024),
+    ('grpc.keepalive_time_ms', 10000),
+    ('grpc.keepalive_timeout_ms', 5000),
+    ('grpc.keepalive_permit_without_calls', True),
+    ('grpc.http2.max_pings_without_data', 0),
+    # Without a local subchannel pool, channels with identical arguments share
+    # one TCP connection and the pool would not spread load at all.
+    ('grpc.use_local_subchannel_pool', 1),
+]
+
+_UNHEALTHY_STATES = (
+    grpc.ChannelConnectivity.TRANSIENT_FAILURE,
+    grpc.ChannelConnectivity.SHUTDOWN,
+)
+
+class GrpcChannelPool:
+    """Fixed set of long-lived gRPC channels shared by the HTTP gateway.
+
+    Channels are opened once in `start()` and handed out round-robin,
+    skipping channels that are currently in a failure state.
+    """
+
+    def __init__(self, target: str, size: int, options: Optional[List[Tuple[str, Any]]] = None):
+        if size < 1:
+            raise ConfigurationException(f"gRPC channel pool size must be at least 1, got {size}")
+        self.target = target
+        self.size = size
+        self.options = options if options is not None else DEFAULT_CHANNEL_OPTIONS
+        self._channels: List[grpc.aio.Channel] = []
+        self._stubs: List[ai_router_pb2_grpc.AIRouterStub] = []
+        self._counter = itertools.count()
+
+    async def start(self) -> None:
+        if self._channels:
+            return
+        for _ in range(self.size):
+            channel = grpc.aio.insecure_channel(self.target, options=self.options)
+            # Kick off the connection eagerly so the first request does not pay for the handshake.
+            channel.get_state(try_to_connect=True)
+            self._channels.append(channel)
+            self._stubs.append(ai_router_pb2_grpc.AIRouterStub(channel))
+        logger.info(f"Opened {self.size} gRPC channels to {self.target}")
+
+    async def close(self, grace: Optional[float] = None) -> None:
+        channels, self._channels, self._stubs = self._channels, [], []
+        for channel in channels:
+            await channel.close(grace)
+        if channels:
+            logger.info(f"Closed {len(channels)} gRPC channels to {self.target}")
+
+    def get_stub(self) -> ai_router_pb2_grpc.AIRouterStub:
+        if not self._stubs:
+            raise ConfigurationException("gRPC channel pool has not been started")
+        start = next(self._counter)
+        for offset in range(len(self._stubs)):
+            index = (start + offset) % len(self._stubs)
+            if self._channels[index].get_state() not in _UNHEALTHY_STATES:
+                return self._stubs[index]
+        return self._stubs[start % len(self._stubs)]
+
+    def stats(self) -> Dict[str, Any]:
+        states: Dict[str, int] = {}
+        for channel in self._channels:
+            state = channel.get_state().name
+            states[state] = states.get(state, 0) + 1
+        healthy = any(
+            channel.get_state() not in _UNHEALTHY_STATES for channel in self._channels
+        )
+        return {
+            "target": self.target,
+            "size": self.size,
+            "open_channels": len(self._channels),
+            "ready_connections": states.get(grpc.ChannelConnectivity.READY.name, 0),
+            "states": states,
+            "healthy": healthy,
+        }
@@ -2,85 +2,277 @@
 
 import grpc
 import logging
-from concurrent import futures
 import asyncio
+import signal
 from . import ai_router_pb2, ai_router_pb2_grpc
-from .router.router import AIRouter
+from .router.router import AIRouter, get_router
+from .router.batch import BatchItemResult
+from .router.routing import RouteResult
+from .router.scheduler import BULK, INTERACTIVE, PRIORITY_HEADER, current_priority, parse_priority, set_request_deadline
+from .router.idempotency import IDEMPOTENCY_HEADER
+from .router.tenants import DEFAULT_TENANT, TENANT_HEADER, current_tenant
+from .repositories.base import Message, Usage
 from .exceptions import AIRouterException
+from .metrics import current_transport, record_error
+from .status_codes import grpc_status_for, item_status_for
+from .streaming import StreamSettings, coalesce_chunks
+from .tracing import TRACEPARENT_HEADER, TRACER
 from .config import config
+from .config_watcher import ConfigWatcher
+from .http_clients import get_http_clients
 from grpc_reflection.v1alpha import reflection
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+def build_server_options(grpc_config: Dict[str, Any], reuse_port: bool = False) -> List[Tuple[str, Any]]:
+    http2_config = grpc_config.get("http2", {})
+    options = [
+        ('grpc.max_send_message_length', 50 * 1024 * 1024),
+        ('grpc.max_receive_message_length', 50 * 1024 * 1024),
+        ('grpc.keepalive_time_ms', 10000),
+        ('grpc.keepalive_timeout_ms', 5000),
+        ('grpc.keepalive_permit_without_calls', True),
+        ('grpc.http2.max_pings_without_data', 0),
+        ('grpc.http2.min_time_between_pings_ms', 10000),
+        ('grpc.http2.min_ping_interval_without_data_ms', 5000),
+        ('grpc.http2.bdp_probe', int(http2_config.get("bdp_probe", True))),
+        # Only --workers processes share the gRPC port. gRPC turns SO_REUSEPORT on by default on Linux, which would let a
+        # stray second instance bind the port without an error and take a share of the calls.
+        ('grpc.so_reuseport', int(reuse_port)),
+    ]
+    if "stream_window_bytes" in http2_config:
+        options.append(('grpc.http2.lookahead_bytes', int(http2_config["stream_window_bytes"])))
+    if "max_frame_size" in http2_config:
+        options.append(('grpc.http2.max_frame_size', int(http2_config["max_frame_size"])))
+    if "write_buffer_size" in http2_config:
+        options.append(('grpc.http2.write_buffer_size', int(http2_config["write_buffer_size"])))
+    return options
+
+def _positive(value: float) -> Optional[float]:
+    """A proto3 numeric field as an optional setting: unset (0) and negative values mean the default."""
+    return value if value > 0 else None
+
+def _rpc_timeout(context, limit: Optional[float]) -> Optional[float]:
+    """The tighter of the client's deadline and the configured per-RPC limit."""
+    remaining = context.time_remaining()
+    limits = [value for value in (remaining, limit) if value]
+    return min(limits) if limits else None
+
+async def _with_deadline(stream: AsyncGenerator[str, None], timeout: Optional[float]) -> AsyncGenerator[str, None]:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout else None
+    try:
+        while True:
+            remaining = deadline - loop.time() if deadline is not None else None
+            try:
+                chunk = await asyncio.wait_for(stream.__anext__(), remaining)
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        await stream.aclose()
+
+def _route_arguments(request) -> Dict[str, Any]:
+    return {
+        "provider": request.provider,
+        "prompt": request.prompt,
+        "max_tokens": request.max_tokens,
+        "model": request.model or None,
+        "parameters": dict(request.parameters),
+        "bypass_cache": request.bypass_cache,
+        "messages": [Message(message.role, message.content) for message in request.messages] or None,
+        "session_id": request.session_id or None
+    }
+
+def _set_request_context(context, default_priority: str, timeout: Optional[float]) -> Dict[str, str]:
+    """Tenant and priority from the call metadata, and the deadline the router schedules against. Returns the metadata."""
+    metadata = dict(context.invocation_metadata() or ())
+    current_tenant.set(metadata.get(TENANT_HEADER) or DEFAULT_TENANT)
+    current_priority.set(parse_priority(metadata.get(PRIORITY_HEADER), default_priority))
+    set_request_deadline(timeout)
+    return metadata
+
+def _usage_message(usage: Optional[Usage]) -> Optional[ai_router_pb2.Usage]:
+    if usage is None:
+        return None
+    return ai_router_pb2.Usage(
+        prompt_tokens=usage.prompt_tokens,
+        completion_tokens=usage.completion_tokens,
+        total_tokens=usage.total_tokens,
+        estimated=usage.estimated,
+        cached_prompt_tokens=usage.cached_prompt_tokens
+    )
+
+def _batch_item_message(item: BatchItemResult) -> ai_router_pb2.BatchItemResult:
+    if item.error is None:
+        return ai_router_pb2.BatchItemResult(
+            index=item.index,
+            response=ai_router_pb2.AIResponse(
+                content=item.result.content,
+                provider=item.result.provider,
+                model=item.result.model,
+                usage=_usage_message(item.result.usage)
+            )
+        )
+    code = item_status_for(item.error)
+    if code == grpc.StatusCode.INTERNAL:
+        logger.error(f"Unexpected error in batch item {item.index}: {item.error}")
+    return ai_router_pb2.BatchItemResult(
+        index=item.index,
+        error_code=code.name,
+        error="Internal server error" if code == grpc.StatusCode.INTERNAL else str(item.error)
+    )
+
 class AIRouterServicer(ai_router_pb2_grpc.AIRouterServicer):
-    def __init__(self):
-        self.router = AIRouter()
+    def __init__(self, router: Optional[AIRouter] = None):
+        self.router = router if router is not None else get_router()
+        grpc_config = config.get_section("grpc")
+        self.rpc_timeout = grpc_config.get("rpc_timeout_seconds")
+        self.stream_timeout = grpc_config.get("stream_timeout_seconds")
+        self.stream_settings = StreamSettings.from_config()
 
     async def RouteRequest(self, request, context):
-        try:
-            model = request.model if request.model else config.get_default_model(request.provider)
-            response = await self.router.route_request(
-                provider=request.provider,
-                prompt=request.prompt,
-                max_tokens=request.max_tokens,
-                model=model,
-                parameters=dict(request.parameters)
-            )
-            return ai_router_pb2.AIResponse(
-                content=response,
-                provider=request.provider,
-                model=model
-            )
-        except AIRouterException as e:
-            logger.error(f"AIRouterException in RouteRequest: {e}")
-            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
-            context.set_details(str(e))
-            return ai_router_pb2.AIResponse()
-        except Exception as e:
-            logger.error(f"Unexpected error in RouteRequest: {e}")
-            context.set_code(grpc.StatusCode.INTERNAL)
-            context.set_details("Internal server error")
-            return ai_router_pb2.AIResponse()
+        current_transport.set("grpc")
+        timeout = _rpc_timeout(context, self.rpc_timeout)
+        metadata = _set_request_context(context, INTERACTIVE, timeout)
+        with TRACER.span("grpc.server RouteRequest", metadata.get(TRACEPARENT_HEADER)) as span:
+            try:
+                result = await asyncio.wait_for(self.router.route_request(**_route_arguments(request), idempotency_key=metadata.get(IDEMPOTENCY_HEADER)),
+                                                timeout)
+                return ai_router_pb2.AIResponse(
+                    content=result.content,
+                    provider=result.provider,
+                    model=result.model,
+                    usage=_usage_message(result.usage)
+                )
+            except AIRouterException as e:
+                logger.error(f"AIRouterException in RouteRequest: {e}")
+                record_error("grpc", e)
+                span.record_error(e)
+                context.set_code(grpc_status_for(e))
+                context.set_details(str(e))
+                return ai_router_pb2.AIResponse()
+            except asyncio.TimeoutError as e:
+                logger.error("Deadline exceeded in RouteRequest")
+                record_error("grpc", e)
+                span.record_error(e)
+                context.set_code(grpc.StatusCode.DEADLINE_EXCEEDED)
+                context.set_details("Deadline exceeded")
+                return ai_router_pb2.AIResponse()
+            except Exception as e:
+                logger.error(f"Unexpected error in RouteRequest: {e}")
+                record_error("grpc", e)
+                span.record_error(e)
+                context.set_code(grpc.StatusCode.INTERNAL)
+                context.set_details("Internal server error")
+                return ai_router_pb2.AIResponse()
 
     async def StreamingRouteRequest(self, request, context):
-        try:
-            model = request.model if request.model else config.get_default_model(request.provider)
-            async for chunk in self.router.stream_request(
-                provider=request.provider,
-                prompt=request.prompt,
-                max_tokens=request.max_tokens,
-                model=model,
-                parameters=dict(request.parameters)
-            ):
-                yield ai_router_pb2.AIResponse(
-                    content=chunk,
-                    provider=request.provider,
-                    model=model
-                )
-        except AIRouterException as e:
-            logger.error(f"AIRouterException in StreamingRouteRequest: {e}")
-            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
-            context.set_details(str(e))
-        except Exception as e:
-            logger.error(f"Unexpected error in StreamingRouteRequest: {e}")
-            context.set_code(grpc.StatusCode.INTERNAL)
-            context.set_details("Internal server error")
-
-async def serve():
+        current_transport.set("grpc")
+        timeout = _rpc_timeout(context, self.stream_timeout)
+        metadata = _set_request_context(context, INTERACTIVE, timeout)
+        with TRACER.span("grpc.server StreamingRouteRequest", metadata.get(TRACEPARENT_HEADER)) as span:
+            try:
+                route = RouteResult()
+                stream = coalesce_chunks(self.router.stream_request(**_route_arguments(request), result=route), self.stream_settings)
+                first = True
+                async for chunk in _with_deadline(stream, timeout):
+                    if first:
+                        first = False
+                        yield ai_router_pb2.AIResponse(content=chunk, provider=route.provider, model=route.model)
+                    else:
+                        # provider and model are only sent on the first message.
+                        yield ai_router_pb2.AIResponse(content=chunk)
+                if route.usage is not None:
+                    yield ai_router_pb2.AIResponse(usage=_usage_message(route.usage))
+            except AIRouterException as e:
+                logger.error(f"AIRouterException in StreamingRouteRequest: {e}")
+                record_error("grpc", e)
+                span.record_error(e)
+                context.set_code(grpc_status_for(e))
+                context.set_details(str(e))
+            except asyncio.TimeoutError as e:
+                logger.error("Deadline exceeded in StreamingRouteRequest")
+                record_error("grpc", e)
+                span.record_error(e)
+                context.set_code(grpc.StatusCode.DEADLINE_EXCEEDED)
+                context.set_details("Deadline exceeded")
+            except Exception as e:
+                logger.error(f"Unexpected error in StreamingRouteRequest: {e}")
+                record_error("grpc", e)
+                span.record_error(e)
+                context.set_code(grpc.StatusCode.INTERNAL)
+                context.set_details("Internal server error")
+
+    async def BatchRouteRequest(self, request, context):
+        current_transport.set("grpc")
+        timeout = _rpc_timeout(context, _positive(request.timeout_seconds))
+        metadata = _set_request_context(context, BULK, timeout)
+        with TRACER.span("grpc.server BatchRouteRequest", metadata.get(TRACEPARENT_HEADER)) as span:
+            results: List[Optional[ai_router_pb2.BatchItemResult]] = [None] * len(request.requests)
+            try:
+                async for item in self.router.route_batch(
+                    [_route_arguments(item) for item in request.requests],
+                    max_concurrency=_positive(request.max_concurrency),
+                    timeout=timeout
+                ):
+                    results[item.index] = _batch_item_message(item)
+                return ai_router_pb2.BatchResponse(results=results)
+            except AIRouterException as e:
+                logger.error(f"AIRouterException in BatchRouteRequest: {e}")
+                record_error("grpc", e)
+                span.record_error(e)
+                context.set_code(grpc_status_for(e))
+                context.set_details(str(e))
+                return ai_router_pb2.BatchResponse()
+            except Exception as e:
+                logger.error(f"Unexpected error in BatchRouteRequest: {e}")
+                record_error("grpc", e)
+                span.record_error(e)
+                context.set_code(grpc.StatusCode.INTERNAL)
+                context.set_details("Internal server error")
+                return ai_router_pb2.BatchResponse()
+
+    async def StreamingBatchRouteRequest(self, request, context):
+        current_transport.set("grpc")
+        timeout = _rpc_timeout(context, _positive(request.timeout_seconds))
+        metadata = _set_request_context(context, BULK, timeout)
+        with TRACER.span("grpc.server StreamingBatchRouteRequest", metadata.get(TRACEPARENT_HEADER)) as span:
+            try:
+                async for item in self.router.route_batch(
+                    [_route_arguments(item) for item in request.requests],
+                    max_concurrency=_positive(request.max_concurrency),
+                    timeout=timeout
+                ):
+                    yield _batch_item_message(item)
+            except AIRouterException as e:
+                logger.error(f"AIRouterException in StreamingBatchRouteRequest: {e}")
+                record_error("grpc", e)
+                span.record_error(e)
+                context.set_code(grpc_status_for(e))
+                context.set_details(str(e))
+            except Exception as e:
+                logger.error(f"Unexpected error in StreamingBatchRouteRequest: {e}")
+                record_error("grpc", e)
+                span.record_error(e)
+                context.set_code(grpc.StatusCode.INTERNAL)
+                context.set_details("Internal server error")
+
+async def serve(close_http_clients: bool = True, reuse_port: bool = False):
+    """Run the gRPC server until SIGTERM/SIGINT, then drain it.
+
+    Pass `close_http_clients=False` when an HTTP gateway in the same process
+    still uses the shared provider connection pools; it then closes them.
+    `reuse_port` lets the worker processes of `main.py --workers` bind the same port.
+    """
+    grpc_config = config.get_section("grpc")
     server = grpc.aio.server(
-        futures.ThreadPoolExecutor(max_workers=10),
-        options=[
-            ('grpc.max_send_message_length', 50 * 1024 * 1024),
-            ('grpc.max_receive_message_length', 50 * 1024 * 1024),
-            ('grpc.keepalive_time_ms', 10000),
-            ('grpc.keepalive_timeout_ms', 5000),
-            ('grpc.keepalive_permit_without_calls', True),
-            ('grpc.http2.max_pings_without_data', 0),
-            ('grpc.http2.min_time_between_pings_ms', 10000),
-            ('grpc.http2.min_ping_interval_without_data_ms', 5000),
-        ]
+        options=build_server_options(grpc_config, reuse_port),
+        maximum_concurrent_rpcs=grpc_config.get("maximum_concurrent_rpcs")
     )
-    ai_router_pb2_grpc.add_AIRouterServicer_to_server(AIRouterServicer(), server)
+    servicer = AIRouterServicer()
+    ai_router_pb2_grpc.add_AIRouterServicer_to_server(servicer, server)
 
     SERVICE_NAMES = (
         ai_router_pb2.DESCRIPTOR.services_by_name['AIRouter'].full_name,
@@ -88,19 +280,50 @@ async def serve():
     )
     reflection.enable_server_reflection(SERVICE_NAMES, server)
 
-    listen_addr = '[::]:50051'
-    server.add_insecure_port(listen_addr)
-    logger.info(f"Starting server on {listen_addr}")
+    listen_addresses = grpc_config.get("listen_addresses") or [f"[::]:{config.grpc_port}"]
+    for listen_addr in listen_addresses:
+        server.add_insecure_port(listen_addr)
+        logger.info(f"Starting server on {listen_addr}")
+    servicer.router.providers.preload()
+    await get_http_clients().warm(servicer.router.providers.specs)
     await server.start()
 
+    reload_config = config.get_section("config_reload")
+    watcher = None
+    if reload_config.get("enabled", True):
+        watcher = ConfigWatcher(config, float(reload_config.get("poll_interval_seconds", 2)))
+        watcher.start()
+
+    loop = asyncio.get_running_loop()
+    stop_requested = asyncio.Event()
+    handled_signals = []
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop_requested.set)
+            handled_signals.append(sig)
+        except (NotImplementedError, RuntimeError):
+            # Not available on Windows or outside the main thread.
+            pass
+
+    grace = float(grpc_config.get("shutdown_grace_seconds", 30))
+    termination = asyncio.ensure_future(server.wait_for_termination())
+    stop = asyncio.ensure_future(stop_requested.wait())
     try:
-        await server.wait_for_termination()
-    except KeyboardInterrupt:
-        logger.info("Shutting down server...")
-        await server.stop(5)
+        await asyncio.wait({termination, stop}, return_when=asyncio.FIRST_COMPLETED)
     except Exception as e:
         logger.error(f"Unexpected error during server operation: {e}")
-        await server.stop(0)
+        grace = 0
+    finally:
+        logger.info(f"Shutting down server, letting in-flight calls finish for up to {grace}s...")
+        if watcher is not None:
+            await watcher.stop()
+        await server.stop(grace)
+        if close_http_clients:
+            await get_http_clients().close()
+        termination.cancel()
+        stop.cancel()
+        for sig in handled_signals:
+            loop.remove_signal_handler(sig)
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from urllib.parse import urlsplit
+from app.config import config
+from app.exceptions import ConfigurationException
+from app.metrics import REGISTRY, GaugeFamily
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Tuple
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URLS = {
+    "openai": "https://api.openai.com/v1",
+    "anthropic": "https://api.anthropic.com",
+}
+
+# Pool stats read private httpx/httpcore attributes; these are the releases known to lay them out as _pool_stats expects.
+POOL_STATS_VERSIONS = {"httpx": ("0.27.", "0.28."), "httpcore": ("1.",)}
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+class ProviderHttpClients:
+    """One shared, explicitly configured httpx.AsyncClient per upstream origin.
+
+    Repositories hand these to their SDK clients, so every provider talking
+    to the same host shares one connection pool whose limits, keep-alive and
+    timeouts come from the `http_client` section of config.yaml (per-origin
+    overrides under `hosts`) instead of the SDK defaults.
+    """
+
+    def __init__(self, http_config: Dict[str, Any]):
+        self.http_config = http_config
+        self._clients: Dict[str, "httpx.AsyncClient"] = {}
+        self._providers: Dict[str, str] = {}
+        self._warmed = False
+        self._pool_stats_supported: Optional[bool] = None
+
+    def _settings(self, origin: str) -> Dict[str, Any]:
+        overrides = (self.http_config.get("hosts") or {}).get(urlsplit(origin).netloc, {})
+        return {**self.http_config, **overrides}
+
+    def _create_client(self, origin: str) -> "httpx.AsyncClient":
+        # httpx is imported with the first provider client rather than at startup.
+        import httpx
+
+        settings = self._settings(origin)
+        timeouts = settings.get("timeouts", {})
+        http2 = bool(settings.get("http2", False))
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning(f"http2 is enabled for {origin} but the h2 package is not installed, using HTTP/1.1")
+                http2 = False
+        return httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=int(settings.get("max_connections", 200)),
+                max_keepalive_connections=int(settings.get("max_keepalive_connections", 100)),
+                keepalive_expiry=float(settings.get("keepalive_expiry_seconds", 30))
+            ),
+            timeout=httpx.Timeout(
+                connect=float(timeouts.get("connect", 5)),
+                read=float(timeouts.get("read", 600)),
+                write=float(timeouts.get("write", 30)),
+                pool=float(timeouts.get("pool", 30))
+            ),
+            follow_redirects=True
+        )
+
+    def client_for(self, provider: str, default_base_url: Optional[str] = None) -> "httpx.AsyncClient":
+        base_url = config.get_base_url(provider) or default_base_url or DEFAULT_BASE_URLS.get(provider)
+        if base_url is None:
+            raise ConfigurationException(f"No base_url configured for provider '{provider}'")
+        origin = _origin(base_url)
+        self._providers[provider] = origin
+        client = self._clients.get(origin)
+        if client is None:
+            client = self._clients[origin] = self._create_client(origin)
+        return client
+
+    async def warm(self, providers: Iterable[str]) -> None:
+        """Open `warm_connections` connections to the origin of each of `providers` so the first requests skip the TCP/TLS handshake.
+
+        Only the shared pools are created; the providers' SDK clients are still built on first use.
+        """
+        if self._warmed:
+            return
+        self._warmed = True
+        count = int(self.http_config.get("warm_connections", 2))
+        if count <= 0:
+            return
+        for provider in providers:
+            try:
+                self.client_for(provider)
+            except ConfigurationException:
+                # No base_url to warm, e.g. a provider that does not use the shared clients.
+                continue
+        if not self._clients:
+            return
+
+        import httpx
+
+        async def touch(origin: str, client: "httpx.AsyncClient") -> None:
+            try:
+                await client.head(origin, timeout=float(self.http_config.get("warm_timeout_seconds", 5)))
+            except httpx.HTTPError as e:
+                logger.warning(f"Could not warm a connection to {origin}: {e}")
+
+        await asyncio.gather(*(touch(origin, client) for origin, client in self._clients.items() for _ in range(count)))
+        logger.info(f"Warmed HTTP connection pools for {', '.join(self._clients)}")
+
+    async def close(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    def _pool_stats_available(self) -> bool:
+        if self._pool_stats_supported is None:
+            import httpcore
+            import httpx
+
+            self._pool_stats_supported = (httpx.__version__.startswith(POOL_STATS_VERSIONS["httpx"])
+                                          and httpcore.__version__.startswith(POOL_STATS_VERSIONS["httpcore"]))
+            if not self._pool_stats_supported:
+                logger.warning(f"Connection pool stats are not available with httpx {httpx.__version__} / httpcore {httpcore.__version__}")
+        return self._pool_stats_supported
+
+    @staticmethod
+    def _pool_stats(client: "httpx.AsyncClient") -> Dict[str, int]:
+        # httpcore keeps the queue of requests waiting for a connection private, so read it defensively.
+        pool = getattr(client._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        requests = list(getattr(pool, "_requests", []))
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "connections": len(connections),
+            "idle": idle,
+            "active": len(connections) - idle,
+            "queued_requests": sum(1 for request in requests if request.is_queued()),
+            "max_connections": getattr(pool, "_max_connections", 0),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        pools_available = bool(self._clients) and self._pool_stats_available()
+        return {
+            "providers": dict(self._providers),
+            "pools": {origin: self._pool_stats(client) for origin, client in self._clients.items()} if pools_available else {}
+        }
+
+    def _gauge(self, key: str) -> Iterable[Tuple[Tuple[str, ...], float]]:
+        if not self._clients or not self._pool_stats_available():
+            return []
+        return [((origin,), self._pool_stats(client)[key]) for origin, client in list(self._clients.items())]
+
+_shared_clients: Optional[ProviderHttpClients] = None
+
+def get_http_clients() -> ProviderHttpClients:
+    """Return the process-wide HTTP clients shared by all repositories."""
+    global _shared_clients
+    if _shared_clients is None:
+        _shared_clients = ProviderHttpClients(config.get_section("http_client"))
+        for key, documentation in (("active", "Upstream HTTP connections serving a request"),
+                                   ("idle", "Idle keep-alive upstream HTTP connections"),
+                                   ("queued_requests", "Requests waiting for an upstream HTTP connection")):
+            REGISTRY.register(GaugeFamily(f"ai_router_http_pool_{key}", documentation, ("origin",),
+                                          lambda key=key: _shared_clients._gauge(key)))
+    return _shared_clients
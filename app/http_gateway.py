@@ -1,72 +1,170 @@
 import grpc
+import json
 import logging
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from typing import Dict, Optional
-from app import ai_router_pb2, ai_router_pb2_grpc
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import PlainTextResponse
+from pydantic import ValidationError
+from app.config import config
+from app.exceptions import AIRouterException
+from app.metrics import GATEWAY_PARSE_SECONDS, GATEWAY_STREAM_RESUMES_TOTAL, REGISTRY, Timer, record_error
+from app.router.idempotency import IDEMPOTENCY_HEADER, current_idempotency_key
+from app.router.routing import RouteResult
+from app.router.scheduler import (BULK, INTERACTIVE, PRIORITY_HEADER, TIMEOUT_HEADER, current_priority, parse_priority, parse_timeout,
+                                  set_request_deadline)
+from app.router.tenants import DEFAULT_TENANT, TENANT_HEADER, current_tenant
+from app.schemas import AIRequest, BatchRequest
+from app.sse import LAST_EVENT_ID_HEADER, EventStreamResponse, ReplayStore, encode_events
+from app.status_codes import http_status_for
+from app.tracing import TRACEPARENT_HEADER, TRACER
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.transports import create_transport, usage_dict
 from scalar_fastapi import get_scalar_api_reference
 from fastapi.responses import FileResponse, JSONResponse
 import yaml
 from pathlib import Path
+from typing import Tuple
 import os
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI(openapi_url=None)
+transport = create_transport(config.gateway_transport)
 
-class AIRequest(BaseModel):
-    provider: str
-    prompt: str
-    model: Optional[str] = None
-    max_tokens: Optional[int] = None
-    parameters: Dict[str, str] = {}
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await transport.start()
+    try:
+        yield
+    finally:
+        await transport.close()
 
-async def get_grpc_client():
-    channel = grpc.aio.insecure_channel('localhost:50051')
-    return ai_router_pb2_grpc.AIRouterStub(channel)
+class TracingMiddleware:
+    """Runs each API request in a span continuing the caller's traceparent header; streams are traced until their last frame."""
 
-def create_grpc_request(request: AIRequest) -> ai_router_pb2.AIRequest:
+    UNTRACED_PATHS = ("/health", "/metrics")
 
-    grpc_request = ai_router_pb2.AIRequest(
-        provider=request.provider,
-        prompt=request.prompt,
-        parameters=request.parameters
-    )
-    if request.max_tokens is not None:
-        grpc_request.max_tokens = request.max_tokens
-    if request.model is not None:
-        grpc_request.model = request.model
-    return grpc_request
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not TRACER.enabled or scope["path"] in self.UNTRACED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        traceparent = next((value.decode("latin-1") for name, value in scope["headers"] if name == TRACEPARENT_HEADER.encode()), None)
+        with TRACER.span(f"gateway {scope['method']} {scope['path']}", traceparent, transport=transport.name) as span:
+
+            async def send_with_status(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                await send(message)
+
+            await self.app(scope, receive, send_with_status)
+
+app = FastAPI(openapi_url=None, lifespan=lifespan)
+app.add_middleware(TracingMiddleware)
+
+BATCH_MAX_ITEMS = int(config.get_section("batch").get("max_items", 1000))
+SSE_CONFIG = config.get_section("sse")
+HEARTBEAT_SECONDS = float(SSE_CONFIG.get("heartbeat_seconds", 15))
+replays = ReplayStore(SSE_CONFIG)
+
+async def parse_request(raw: Request, endpoint: str, schema=AIRequest):
+    """Parse the body ourselves rather than through a FastAPI body parameter so the parse can be timed."""
+    current_tenant.set(raw.headers.get(TENANT_HEADER) or DEFAULT_TENANT)
+    current_priority.set(parse_priority(raw.headers.get(PRIORITY_HEADER), BULK if schema is BatchRequest else INTERACTIVE))
+    set_request_deadline(parse_timeout(raw.headers.get(TIMEOUT_HEADER)))
+    current_idempotency_key.set(raw.headers.get(IDEMPOTENCY_HEADER) or None)
+    body = await raw.body()
+    with Timer(GATEWAY_PARSE_SECONDS, (endpoint, transport.name)), TRACER.span("gateway.parse"):
+        try:
+            return schema.model_validate_json(body)
+        except ValidationError as e:
+            record_error("gateway", e)
+            raise RequestValidationError(e.errors())
 
 @app.post("/generate")
-async def generate(request: AIRequest):
-    client = await get_grpc_client()
+async def generate(raw: Request):
+    request = await parse_request(raw, "generate")
     try:
-        grpc_request = create_grpc_request(request)
-        response = await client.RouteRequest(grpc_request)
-        return {
-            "content": response.content,
-            "provider": response.provider,
-            "model": response.model
-        }
-    except grpc.RpcError as e:
-        logger.error(f"gRPC error in generate: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        return await transport.generate(request)
+    except (grpc.RpcError, AIRouterException) as e:
+        logger.error(f"{transport.name} transport error in generate: {e}")
+        record_error("gateway", e)
+        raise HTTPException(status_code=http_status_for(e), detail=str(e))
+
+def error_event(e: Exception) -> Tuple[bytes, str]:
+    return b"error", json.dumps({"status_code": http_status_for(e), "detail": str(e)})
 
 @app.post("/stream")
-async def stream(request: AIRequest):
-    client = await get_grpc_client()
-    async def response_stream():
+async def stream(raw: Request):
+    last_event_id = raw.headers.get(LAST_EVENT_ID_HEADER)
+    if last_event_id and replays.enabled:
+        found = replays.find(raw.headers.get(TENANT_HEADER) or DEFAULT_TENANT, last_event_id)
+        GATEWAY_STREAM_RESUMES_TOTAL.inc(("resumed" if found is not None else "expired",))
+        if found is None:
+            raise HTTPException(status_code=404, detail=f"Stream of event {last_event_id} can no longer be resumed")
+        log, sequence = found
+        return EventStreamResponse(log.follow(sequence), HEARTBEAT_SECONDS)
+
+    request = await parse_request(raw, "stream")
+
+    async def events():
+        route = RouteResult()
         try:
-            grpc_request = create_grpc_request(request)
-            async for response in client.StreamingRouteRequest(grpc_request):
-                yield f"data: {response.content}\n\n"
-        except grpc.RpcError as e:
-            logger.error(f"gRPC error in stream: {e}")
-            yield f"error: {str(e)}\n\n"
-
-    return StreamingResponse(response_stream(), media_type="text/event-stream")
+            async for content in transport.stream(request, route):
+                yield None, content
+            if route.usage is not None:
+                yield b"usage", json.dumps(usage_dict(route.usage))
+        except (grpc.RpcError, AIRouterException) as e:
+            logger.error(f"{transport.name} transport error in stream: {e}")
+            record_error("gateway", e)
+            yield error_event(e)
+
+    if replays.enabled:
+        return EventStreamResponse(replays.start(current_tenant.get(), events()).follow(), HEARTBEAT_SECONDS)
+    return EventStreamResponse(encode_events(events()), HEARTBEAT_SECONDS)
+
+async def parse_batch_request(raw: Request, endpoint: str) -> BatchRequest:
+    request = await parse_request(raw, endpoint, BatchRequest)
+    if len(request.requests) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch of {len(request.requests)} items exceeds the limit of {BATCH_MAX_ITEMS}")
+    return request
+
+@app.post("/generate_batch")
+async def generate_batch(raw: Request):
+    request = await parse_batch_request(raw, "generate_batch")
+    try:
+        return {"results": await transport.generate_batch(request)}
+    except (grpc.RpcError, AIRouterException) as e:
+        logger.error(f"{transport.name} transport error in generate_batch: {e}")
+        record_error("gateway", e)
+        raise HTTPException(status_code=http_status_for(e), detail=str(e))
+
+@app.post("/stream_batch")
+async def stream_batch(raw: Request):
+    request = await parse_batch_request(raw, "stream_batch")
+
+    async def events():
+        try:
+            async for item in transport.stream_batch(request):
+                yield None, json.dumps(item)
+        except (grpc.RpcError, AIRouterException) as e:
+            logger.error(f"{transport.name} transport error in stream_batch: {e}")
+            record_error("gateway", e)
+            yield error_event(e)
+
+    return EventStreamResponse(encode_events(events()), HEARTBEAT_SECONDS)
+
+@app.get("/health", include_in_schema=False)
+async def health():
+    stats = transport.stats()
+    healthy = stats.get("grpc_pool", {}).get("healthy", True)
+    return JSONResponse(status_code=200 if healthy else 503, content={"transport": transport.name, **stats})
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/openapi.yaml", include_in_schema=False)
 async def serve_openapi_yaml():
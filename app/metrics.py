@@ -0,0 +1,181 @@
+"""Minimal in-process metrics with Prometheus text exposition.
+
+Series are preaggregated per label tuple when they are first seen, so
+recording a sample is a dict lookup, a bisect and two additions. Metrics
+are per process; in --workers mode each worker exposes its own.
+"""
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Which entry point a request came through ("grpc", "in_process", ...), for labelling router-side metrics.
+current_transport: ContextVar[str] = ContextVar("current_transport", default="direct")
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _HistogramSeries:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * (buckets + 1)
+        self.sum = 0.0
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.bounds = list(buckets)
+        self._le = [f'le="{bound}"' for bound in self.bounds] + ['le="+Inf"']
+        self._series: Dict[Tuple[str, ...], _HistogramSeries] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = _HistogramSeries(len(self.bounds))
+        series.counts[bisect_left(self.bounds, value)] += 1
+        series.sum += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in list(self._series.items()):
+            cumulative = 0
+            for le, count in zip(self._le, series.counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series.sum!r}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in list(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+class GaugeFamily:
+    """Gauge values computed at scrape time from existing state, so the hot path records nothing."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 collect: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        for labels, value in self.collect():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+GATEWAY_PARSE_SECONDS = REGISTRY.register(Histogram(
+    "ai_router_gateway_parse_seconds", "Time to parse and validate the HTTP request body", ("endpoint", "transport")))
+GRPC_HOP_SECONDS = REGISTRY.register(Histogram(
+    "ai_router_grpc_hop_seconds", "Gateway-side gRPC call time (to the response, or to the first message of a stream)", ("method",)))
+ROUTER_VALIDATION_SECONDS = REGISTRY.register(Histogram(
+    "ai_router_validation_seconds", "Time spent validating and resolving a request in AIRouter", ("provider", "transport")))
+UPSTREAM_TTFT_SECONDS = REGISTRY.register(Histogram(
+    "ai_router_upstream_ttft_seconds", "Provider time to first token", ("provider", "model", "transport")))
+UPSTREAM_TOTAL_SECONDS = REGISTRY.register(Histogram(
+    "ai_router_upstream_total_seconds", "Total provider call time", ("provider", "model", "transport")))
+STREAM_CHUNK_INTERVAL_SECONDS = REGISTRY.register(Histogram(
+    "ai_router_stream_chunk_interval_seconds", "Time between consecutive upstream stream chunks", ("provider", "model", "transport")))
+ERRORS_TOTAL = REGISTRY.register(Counter(
+    "ai_router_errors_total", "Errors by stage and exception class", ("stage", "exception")))
+ADMISSION_QUEUE_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "ai_router_admission_queue_wait_seconds", "Time admitted requests waited for rate limits and a concurrency slot",
+    ("provider", "model", "priority")))
+ADMISSION_SHED_TOTAL = REGISTRY.register(Counter(
+    "ai_router_admission_shed_total", "Requests rejected by admission before reaching the provider, by reason (deadline, queue_timeout)",
+    ("provider", "model", "priority", "reason")))
+PROVIDER_TOKENS_TOTAL = REGISTRY.register(Counter(
+    "ai_router_provider_tokens_total", "Tokens consumed upstream by kind (prompt, completion); estimated where the provider reported none",
+    ("provider", "model", "kind")))
+TENANT_TOKENS_TOTAL = REGISTRY.register(Counter(
+    "ai_router_tenant_tokens_total", "Tokens consumed upstream per tenant (unconfigured tenants are counted as \"other\")",
+    ("tenant", "provider", "kind")))
+TENANT_BUDGET_DECISIONS_TOTAL = REGISTRY.register(Counter(
+    "ai_router_tenant_budget_decisions_total", "Token budget decisions per tenant (admitted, clipped, rejected)", ("tenant", "decision")))
+SEMANTIC_CACHE_LOOKUPS_TOTAL = REGISTRY.register(Counter(
+    "ai_router_semantic_cache_lookups_total", "Semantic cache lookups by result (hit, miss, or audit: a hit re-checked upstream)",
+    ("provider", "result")))
+SEMANTIC_CACHE_AUDITS_TOTAL = REGISTRY.register(Counter(
+    "ai_router_semantic_cache_audits_total", "Audited semantic cache hits by whether the fresh response agreed with the cached one",
+    ("provider", "result")))
+SEMANTIC_CACHE_SIMILARITY = REGISTRY.register(Histogram(
+    "ai_router_semantic_cache_similarity", "Similarity of the closest cached prompt on each semantic cache lookup", ("provider",),
+    buckets=(0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.92, 0.94, 0.96, 0.98, 0.99, 1.0)))
+GATEWAY_STREAM_RESUMES_TOTAL = REGISTRY.register(Counter(
+    "ai_router_gateway_stream_resumes_total", "/stream requests with a Last-Event-ID, by result (resumed, or expired: no longer held)", ("result",)))
+IDEMPOTENCY_REQUESTS_TOTAL = REGISTRY.register(Counter(
+    "ai_router_idempotency_requests_total",
+    "Requests with an idempotency key by outcome (executed, attached to the running call, replayed from the store, conflict)", ("result",)))
+SPECULATIVE_STREAM_WINS_TOTAL = REGISTRY.register(Counter(
+    "ai_router_speculative_stream_wins_total",
+    "Speculative group streams by the candidate that sent the first chunk and its rank (0 is the one the group would have picked)",
+    ("group", "provider", "model", "rank")))
+SPECULATIVE_TTFT_SAVED_SECONDS = REGISTRY.register(Histogram(
+    "ai_router_speculative_ttft_saved_seconds",
+    "Time to first chunk saved by racing: the top-ranked candidate's average time to first chunk minus the winner's (0 when it won)",
+    ("group",)))
+CONFIG_RELOADS_TOTAL = REGISTRY.register(Counter(
+    "ai_router_config_reloads_total", "config.yaml reload attempts by result (applied or rejected)", ("result",)))
+
+def record_error(stage: str, error: BaseException) -> None:
+    ERRORS_TOTAL.inc((stage, type(error).__name__))
+
+class Timer:
+    """`with Timer(histogram, labels):` records the elapsed wall time of the block."""
+
+    __slots__ = ("histogram", "labels", "started_at")
+
+    def __init__(self, histogram: Histogram, labels: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "Timer":
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(self.labels, time.perf_counter() - self.started_at)
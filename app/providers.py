@@ -0,0 +1,124 @@
+import importlib
+import logging
+from collections.abc import Mapping
+from importlib.metadata import entry_points
+from app.config import config
+from app.exceptions import ConfigurationException
+from app.repositories.base import BaseAIRepository
+from app.strategies.base import BaseAIStrategy
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "ai_router.providers"
+DEFAULT_STRATEGY = "app.strategies.base:PassthroughStrategy"
+
+BUILTIN_PROVIDERS = {
+    "openai": {
+        "repository": "app.repositories.openai_repo:OpenAIRepository",
+        "strategy": "app.strategies.openai_strategy:OpenAIStrategy",
+    },
+    "anthropic": {
+        "repository": "app.repositories.anthropic_repo:AnthropicRepository",
+        "strategy": "app.strategies.anthropic_strategy:AnthropicStrategy",
+    },
+}
+
+def _load_object(path: str) -> Any:
+    module_name, _, attribute = path.partition(":")
+    try:
+        module = importlib.import_module(module_name)
+        return getattr(module, attribute) if attribute else module
+    except (ImportError, AttributeError) as e:
+        raise ConfigurationException(f"Could not load '{path}': {e}")
+
+def _entry_point_specs() -> Dict[str, Dict[str, str]]:
+    """Providers installed by other packages, registered as `name = "module:RepositoryClass"` in the `ai_router.providers` group."""
+    discovered = entry_points()
+    group = discovered.select(group=ENTRY_POINT_GROUP) if hasattr(discovered, "select") else discovered.get(ENTRY_POINT_GROUP, [])
+    return {entry_point.name: {"repository": entry_point.value} for entry_point in group}
+
+class ProviderSpec:
+    __slots__ = ("name", "repository_path", "strategy_path", "preload")
+
+    def __init__(self, name: str, repository_path: str, strategy_path: str, preload: bool = False):
+        self.name = name
+        self.repository_path = repository_path
+        self.strategy_path = strategy_path
+        self.preload = preload
+
+class _LazyInstances(Mapping):
+    """Read-only view of one kind of provider object, built on first lookup."""
+
+    def __init__(self, registry: "ProviderRegistry", kind: str):
+        self._registry = registry
+        self._kind = kind
+
+    def __getitem__(self, name: str) -> Any:
+        return self._registry.get(name, self._kind)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._registry.specs)
+
+    def __len__(self) -> int:
+        return len(self._registry.specs)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._registry.specs
+
+class ProviderRegistry:
+    """Providers known to the router, with their SDK modules imported and clients built on first use.
+
+    Providers come from the `providers` section of config.yaml, where
+    `repository` and `strategy` ("module:Class") may point at any
+    implementation, and from the `ai_router.providers` entry point group.
+    openai and anthropic map to the bundled implementations. Listing or
+    checking a provider never imports it, so unused providers cost nothing
+    at startup.
+    """
+
+    def __init__(self, providers_config: Dict[str, Any], discovered: Optional[Dict[str, Dict[str, str]]] = None):
+        self.specs: Dict[str, ProviderSpec] = {}
+        discovered = discovered or {}
+        for name in {**discovered, **providers_config}:
+            # config.yaml wins over an entry point, which wins over the bundled implementation.
+            source = providers_config.get(name) or {}
+            builtin = BUILTIN_PROVIDERS.get(name, {})
+            repository_path = source.get("repository") or discovered.get(name, {}).get("repository") or builtin.get("repository")
+            if repository_path is None:
+                raise ConfigurationException(f"Provider '{name}' has no repository; set providers.{name}.repository")
+            strategy_path = source.get("strategy") or builtin.get("strategy") or DEFAULT_STRATEGY
+            self.specs[name] = ProviderSpec(name, repository_path, strategy_path, bool(source.get("preload", False)))
+        self._instances: Dict[str, Dict[str, Any]] = {"repository": {}, "strategy": {}}
+        self.repositories = _LazyInstances(self, "repository")
+        self.strategies = _LazyInstances(self, "strategy")
+
+    @classmethod
+    def from_config(cls) -> "ProviderRegistry":
+        return cls(config.get_section("providers"), _entry_point_specs())
+
+    def get(self, name: str, kind: str) -> Any:
+        instances = self._instances[kind]
+        instance = instances.get(name)
+        if instance is None:
+            spec = self.specs[name]
+            path = spec.repository_path if kind == "repository" else spec.strategy_path
+            expected = BaseAIRepository if kind == "repository" else BaseAIStrategy
+            cls = _load_object(path)
+            if not (isinstance(cls, type) and issubclass(cls, expected)):
+                raise ConfigurationException(f"{path} for provider '{name}' is not a {expected.__name__}")
+            instance = instances[name] = cls()
+            if kind == "repository":
+                logger.info(f"Loaded provider {name} from {path}")
+        return instance
+
+    def preload(self) -> List[str]:
+        """Build the providers marked `preload: true`, so their SDKs are imported before serving."""
+        names = [name for name, spec in self.specs.items() if spec.preload]
+        for name in names:
+            self.get(name, "repository")
+            self.get(name, "strategy")
+        return names
+
+    def loaded(self) -> List[str]:
+        return list(self._instances["repository"])
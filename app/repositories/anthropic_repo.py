@@ -1,30 +1,69 @@
 import logging
 import anthropic
 from anthropic import AsyncAnthropic
-from .base import BaseAIRepository
+from .base import BaseAIRepository, Message, Usage
 from app.config import config
-from app.exceptions import AIGenerationException, ModelNotFoundException
-from typing import AsyncGenerator, Dict, Any
+from app.http_clients import get_http_clients
+from app.exceptions import AIGenerationException, ModelNotFoundException, RateLimitedException
+from app.tracing import TRACER
+from typing import AsyncGenerator, Dict, Any, List, Optional
 
 logger = logging.getLogger(__name__)
 
+# Stream events that never carry text.
+_NON_TEXT_EVENTS = frozenset({"content_block_start", "content_block_stop", "message_stop", "ping"})
+
+def _text_block(message: Message) -> Dict[str, Any]:
+    block: Dict[str, Any] = {"type": "text", "text": message.content}
+    if message.cache_breakpoint:
+        # Everything up to and including this block is cached for later requests that resend it unchanged.
+        block["cache_control"] = {"type": "ephemeral"}
+    return block
+
+def _request_arguments(prompt: str, messages: Optional[List[Message]], parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """messages (and system, which Anthropic takes separately) for messages.create."""
+    if not messages:
+        return {**parameters, "messages": [{"role": "user", "content": prompt}]}
+    arguments = {**parameters, "messages": [
+        {"role": message.role, "content": [_text_block(message)] if message.cache_breakpoint else message.content}
+        for message in messages if message.role != "system"
+    ]}
+    system = [_text_block(message) for message in messages if message.role == "system"]
+    if system:
+        arguments["system"] = system
+    return arguments
+
+def _fill_prompt_usage(usage: Usage, reported: Any) -> None:
+    # input_tokens excludes the tokens written to or read from the prompt cache.
+    cache_read = getattr(reported, "cache_read_input_tokens", None) or 0
+    cache_write = getattr(reported, "cache_creation_input_tokens", None) or 0
+    usage.prompt_tokens = reported.input_tokens + cache_read + cache_write
+    usage.cached_prompt_tokens = cache_read
+
 class AnthropicRepository(BaseAIRepository):
     def __init__(self):
-        self.client = AsyncAnthropic(api_key=config.anthropic_api_key)
+        # Retries are handled by the router under a shared retry budget.
+        self.client = AsyncAnthropic(api_key=config.anthropic_api_key,
+                                     base_url=config.get_base_url("anthropic"),
+                                     http_client=get_http_clients().client_for("anthropic"),
+                                     max_retries=int(config.get_section("resilience").get("sdk_max_retries", 0)))
 
-    async def generate_response(self, prompt: str, model: str, max_tokens:int, parameters: Dict[str, Any]) -> str:
+    async def generate_response(self, prompt: str, model: str, max_tokens:int, parameters: Dict[str, Any], usage: Optional[Usage] = None,
+                                messages: Optional[List[Message]] = None) -> str:
         try:
             response = await self.client.messages.create(
                 model=model,
                 max_tokens=max_tokens,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                **parameters
+                **_request_arguments(prompt, messages, parameters)
             )
+            if usage is not None and response.usage is not None:
+                _fill_prompt_usage(usage, response.usage)
+                usage.completion_tokens = response.usage.output_tokens
             return response.content[0].text
         except anthropic.APIError as e:
             logger.error(f"Error generating response from Anthropic: {e}")
+            if getattr(e, "status_code", None) == 429:
+                raise RateLimitedException(f"Anthropic rate limit exceeded: {e}")
             if "model not found" in str(e).lower():
                 raise ModelNotFoundException(f"Model '{model}' not found for Anthropic")
             raise AIGenerationException(f"Failed to generate response from Anthropic: {e}")
@@ -32,24 +71,42 @@ class AnthropicRepository(BaseAIRepository):
             logger.error(f"Unexpected error generating response from Anthropic: {e}")
             raise AIGenerationException(f"Unexpected error generating response from Anthropic: {e}")
 
-    async def stream_response(self, prompt: str, model: str, max_tokens:int, parameters: Dict[str, Any]) -> AsyncGenerator[str, None]:
+    async def stream_response(self, prompt: str, model: str, max_tokens:int, parameters: Dict[str, Any], usage: Optional[Usage] = None,
+                              messages: Optional[List[Message]] = None) -> AsyncGenerator[str, None]:
         try:
-            stream = await self.client.messages.create(
-                model=model,
-                max_tokens=max_tokens,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                stream=True,
-                **parameters
-            )
-            async for chunk in stream:
-                logger.debug(f"Received chunk: {chunk}")
-                text = self._extract_text_from_chunk(chunk)
-                if text:
-                    yield text
+            # Returns once the response headers arrive, before the first token.
+            with TRACER.span("upstream.connect", model=model):
+                stream = await self.client.messages.create(
+                    model=model,
+                    max_tokens=max_tokens,
+                    stream=True,
+                    **_request_arguments(prompt, messages, parameters)
+                )
+            # Also closed when the caller abandons the stream, so the connection is not left reading events.
+            try:
+                async for chunk in stream:
+                    logger.debug(f"Received chunk: {chunk}")
+                    chunk_type = getattr(chunk, "type", None)
+                    if chunk_type == "message_start":
+                        # Input tokens arrive with the first event, output tokens with message_delta at the end.
+                        if usage is not None and chunk.message.usage is not None:
+                            _fill_prompt_usage(usage, chunk.message.usage)
+                        continue
+                    if chunk_type == "message_delta":
+                        if usage is not None and getattr(chunk, "usage", None) is not None:
+                            usage.completion_tokens = chunk.usage.output_tokens
+                        continue
+                    if chunk_type in _NON_TEXT_EVENTS:
+                        continue
+                    text = self._extract_text_from_chunk(chunk)
+                    if text:
+                        yield text
+            finally:
+                await stream.close()
         except anthropic.APIError as e:
             logger.error(f"Error streaming response from Anthropic: {e}")
+            if getattr(e, "status_code", None) == 429:
+                raise RateLimitedException(f"Anthropic rate limit exceeded: {e}")
             if "model not found" in str(e).lower():
                 raise ModelNotFoundException(f"Model '{model}' not found for Anthropic")
             raise AIGenerationException(f"Failed to stream response from Anthropic: {e}")
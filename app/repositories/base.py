@@ -1,11 +1,46 @@
 from abc import ABC, abstractmethod
-from typing import AsyncGenerator, Any, Optional
+from dataclasses import dataclass
+from typing import AsyncGenerator, Any, List, Optional
+
+ROLES = ("system", "user", "assistant")
+
+@dataclass
+class Message:
+    role: str
+    content: str
+    # Marks the end of a prefix that later turns resend unchanged, for providers that support prompt caching.
+    cache_breakpoint: bool = False
+
+@dataclass
+class Usage:
+    """Tokens a request consumed, as reported by the provider or, with `estimated`, counted locally."""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    estimated: bool = False
+    # Part of prompt_tokens read from the provider's prompt cache.
+    cached_prompt_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def reported(self) -> bool:
+        return self.prompt_tokens > 0 or self.completion_tokens > 0
 
 class BaseAIRepository(ABC):
+    """Provider client. Repositories that can see token counts fill in the `usage` passed to them.
+
+    When `messages` is given it is the whole conversation to send, ending
+    with the new user turn, and `prompt` is only that turn's text.
+    """
+
     @abstractmethod
-    async def generate_response(self, prompt: str, model: str, max_tokens: int, parameters: dict) -> Optional[str]:
+    async def generate_response(self, prompt: str, model: str, max_tokens: int, parameters: dict, usage: Optional[Usage] = None,
+                                messages: Optional[List[Message]] = None) -> Optional[str]:
         pass
 
     @abstractmethod
-    def stream_response(self, prompt: str, model: str, max_tokens: int, parameters: dict) -> AsyncGenerator[Optional[str], None]:
+    def stream_response(self, prompt: str, model: str, max_tokens: int, parameters: dict, usage: Optional[Usage] = None,
+                        messages: Optional[List[Message]] = None) -> AsyncGenerator[Optional[str], None]:
         pass
@@ -1,45 +1,85 @@
 import logging
 from openai import AsyncOpenAI
-from .base import BaseAIRepository
+from .base import BaseAIRepository, Message, Usage
 from app.config import config
-from app.exceptions import AIGenerationException, ModelNotFoundException
-from typing import AsyncGenerator, Optional
+from app.http_clients import get_http_clients
+from app.exceptions import AIGenerationException, ModelNotFoundException, RateLimitedException
+from app.tracing import TRACER
+from typing import Any, AsyncGenerator, Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
+def _request_messages(prompt: str, messages: Optional[List[Message]]) -> List[Dict[str, str]]:
+    # OpenAI caches repeated prompt prefixes on its own, so cache breakpoints need no translation.
+    if not messages:
+        return [{"role": "user", "content": prompt}]
+    return [{"role": message.role, "content": message.content} for message in messages]
+
+def _fill_usage(usage: Usage, reported: Any) -> None:
+    usage.prompt_tokens = reported.prompt_tokens
+    usage.completion_tokens = reported.completion_tokens
+    details = getattr(reported, "prompt_tokens_details", None)
+    # Older SDKs keep fields they do not know as plain dicts.
+    cached = details.get("cached_tokens") if isinstance(details, dict) else getattr(details, "cached_tokens", None)
+    usage.cached_prompt_tokens = cached or 0
+
 class OpenAIRepository(BaseAIRepository):
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=config.openai_api_key)
+        # Retries are handled by the router under a shared retry budget.
+        self.client = AsyncOpenAI(api_key=config.openai_api_key,
+                                  base_url=config.get_base_url("openai"),
+                                  http_client=get_http_clients().client_for("openai"),
+                                  max_retries=int(config.get_section("resilience").get("sdk_max_retries", 0)))
 
-    async def generate_response(self, prompt: str, model: str, max_tokens:int, parameters: dict) -> str:
+    async def generate_response(self, prompt: str, model: str, max_tokens:int, parameters: dict, usage: Optional[Usage] = None,
+                                messages: Optional[List[Message]] = None) -> str:
         try:
             response = await self.client.chat.completions.create(
                 model=model,
-                messages=[{"role": "user", "content": prompt}],
+                messages=_request_messages(prompt, messages),
                 max_tokens=max_tokens,
                 **parameters
             )
+            if usage is not None and response.usage is not None:
+                _fill_usage(usage, response.usage)
             return response.choices[0].message.content
         except Exception as e:
             logger.error(f"Error generating response from OpenAI: {e}")
+            if getattr(e, "status_code", None) == 429:
+                raise RateLimitedException(f"OpenAI rate limit exceeded: {e}")
             if "model not found" in str(e).lower():
                 raise ModelNotFoundException(f"Model '{model}' not found for OpenAI")
             raise AIGenerationException(f"Failed to generate response from OpenAI: {e}")
 
-    async def stream_response(self, prompt: str, model: str, max_tokens:int, parameters: dict) -> AsyncGenerator[str, None]:
+    async def stream_response(self, prompt: str, model: str, max_tokens:int, parameters: dict, usage: Optional[Usage] = None,
+                              messages: Optional[List[Message]] = None) -> AsyncGenerator[str, None]:
         try:
-            stream = await self.client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=max_tokens,
-                stream=True,
-                **parameters
-            )
-            async for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
+            if usage is not None:
+                # Asks for a final chunk that carries usage and no choices.
+                parameters = {**parameters, "stream_options": {"include_usage": True}}
+            # Returns once the response headers arrive, before the first token.
+            with TRACER.span("upstream.connect", model=model):
+                stream = await self.client.chat.completions.create(
+                    model=model,
+                    messages=_request_messages(prompt, messages),
+                    max_tokens=max_tokens,
+                    stream=True,
+                    **parameters
+                )
+            # Closing releases the connection, so a stream abandoned early (for example, one that lost a
+            # speculative race) stops the upstream generation instead of draining it.
+            try:
+                async for chunk in stream:
+                    if usage is not None and chunk.usage is not None:
+                        _fill_usage(usage, chunk.usage)
+                    if chunk.choices and chunk.choices[0].delta.content is not None:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.close()
         except Exception as e:
             logger.error(f"Error streaming response from OpenAI: {e}")
+            if getattr(e, "status_code", None) == 429:
+                raise RateLimitedException(f"OpenAI rate limit exceeded: {e}")
             if "model not found" in str(e).lower():
                 raise ModelNotFoundException(f"Model '{model}' not found for OpenAI")
             raise AIGenerationException(f"Failed to stream response from OpenAI: {e}")
@@ -0,0 +1,328 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from app.exceptions import AdmissionTimeoutException, DeadlineUnattainableException, RateLimitedException
+from app.metrics import ADMISSION_QUEUE_WAIT_SECONDS, ADMISSION_SHED_TOTAL
+from app.router.scheduler import FairQueue, Flow, current_deadline, current_priority
+from app.tracing import TRACER
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Token bucket refilled continuously at `per_minute / 60` tokens per second.
+
+    `reserve` always succeeds and may drive the balance negative; it returns how
+    long the caller must wait before its reservation is covered.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, amount: float) -> float:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def refund(self, amount: float) -> None:
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + min(amount, self.capacity))
+
+class _RateWaiter:
+    __slots__ = ("future", "tokens")
+
+    def __init__(self, future: asyncio.Future, tokens: float):
+        self.future = future
+        self.tokens = tokens
+
+    def done(self) -> bool:
+        return self.future.done()
+
+class FairRateLimiter:
+    """Request and token buckets whose waits are served in weighted fair order.
+
+    While nobody is waiting and both buckets cover a request, it is admitted
+    at once. Otherwise it queues in a `FairQueue`, and a dispatcher reserves
+    for one waiter at a time, the one the queue picks next, waiting out that
+    reservation's deficit before granting it. A bulk burst therefore runs up
+    no rate-limit debt ahead of time: an interactive request that arrives
+    behind it waits for the request being dispatched, then goes next.
+    """
+
+    def __init__(self, requests: TokenBucket, tokens: TokenBucket, waiters: Optional[FairQueue] = None):
+        self.requests = requests
+        self.tokens = tokens
+        self._waiters = waiters if waiters is not None else FairQueue()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def queued_by_priority(self) -> Dict[str, int]:
+        return self._waiters.queued()
+
+    def projected_wait(self, tokens: float) -> float:
+        """Lower bound on how long a reservation of `tokens` would wait, ignoring the queue ahead of it."""
+        return max(self._deficit(self.requests, 1), self._deficit(self.tokens, tokens))
+
+    @staticmethod
+    def _deficit(bucket: TokenBucket, amount: float) -> float:
+        missing = min(amount, bucket.capacity) - bucket.available()
+        return missing / bucket.rate if missing > 0 else 0.0
+
+    async def acquire(self, tokens: float, timeout: Optional[float], flow: Flow = ("", "")) -> None:
+        if not self._waiters and self.projected_wait(tokens) == 0:
+            self.requests.reserve(1)
+            self.tokens.reserve(tokens)
+            return
+        waiter = _RateWaiter(asyncio.get_running_loop().create_future(), tokens)
+        self._waiters.push(flow, waiter)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        try:
+            await asyncio.wait_for(waiter.future, timeout)
+        except BaseException:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as we gave up; return the reservation.
+                self._refund(tokens)
+            raise
+
+    def _refund(self, tokens: float) -> None:
+        self.requests.refund(1)
+        self.tokens.refund(tokens)
+
+    async def _dispatch(self) -> None:
+        while True:
+            waiter = self._waiters.pop()
+            if waiter is None:
+                return
+            wait = max(self.requests.reserve(1), self.tokens.reserve(waiter.tokens))
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if waiter.done():
+                # Gave up while its reservation was being paid off.
+                self._refund(waiter.tokens)
+                continue
+            waiter.future.set_result(None)
+
+class AdaptiveConcurrencyLimiter:
+    """Concurrency limit adjusted by AIMD.
+
+    Each success under the latency target grows the limit by roughly one per
+    window of completed calls; a 429 or a slow call shrinks it by
+    `decrease_factor`, at most once per `decrease_cooldown` seconds. Callers
+    waiting for a slot are served in weighted fair order by `FairQueue`.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int, latency_target: float,
+                 decrease_factor: float = 0.7, decrease_cooldown: float = 1.0, waiters: Optional[FairQueue] = None):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.in_flight = 0
+        self._waiters = waiters if waiters is not None else FairQueue()
+        self._last_decrease = 0.0
+
+    @property
+    def queued(self) -> int:
+        return sum(self._waiters.queued().values())
+
+    def queued_by_priority(self) -> Dict[str, int]:
+        return self._waiters.queued()
+
+    async def acquire(self, timeout: Optional[float], flow: Flow = ("", "")) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.push(flow, waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just as we gave up; hand it on.
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self.in_flight < int(self.limit):
+            waiter = self._waiters.pop()
+            if waiter is None:
+                return
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def on_success(self, latency: float) -> None:
+        if latency > self.latency_target:
+            self._decrease()
+            return
+        self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def on_overload(self) -> None:
+        self._decrease()
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * self.decrease_factor)
+        logger.warning(f"Reducing concurrency limit to {int(self.limit)}")
+
+class AdmissionTicket:
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.first_chunk_at: Optional[float] = None
+
+    def mark_first_chunk(self) -> None:
+        if self.first_chunk_at is None:
+            self.first_chunk_at = time.monotonic()
+
+class _Gate:
+    def __init__(self, settings: Dict[str, Any], scheduling: Dict[str, Any]):
+        self.rate = FairRateLimiter(
+            TokenBucket(float(settings.get("requests_per_minute", 500))),
+            TokenBucket(float(settings.get("tokens_per_minute", 200000))),
+            FairQueue(scheduling.get("class_weights"), scheduling.get("tenant_weights"))
+        )
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial=int(settings.get("initial_concurrency", 16)),
+            minimum=int(settings.get("min_concurrency", 1)),
+            maximum=int(settings.get("max_concurrency", 64)),
+            latency_target=float(settings.get("latency_target_seconds", 30)),
+            decrease_factor=float(settings.get("decrease_factor", 0.7)),
+            waiters=FairQueue(scheduling.get("class_weights"), scheduling.get("tenant_weights"))
+        )
+        self.waiting = 0
+
+class AdmissionController:
+    """Per provider/model admission in front of the strategies.
+
+    Callers wait for request and token budget, then for a concurrency slot,
+    all within `queue_timeout` seconds; past that they get
+    AdmissionTimeoutException instead of piling onto a saturated provider.
+    Rate-limit waits and slots both go to waiters in weighted fair order
+    across priority classes and tenants. A request with a deadline is shed with
+    DeadlineUnattainableException as soon as its remaining time drops below
+    the provider's expected latency, before any upstream call is made.
+    """
+
+    def __init__(self, admission_config: Dict[str, Any]):
+        self.enabled = admission_config.get("enabled", False)
+        self.queue_timeout = float(admission_config.get("queue_timeout_seconds", 30))
+        self.defaults = admission_config.get("defaults", {})
+        self.providers = admission_config.get("providers", {})
+        self.scheduling = admission_config.get("scheduling") or {}
+        self.deadline_safety_factor = float(self.scheduling.get("deadline_safety_factor", 1.0))
+        self._gates: Dict[Tuple[str, str], _Gate] = {}
+
+    def _gate(self, provider: str, model: str) -> _Gate:
+        gate = self._gates.get((provider, model))
+        if gate is None:
+            provider_settings = self.providers.get(provider, {})
+            settings = {**self.defaults, **provider_settings, **provider_settings.get("models", {}).get(model, {})}
+            gate = self._gates[(provider, model)] = _Gate(settings, self.scheduling)
+        return gate
+
+    def _shed(self, provider: str, model: str, priority: str, reason: str, error: Exception, started_at: float) -> Exception:
+        ADMISSION_SHED_TOTAL.inc((provider, model, priority, reason))
+        TRACER.record("admission.queue", started_at, time.monotonic(), error=error, provider=provider, model=model, priority=priority, shed=reason)
+        return error
+
+    @asynccontextmanager
+    async def admit(self, provider: str, model: str, estimated_tokens: int, timeout: Optional[float] = None,
+                    expected_seconds: Optional[float] = None, tenant: str = "") -> AsyncIterator[AdmissionTicket]:
+        """Wait for capacity; `expected_seconds` is how long the call usually takes, for shedding against the request deadline."""
+        if not self.enabled:
+            yield AdmissionTicket()
+            return
+
+        gate = self._gate(provider, model)
+        priority = current_priority.get()
+        started_at = time.monotonic()
+        timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        request_deadline = current_deadline.get()
+        deadline_bound = False
+        if request_deadline is not None:
+            # The latest moment the call can start and still be expected to finish in time.
+            latest_start = request_deadline - (expected_seconds or 0.0) * self.deadline_safety_factor
+            if latest_start <= started_at:
+                raise self._shed(provider, model, priority, "deadline", DeadlineUnattainableException(
+                    f"Request deadline leaves {max(0.0, request_deadline - started_at):.2f}s, "
+                    f"{provider}/{model} usually takes {expected_seconds or 0.0:.2f}s"), started_at)
+            if latest_start - started_at < timeout:
+                timeout = latest_start - started_at
+                deadline_bound = True
+
+        def timed_out(message: str) -> Exception:
+            if deadline_bound:
+                return self._shed(provider, model, priority, "deadline",
+                                  DeadlineUnattainableException(f"{message}; the request could not finish before its deadline"), started_at)
+            return self._shed(provider, model, priority, "queue_timeout", AdmissionTimeoutException(message), started_at)
+
+        gate.waiting += 1
+        try:
+            wait = gate.rate.projected_wait(estimated_tokens)
+            if wait > timeout:
+                raise timed_out(f"Rate limit for {provider}/{model} would delay the request by {wait:.1f}s")
+            try:
+                await gate.rate.acquire(estimated_tokens, timeout, (priority, tenant))
+            except asyncio.TimeoutError:
+                raise timed_out(f"Timed out after {timeout:.1f}s waiting for the {provider}/{model} rate limit")
+            try:
+                await gate.limiter.acquire(max(0.0, started_at + timeout - time.monotonic()), (priority, tenant))
+            except asyncio.TimeoutError:
+                raise timed_out(f"Timed out after {timeout:.1f}s waiting for {provider}/{model} capacity")
+        finally:
+            gate.waiting -= 1
+        admitted_at = time.monotonic()
+        ADMISSION_QUEUE_WAIT_SECONDS.observe((provider, model, priority), admitted_at - started_at)
+        TRACER.record("admission.queue", started_at, admitted_at, provider=provider, model=model, priority=priority)
+
+        ticket = AdmissionTicket()
+        try:
+            yield ticket
+        except RateLimitedException:
+            gate.limiter.on_overload()
+            raise
+        else:
+            finished_at = ticket.first_chunk_at if ticket.first_chunk_at is not None else time.monotonic()
+            gate.limiter.on_success(finished_at - ticket.started_at)
+        finally:
+            gate.limiter.release()
+
+    def queue_depth(self) -> int:
+        return sum(gate.waiting for gate in self._gates.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue_depth(),
+            "gates": {
+                f"{provider}/{model}": {
+                    "queued": gate.waiting,
+                    "queued_for_rate": gate.rate.queued_by_priority(),
+                    "queued_for_slot": gate.limiter.queued_by_priority(),
+                    "in_flight": gate.limiter.in_flight,
+                    "concurrency_limit": int(gate.limiter.limit),
+                }
+                for (provider, model), gate in self._gates.items()
+            }
+        }
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from app.router.routing import RouteResult
+from typing import Any, AsyncGenerator, Awaitable, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class BatchItemResult:
+    """Outcome of one batch item: `result` on success, otherwise the exception it failed with."""
+    index: int
+    result: Optional[RouteResult] = None
+    error: Optional[BaseException] = None
+
+class BatchDeadlineExceeded(asyncio.TimeoutError):
+    pass
+
+async def run_batch(route: Callable[..., Awaitable[RouteResult]], requests: List[Dict[str, Any]], max_concurrency: int,
+                    max_concurrency_per_provider: int, timeout: Optional[float]) -> AsyncGenerator[BatchItemResult, None]:
+    """Run `route(**request)` for every request and yield the outcomes as they complete.
+
+    Items are grouped into one lane per provider (or model group), worked in
+    order by at most `max_concurrency_per_provider` workers, so a throttled
+    provider holds a bounded share of the `max_concurrency` slots and each
+    admission gate sees a steady stream rather than the whole batch at once.
+    Items still unfinished at the deadline are cancelled and reported as
+    failed with BatchDeadlineExceeded.
+    """
+    lanes: Dict[str, Deque[int]] = {}
+    for index, request in enumerate(requests):
+        lanes.setdefault(request["provider"], deque()).append(index)
+
+    slots = asyncio.Semaphore(max_concurrency)
+    completed: asyncio.Queue = asyncio.Queue()
+
+    async def work(pending: Deque[int]) -> None:
+        while pending:
+            index = pending.popleft()
+            async with slots:
+                try:
+                    result = await route(**requests[index])
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    completed.put_nowait(BatchItemResult(index, error=e))
+                else:
+                    completed.put_nowait(BatchItemResult(index, result=result))
+
+    workers = [
+        asyncio.ensure_future(work(pending))
+        for pending in lanes.values()
+        for _ in range(min(len(pending), max_concurrency_per_provider))
+    ]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout else None
+    finished = set()
+    try:
+        while len(finished) < len(requests):
+            remaining = deadline - loop.time() if deadline is not None else None
+            try:
+                item = await asyncio.wait_for(completed.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            finished.add(item.index)
+            yield item
+        for worker in workers:
+            worker.cancel()
+        if len(finished) < len(requests):
+            logger.warning(f"Batch deadline of {timeout}s exceeded with {len(requests) - len(finished)} of {len(requests)} items unfinished")
+            for index in range(len(requests)):
+                if index not in finished:
+                    yield BatchItemResult(index, error=BatchDeadlineExceeded(f"Batch deadline of {timeout}s exceeded"))
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
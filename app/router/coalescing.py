@@ -0,0 +1,187 @@
+import asyncio
+import logging
+from app.exceptions import AIGenerationException
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key onto one in-flight task.
+
+    The shared task is shielded from its callers, so one caller going away
+    does not cancel the call for the others; it is cancelled only once every
+    caller has gone.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, _Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._in_flight.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._in_flight[key] = flight
+            flight.task.add_done_callback(lambda done: self._finish(key, done))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        flight = self._in_flight.get(key)
+        if flight is not None and flight.task is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved in case every caller went away.
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": len(self._in_flight)}
+
+class _Subscriber:
+    def __init__(self, buffer_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self.finished = False
+        self.error: Optional[BaseException] = None
+
+class _StreamFanout:
+    """One upstream stream delivered to several subscribers, each with its own bounded buffer.
+
+    A subscriber whose buffer fills up is dropped with an error instead of
+    blocking delivery to the others. A lone subscriber is never dropped: the
+    upstream read waits for it, so the provider is paced by that client. New
+    subscribers can join only while the chunks sent so far still fit into a
+    fresh buffer.
+    """
+
+    def __init__(self, owner: "StreamCoalescer", key: str, source: AsyncGenerator[str, None]):
+        self.owner = owner
+        self.key = key
+        self.source = source
+        self.buffer_size = owner.buffer_size
+        self.subscribers: List[_Subscriber] = []
+        self.history: Optional[List[str]] = []
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def joinable(self) -> bool:
+        return self.history is not None
+
+    def subscribe(self) -> _Subscriber:
+        subscriber = _Subscriber(self.buffer_size)
+        for chunk in self.history:
+            subscriber.queue.put_nowait(chunk)
+        self.subscribers.append(subscriber)
+        if self.task is None:
+            self.task = asyncio.ensure_future(self._pump())
+        return subscriber
+
+    def unsubscribe(self, subscriber: _Subscriber) -> None:
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+        # Frees the pump if it is waiting for room in this subscriber's buffer.
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        if not self.subscribers and self.task is not None and not self.task.done():
+            self.task.cancel()
+
+    async def _pump(self) -> None:
+        error: Optional[BaseException] = None
+        try:
+            async for chunk in self.source:
+                if self.history is not None:
+                    self.history.append(chunk)
+                    if len(self.history) >= self.buffer_size:
+                        self.history = None
+                        self.owner.release(self)
+                for subscriber in list(self.subscribers):
+                    try:
+                        subscriber.queue.put_nowait(chunk)
+                    except asyncio.QueueFull:
+                        if len(self.subscribers) == 1:
+                            await subscriber.queue.put(chunk)
+                            continue
+                        self.owner.dropped_subscribers += 1
+                        logger.warning(f"Dropping slow stream subscriber after {self.buffer_size} buffered chunks")
+                        subscriber.error = AIGenerationException("Stream subscriber fell behind the upstream response")
+                        subscriber.finished = True
+                        self.subscribers.remove(subscriber)
+        except asyncio.CancelledError:
+            error = AIGenerationException("Upstream stream was cancelled")
+            raise
+        except Exception as e:
+            error = e
+        finally:
+            self.history = None
+            self.owner.release(self)
+            await self.source.aclose()
+            for subscriber in self.subscribers:
+                subscriber.error = error
+                try:
+                    subscriber.queue.put_nowait(_END)
+                except asyncio.QueueFull:
+                    subscriber.finished = True
+
+    async def read(self, subscriber: _Subscriber) -> AsyncGenerator[str, None]:
+        try:
+            while True:
+                if subscriber.finished and subscriber.queue.empty():
+                    break
+                item = await subscriber.queue.get()
+                if item is _END:
+                    break
+                yield item
+            if subscriber.error is not None:
+                raise subscriber.error
+        finally:
+            self.unsubscribe(subscriber)
+
+class StreamCoalescer:
+    """Shares identical in-flight upstream streams between concurrent callers."""
+
+    def __init__(self, buffer_size: int):
+        self.buffer_size = buffer_size
+        self._in_flight: Dict[str, _StreamFanout] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.dropped_subscribers = 0
+
+    def subscribe(self, key: str, open_stream: Callable[[], AsyncGenerator[str, None]]) -> AsyncGenerator[str, None]:
+        fanout = self._in_flight.get(key)
+        if fanout is not None and fanout.joinable:
+            self.coalesced += 1
+        else:
+            fanout = _StreamFanout(self, key, open_stream())
+            self._in_flight[key] = fanout
+            self.leaders += 1
+        return fanout.read(fanout.subscribe())
+
+    def release(self, fanout: _StreamFanout) -> None:
+        """Stop routing new callers to `fanout` once it can no longer be joined."""
+        if self._in_flight.get(fanout.key) is fanout:
+            del self._in_flight[fanout.key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+            "dropped_subscribers": self.dropped_subscribers,
+        }
@@ -0,0 +1,129 @@
+import asyncio
+import hashlib
+import json
+import logging
+from contextvars import ContextVar
+from app.cache.base import BaseResponseCache
+from app.cache.factory import create_response_cache
+from app.exceptions import IdempotencyKeyReusedException
+from app.metrics import IDEMPOTENCY_REQUESTS_TOTAL
+from app.repositories.base import Message, Usage
+from app.router.routing import RouteResult
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+
+# The client's key for the current request, from the Idempotency-Key HTTP header; the gateway transports forward it.
+current_idempotency_key: ContextVar[Optional[str]] = ContextVar("current_idempotency_key", default=None)
+
+def request_fingerprint(provider: str, prompt: str, model: Optional[str], max_tokens: Optional[int], parameters: Optional[Dict[str, Any]],
+                        bypass_cache: bool, messages: Optional[List[Message]], session_id: Optional[str]) -> str:
+    """Hash of the request as sent, so a key reused for a different request can be told apart from a retry.
+
+    Unset and empty values hash alike, as gRPC cannot tell them apart.
+    """
+    payload = json.dumps([provider, prompt, model or None, max_tokens or None, sorted((parameters or {}).items()), bypass_cache,
+                          [[message.role, message.content] for message in messages or ()], session_id or None],
+                         separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _encode(fingerprint: str, result: RouteResult) -> str:
+    usage = result.usage
+    return json.dumps({
+        "fingerprint": fingerprint,
+        "content": result.content,
+        "provider": result.provider,
+        "model": result.model,
+        "usage": [usage.prompt_tokens, usage.completion_tokens, usage.estimated, usage.cached_prompt_tokens] if usage is not None else None
+    }, ensure_ascii=False)
+
+def _decode(stored: str) -> Tuple[str, RouteResult]:
+    entry = json.loads(stored)
+    usage = Usage(*entry["usage"]) if entry["usage"] is not None else None
+    return entry["fingerprint"], RouteResult(entry["content"], entry["provider"], entry["model"], cached=True, usage=usage)
+
+class _Execution:
+    def __init__(self, fingerprint: str, task: asyncio.Task):
+        self.fingerprint = fingerprint
+        self.task = task
+
+class IdempotencyStore:
+    """Answers each (tenant, Idempotency-Key) pair at most once upstream within `window_seconds`.
+
+    The first request with a key runs; a retry that arrives while it is still
+    running waits for the same call, and one that arrives after it completed
+    gets the stored result (with `cached` set and the original call's
+    usage). The call is not cancelled when its caller gives up, since the
+    point is to let the retry pick up the answer. Failed calls are not
+    stored, so a retry after an error is sent again. A key reused with a
+    different request fails with IdempotencyKeyReusedException.
+
+    Completed results go to a response cache backend: "memory" (per
+    process), "sqlite" (a local file shared by the workers of one host) or
+    "redis". Retries of a running call only attach within one process.
+    """
+
+    def __init__(self, backend: BaseResponseCache):
+        self.backend = backend
+        self._running: Dict[str, _Execution] = {}
+
+    @classmethod
+    def from_config(cls, idempotency_config: Dict[str, Any]) -> Optional["IdempotencyStore"]:
+        if not idempotency_config.get("enabled", True):
+            return None
+        backend = create_response_cache({**idempotency_config, "enabled": True,
+                                         "ttl_seconds": float(idempotency_config.get("window_seconds", 3600))})
+        return cls(backend)
+
+    @staticmethod
+    def _store_key(tenant: str, key: str) -> str:
+        return "idempotency:" + hashlib.sha256(f"{tenant}\0{key}".encode("utf-8")).hexdigest()
+
+    def _check(self, key: str, fingerprint: str, stored_fingerprint: str) -> None:
+        if fingerprint != stored_fingerprint:
+            IDEMPOTENCY_REQUESTS_TOTAL.inc(("conflict",))
+            raise IdempotencyKeyReusedException(f"Idempotency key '{key}' was already used for a different request")
+
+    async def run(self, tenant: str, key: str, fingerprint: str, call: Callable[[], Awaitable[RouteResult]]) -> RouteResult:
+        store_key = self._store_key(tenant, key)
+        execution = self._running.get(store_key)
+        if execution is None:
+            stored = await self.backend.get(store_key)
+            if stored is not None:
+                stored_fingerprint, result = _decode(stored)
+                self._check(key, fingerprint, stored_fingerprint)
+                IDEMPOTENCY_REQUESTS_TOTAL.inc(("replayed",))
+                logger.info(f"Answering retry of idempotency key '{key}' from the stored result")
+                return result
+            # Another request with the key may have started while the backend was read.
+            execution = self._running.get(store_key)
+        if execution is not None:
+            self._check(key, fingerprint, execution.fingerprint)
+            IDEMPOTENCY_REQUESTS_TOTAL.inc(("attached",))
+            logger.info(f"Attaching retry of idempotency key '{key}' to the call in progress")
+            result = await asyncio.shield(execution.task)
+            return RouteResult(result.content, result.provider, result.model, cached=True, usage=result.usage)
+
+        IDEMPOTENCY_REQUESTS_TOTAL.inc(("executed",))
+        task = asyncio.ensure_future(self._execute(store_key, fingerprint, call))
+        self._running[store_key] = _Execution(fingerprint, task)
+        task.add_done_callback(lambda done: self._finish(store_key, done))
+        return await asyncio.shield(task)
+
+    async def _execute(self, store_key: str, fingerprint: str, call: Callable[[], Awaitable[RouteResult]]) -> RouteResult:
+        result = await call()
+        await self.backend.set(store_key, _encode(fingerprint, result))
+        return result
+
+    def _finish(self, store_key: str, task: asyncio.Task) -> None:
+        execution = self._running.get(store_key)
+        if execution is not None and execution.task is task:
+            del self._running[store_key]
+        if not task.cancelled():
+            # Mark the exception as retrieved in case every caller went away.
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"running": len(self._running), "store": self.backend.stats()}
@@ -0,0 +1,208 @@
+import logging
+import random
+import time
+from app.exceptions import CircuitOpenException
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over a rolling error-rate window.
+
+    The window is split into time buckets so old outcomes age out without
+    storing every call. Once at least `min_requests` calls in the window
+    failed at `error_rate_threshold` or more, the breaker opens and rejects
+    calls for `open_seconds`; it then lets up to `half_open_max_calls` probes
+    through and closes after that many consecutive successes. Only the
+    outcomes of those probes move a half-open breaker; calls that started
+    before it opened neither hold nor free a probe slot.
+    """
+
+    def __init__(self, name: str, window_seconds: float, buckets: int, min_requests: int, error_rate_threshold: float,
+                 open_seconds: float, half_open_max_calls: int):
+        self.name = name
+        self.bucket_seconds = window_seconds / buckets
+        self.min_requests = min_requests
+        self.error_rate_threshold = error_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self._buckets: List[List[int]] = [[0, 0] for _ in range(buckets)]
+        self._bucket_ids: List[int] = [0] * buckets
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        # Counts half-open periods, so a probe from an earlier one is not mistaken for a current probe.
+        self._half_open_period = 0
+
+    def _bucket(self) -> List[int]:
+        bucket_id = int(time.monotonic() / self.bucket_seconds)
+        index = bucket_id % len(self._buckets)
+        if self._bucket_ids[index] != bucket_id:
+            self._bucket_ids[index] = bucket_id
+            self._buckets[index] = [0, 0]
+        return self._buckets[index]
+
+    def _window(self) -> Tuple[int, int]:
+        oldest = int(time.monotonic() / self.bucket_seconds) - len(self._buckets) + 1
+        successes = failures = 0
+        for bucket_id, (ok, failed) in zip(self._bucket_ids, self._buckets):
+            if bucket_id >= oldest:
+                successes += ok
+                failures += failed
+        return successes, failures
+
+    def allow(self) -> Optional["BreakerTicket"]:
+        """A ticket for a call that may proceed, or None while the breaker rejects calls."""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                return None
+            self.state = HALF_OPEN
+            self._half_open_period += 1
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_max_calls:
+                return None
+            self._probes_in_flight += 1
+            return BreakerTicket(self, self._half_open_period)
+        return BreakerTicket(self, 0)
+
+    def _is_current_probe(self, probe: int) -> bool:
+        return self.state == HALF_OPEN and probe == self._half_open_period
+
+    def record_success(self, probe: int = 0) -> None:
+        if self.state == HALF_OPEN:
+            if self._is_current_probe(probe):
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_max_calls:
+                    self._close()
+            return
+        self._bucket()[0] += 1
+
+    def record_failure(self, probe: int = 0) -> None:
+        if self.state == HALF_OPEN:
+            if self._is_current_probe(probe):
+                self._open()
+            return
+        self._bucket()[1] += 1
+        successes, failures = self._window()
+        total = successes + failures
+        if self.state == CLOSED and total >= self.min_requests and failures / total >= self.error_rate_threshold:
+            self._open()
+
+    def record_abandoned(self, probe: int = 0) -> None:
+        """The call ended without an outcome (e.g. cancelled); free its probe slot."""
+        if self._is_current_probe(probe):
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        logger.warning(f"Circuit breaker for {self.name} opened for {self.open_seconds}s")
+
+    def _close(self) -> None:
+        logger.info(f"Circuit breaker for {self.name} closed")
+        self.state = CLOSED
+        self._buckets = [[0, 0] for _ in self._buckets]
+
+class BreakerTicket:
+    """One call let through by a breaker, and the half-open period it probes (0 if it is not a probe)."""
+
+    __slots__ = ("breaker", "probe")
+
+    def __init__(self, breaker: CircuitBreaker, probe: int):
+        self.breaker = breaker
+        self.probe = probe
+
+    def record_success(self) -> None:
+        self.breaker.record_success(self.probe)
+
+    def record_failure(self) -> None:
+        self.breaker.record_failure(self.probe)
+
+    def record_abandoned(self) -> None:
+        self.breaker.record_abandoned(self.probe)
+
+class CircuitBreakerRegistry:
+    def __init__(self, breaker_config: Dict[str, Any]):
+        self.enabled = breaker_config.get("enabled", True)
+        self.settings = {
+            "window_seconds": float(breaker_config.get("window_seconds", 30)),
+            "buckets": int(breaker_config.get("buckets", 10)),
+            "min_requests": int(breaker_config.get("min_requests", 20)),
+            "error_rate_threshold": float(breaker_config.get("error_rate_threshold", 0.5)),
+            "open_seconds": float(breaker_config.get("open_seconds", 15)),
+            "half_open_max_calls": int(breaker_config.get("half_open_max_calls", 3)),
+        }
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self.rejected = 0
+
+    def get(self, provider: str, model: str) -> CircuitBreaker:
+        breaker = self._breakers.get((provider, model))
+        if breaker is None:
+            breaker = self._breakers[(provider, model)] = CircuitBreaker(f"{provider}/{model}", **self.settings)
+        return breaker
+
+    def acquire(self, provider: str, model: str) -> BreakerTicket:
+        """Return the ticket of a call that may proceed, or raise CircuitOpenException."""
+        breaker = self.get(provider, model)
+        if not self.enabled:
+            return BreakerTicket(breaker, 0)
+        ticket = breaker.allow()
+        if ticket is None:
+            self.rejected += 1
+            raise CircuitOpenException(f"Circuit breaker for {provider}/{model} is open")
+        return ticket
+
+    def is_available(self, provider: str, model: str) -> bool:
+        breaker = self._breakers.get((provider, model))
+        return not self.enabled or breaker is None or breaker.state != OPEN
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rejected": self.rejected,
+            "states": {f"{provider}/{model}": breaker.state for (provider, model), breaker in self._breakers.items()},
+        }
+
+class RetryBudget:
+    """Caps retries at a fraction of recent traffic so an outage cannot multiply load.
+
+    Every request deposits `ratio` tokens and every retry spends one; a small
+    `min_per_second` allowance keeps retries possible at low traffic.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, max_tokens: float):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.updated_at = time.monotonic()
+        self.retries = 0
+        self.exhausted = 0
+
+    def record_request(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self.updated_at) * self.min_per_second)
+        self.updated_at = now
+        if self.tokens < 1:
+            self.exhausted += 1
+            return False
+        self.tokens -= 1
+        self.retries += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {"retries": self.retries, "exhausted": self.exhausted, "tokens": round(self.tokens, 2)}
+
+def retry_delay(attempt: int, base: float, maximum: float) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(maximum, base * 2 ** (attempt - 1)))
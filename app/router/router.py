@@ -1,68 +1,653 @@
+import asyncio
+import json
 import logging
-from app.repositories.openai_repo import OpenAIRepository
-from app.repositories.anthropic_repo import AnthropicRepository
-from app.strategies.openai_strategy import OpenAIStrategy
-from app.strategies.anthropic_strategy import AnthropicStrategy
+import time
+from app.cache.base import make_cache_key
+from app.cache.factory import create_response_cache, create_semantic_cache
 from app.config import config
-from app.exceptions import ProviderNotFoundException, ModelNotFoundException
-from typing import AsyncGenerator, Optional, Dict, Any
+from app.http_clients import get_http_clients
+from app.providers import ProviderRegistry
+from app.metrics import (PROVIDER_TOKENS_TOTAL, REGISTRY, ROUTER_VALIDATION_SECONDS, SPECULATIVE_STREAM_WINS_TOTAL, SPECULATIVE_TTFT_SAVED_SECONDS,
+                         STREAM_CHUNK_INTERVAL_SECONDS, UPSTREAM_TOTAL_SECONDS, UPSTREAM_TTFT_SECONDS, GaugeFamily, current_transport, record_error)
+from app.repositories.base import ROLES, Message, Usage
+from app.router.admission import AdmissionController
+from app.router.batch import BatchItemResult, run_batch
+from app.router.coalescing import SingleFlight, StreamCoalescer
+from app.router.idempotency import IdempotencyStore, request_fingerprint
+from app.router.resilience import BreakerTicket, CircuitBreakerRegistry, RetryBudget, retry_delay
+from app.router.routing import Candidate, LatencyAwareSelector, RouteResult
+from app.router.scheduler import current_priority
+from app.router.sessions import SessionStore
+from app.router.tenants import BudgetReservation, TenantBudgets, current_tenant
+from app.router.tokens import estimate_prompt_tokens, estimate_text_tokens
+from app.tracing import TRACER
+from app.exceptions import (AIGenerationException, AIRouterException, BatchTooLargeException, InvalidRequestException, ProviderNotFoundException,
+                            ModelNotFoundException)
+from typing import TYPE_CHECKING, AsyncGenerator, Optional, Dict, Any, List, Set, Tuple
+
+if TYPE_CHECKING:
+    from app.cache.semantic_cache import SemanticHit
 
 logger = logging.getLogger(__name__)
 
+# Stands in for every model that is not configured, in per-model state and metric labels.
+OTHER_MODEL = "other"
+
 class AIRouter:
     def __init__(self):
-        self.repositories = {
-            'openai': OpenAIRepository(),
-            'anthropic': AnthropicRepository()
-        }
-        self.strategies = {
-            'openai': OpenAIStrategy(),
-            'anthropic': AnthropicStrategy()
-        }
+        # Provider SDKs are imported and their clients built the first time a provider is routed to.
+        self.providers = ProviderRegistry.from_config()
+        self.repositories = self.providers.repositories
+        self.strategies = self.providers.strategies
+        cache_config = config.get_section("cache")
+        self.cache = create_response_cache(cache_config)
+        self.cache_deterministic_only = cache_config.get("deterministic_only", True)
+        self.cache_replay_chunk_size = int(cache_config.get("replay_chunk_size", 64))
+        self.semantic_cache = create_semantic_cache(config.get_section("semantic_cache"))
+        coalescing_config = config.get_section("coalescing")
+        self.coalescing_enabled = coalescing_config.get("enabled", True)
+        self.single_flight = SingleFlight()
+        self.stream_coalescer = StreamCoalescer(max(1, int(coalescing_config.get("stream_buffer_size", 256))))
+        self.admission = AdmissionController(config.get_section("admission"))
+        self.budgets = TenantBudgets(config.get_section("token_budgets"))
+        self.sessions = SessionStore.from_config(config.get_section("sessions"))
+        self.idempotency = IdempotencyStore.from_config(config.get_section("idempotency"))
+        self.routing = LatencyAwareSelector(config.get_section("routing"), list(self.repositories))
+        resilience_config = config.get_section("resilience")
+        self.breakers = CircuitBreakerRegistry(resilience_config.get("circuit_breaker", {}))
+        self.routing.is_available = self.breakers.is_available
+        budget_config = resilience_config.get("retry_budget", {})
+        self.retry_budget = RetryBudget(
+            ratio=float(budget_config.get("ratio", 0.1)),
+            min_per_second=float(budget_config.get("min_per_second", 1)),
+            max_tokens=float(budget_config.get("max_tokens", 10))
+        )
+        self.max_retries = int(resilience_config.get("max_retries", 2))
+        self.retry_backoff = float(resilience_config.get("retry_backoff_seconds", 0.2))
+        self.retry_backoff_max = float(resilience_config.get("retry_backoff_max_seconds", 2))
+        self.hedged_requests = 0
+        self.speculative_streams = 0
+        batch_config = config.get_section("batch")
+        self.batch_max_items = int(batch_config.get("max_items", 1000))
+        self.batch_default_concurrency = int(batch_config.get("default_concurrency", 8))
+        self.batch_max_concurrency = int(batch_config.get("max_concurrency", 64))
+        self.batch_max_concurrency_per_provider = int(batch_config.get("max_concurrency_per_provider", 16))
+        self.batch_timeout = float(batch_config.get("timeout_seconds", 600))
+        # Models with their own breaker, admission gate, latency stats and metric labels, besides each provider's default.
+        self.tracked_models: Dict[str, Set[str]] = {}
+        for candidates in self.routing.groups.values():
+            for candidate in candidates:
+                self.tracked_models.setdefault(candidate.provider, set()).add(candidate.model)
+        for name, provider_settings in self.admission.providers.items():
+            self.tracked_models.setdefault(name, set()).update(provider_settings.get("models") or {})
 
-    def _validate_input(self, provider: str, model: Optional[str] = None) -> None:
+    def _resolve_input(self, provider: str, model: Optional[str], max_tokens: Optional[int]) -> Tuple[str, int]:
+        """Validate `provider` and fill in its default model and max_tokens from the current config snapshot."""
         if provider not in self.repositories:
             raise ProviderNotFoundException(f"Unsupported provider: {provider}")
 
+        defaults = config.snapshot.providers.get(provider) or config.provider(provider)
         if model is None:
-            model = config.get_default_model(provider)
+            model = defaults.default_model
             if model is None:
                 raise ModelNotFoundException(f"No default model configured for provider: {provider}")
+        return model, max_tokens or defaults.default_max_tokens
 
+    def _tracked_model(self, provider: str, model: str) -> str:
+        """`model`, or OTHER_MODEL when it is not configured anywhere, so arbitrary model names share one entry per provider."""
+        if model in self.tracked_models.get(provider, ()):
+            return model
+        defaults = config.snapshot.providers.get(provider) or config.provider(provider)
+        return model if model == defaults.default_model else OTHER_MODEL
 
-    async def route_request(self, provider: str, prompt: str, model: Optional[str] = None, max_tokens: Optional[int] = None, parameters: Optional[Dict[str, Any]] = None) -> str:
-        self._validate_input(provider, model)
+    def _account_usage(self, provider: str, model: str, usage: Usage, prompt_tokens: int, response: str) -> Usage:
+        """Fall back to local estimates where the provider reported no usage, and count the tokens."""
+        if not usage.reported:
+            usage.prompt_tokens = prompt_tokens
+            usage.completion_tokens = estimate_text_tokens(response)
+            usage.estimated = True
+        PROVIDER_TOKENS_TOTAL.inc((provider, model, "prompt"), usage.prompt_tokens)
+        PROVIDER_TOKENS_TOTAL.inc((provider, model, "completion"), usage.completion_tokens)
+        return usage
 
-        if model is None:
-            model = config.get_default_model(provider)
-        if max_tokens is None:
-            max_tokens = config.get_default_max_tokens(provider)
-        if max_tokens == 0:
-            max_tokens = 1000
-        if parameters is None:
-            parameters = {}
+    @staticmethod
+    def _conversation_key(prompt: str, messages: Optional[List[Message]]) -> str:
+        """What identifies the conversation in cache keys: the prompt, or every message with its role."""
+        if not messages:
+            return prompt
+        return json.dumps([[message.role, message.content] for message in messages], separators=(",", ":"), ensure_ascii=False)
 
-        repository = self.repositories[provider]
-        strategy = self.strategies[provider]
+    @staticmethod
+    def _validate_messages(messages: Optional[List[Message]]) -> None:
+        for message in messages or ():
+            if message.role not in ROLES:
+                raise InvalidRequestException(f"Unsupported message role '{message.role}'; expected one of {', '.join(ROLES)}")
 
-        logger.info(f"Routing request to {provider} using model {model}")
-        return await strategy.execute(repository, prompt, model, max_tokens, parameters)
+    def _is_cacheable(self, parameters: Dict[str, Any]) -> bool:
+        return self.cache is not None and self._allows_caching(parameters)
 
-    async def stream_request(self, provider: str, prompt: str, model: Optional[str] = None, max_tokens: Optional[int] = None, parameters: Optional[Dict[str, Any]] = None) -> AsyncGenerator[str, None]:
-        self._validate_input(provider, model)
+    def _is_coalescable(self, parameters: Dict[str, Any], bypass_cache: bool) -> bool:
+        # Callers of a sampled request each expect their own sample, not a shared one.
+        return self.coalescing_enabled and not bypass_cache and self._allows_caching(parameters)
 
-        if model is None:
-            model = config.get_default_model(provider)
+    def _allows_caching(self, parameters: Dict[str, Any]) -> bool:
+        if self.cache_deterministic_only:
+            try:
+                return float(parameters.get("temperature", 1)) == 0
+            except (TypeError, ValueError):
+                return False
+        return True
+
+    def _semantic_scope(self, provider: str, model: str, max_tokens: int, parameters: Dict[str, Any], bypass_cache: bool,
+                        messages: Optional[List[Message]] = None) -> Optional[str]:
+        """Key of the settings a semantic cache match must share with this request, or None when the stage does not apply."""
+        # A near match of the last turn says nothing about whether the rest of a conversation matches.
+        if self.semantic_cache is None or bypass_cache or messages or not self._allows_caching(parameters):
+            return None
+        return make_cache_key(provider, model, "", max_tokens, parameters)
+
+    def _remember_semantic(self, provider: str, scope: str, prompt: str, response: str, audited: Optional["SemanticHit"]) -> None:
+        if audited is not None:
+            self.semantic_cache.record_audit(provider, audited, prompt, response)
+        self.semantic_cache.add(scope, prompt, response)
+
+    async def route_request(self, provider: str, prompt: str, model: Optional[str] = None, max_tokens: Optional[int] = None, parameters: Optional[Dict[str, Any]] = None, bypass_cache: bool = False,
+                            messages: Optional[List[Message]] = None, session_id: Optional[str] = None, idempotency_key: Optional[str] = None) -> RouteResult:
+        """Route to `provider`, or to the best candidate of a model group when `provider` names one (`model` is then ignored).
+
+        `messages`, when given, are sent instead of `prompt` as a single user turn. With `session_id`, they (or
+        the prompt) are the new turn, sent after the session's stored history and then appended to it.
+        With `idempotency_key`, a repeat of the request is answered from the first one (see IdempotencyStore).
+        """
+        self._validate_messages(messages)
+        if idempotency_key and self.idempotency is not None:
+            fingerprint = request_fingerprint(provider, prompt, model, max_tokens, parameters, bypass_cache, messages, session_id)
+            return await self.idempotency.run(current_tenant.get(), idempotency_key, fingerprint, lambda: self.route_request(
+                provider, prompt, model, max_tokens, parameters, bypass_cache, messages, session_id))
+        if session_id:
+            turn = messages or [Message("user", prompt)]
+            async with self.sessions.turn(current_tenant.get(), session_id) as session:
+                result = await self.route_request(provider, prompt, model, max_tokens, parameters, bypass_cache, session.history() + turn)
+                self.sessions.append(session, turn + [Message("assistant", result.content or "")])
+            return result
+        if provider in self.routing.groups:
+            return await self._route_group(provider, prompt, max_tokens, parameters, bypass_cache, messages)
+
+        transport = current_transport.get()
+        validation_started_at = time.perf_counter()
+        with TRACER.span("router.validate", provider=provider):
+            model, max_tokens = self._resolve_input(provider, model, max_tokens)
+            if parameters is None:
+                parameters = {}
+            prompt_tokens = estimate_prompt_tokens(prompt, messages)
+            reservation = self.budgets.reserve(current_tenant.get(), prompt_tokens, max_tokens)
+            max_tokens = reservation.max_tokens
+        ROUTER_VALIDATION_SECONDS.observe((provider, transport), time.perf_counter() - validation_started_at)
+        try:
+            return await self._route_single(provider, prompt, messages, model, max_tokens, parameters, bypass_cache, transport, prompt_tokens, reservation)
+        finally:
+            # Releases the reservation of cache hits, failures and coalesced followers; the request that went upstream has settled already.
+            self.budgets.settle(reservation, None)
+
+    async def _route_single(self, provider: str, prompt: str, messages: Optional[List[Message]], model: str, max_tokens: int, parameters: Dict[str, Any], bypass_cache: bool,
+                            transport: str, prompt_tokens: int, reservation: BudgetReservation) -> RouteResult:
+        request_key = make_cache_key(provider, model, self._conversation_key(prompt, messages), max_tokens, parameters)
+        cacheable = not bypass_cache and self._is_cacheable(parameters)
+        if cacheable:
+            cached = await self.cache.get(request_key)
+            if cached is not None:
+                logger.info(f"Serving cached response for {provider} model {model}")
+                return RouteResult(cached, provider, model, cached=True)
+        semantic_scope = self._semantic_scope(provider, model, max_tokens, parameters, bypass_cache, messages)
+        semantic_hit = None
+        if semantic_scope is not None:
+            semantic_hit = self.semantic_cache.lookup(provider, semantic_scope, prompt)
+            if semantic_hit is not None and not semantic_hit.audit:
+                logger.info(f"Serving semantic cache match ({semantic_hit.similarity:.3f}) for {provider} model {model}")
+                return RouteResult(semantic_hit.response, provider, model, cached=True)
+
+        tracked = self._tracked_model(provider, model)
+
+        async def execute() -> RouteResult:
+            self.retry_budget.record_request()
+            attempt = 0
+            while True:
+                breaker = self.breakers.acquire(provider, tracked)
+                admitted = False
+                try:
+                    async with self.admission.admit(provider, tracked, prompt_tokens + max_tokens, tenant=reservation.tenant,
+                                                    expected_seconds=self.routing.stats_for(provider, tracked).total):
+                        admitted = True
+                        logger.info(f"Routing request to {provider} using model {model}")
+                        started_at = time.monotonic()
+                        usage = Usage()
+                        try:
+                            with TRACER.span("upstream.call", provider=provider, model=model, attempt=attempt):
+                                response = await self.strategies[provider].execute(self.repositories[provider], prompt, model, max_tokens, parameters, usage, messages)
+                        except AIRouterException as e:
+                            self._record_failure(provider, tracked, breaker, e)
+                            raise
+                        except BaseException:
+                            breaker.record_abandoned()
+                            raise
+                        elapsed = time.monotonic() - started_at
+                        self._record_success(provider, tracked, breaker, elapsed, elapsed)
+                        labels = (provider, tracked, transport)
+                        UPSTREAM_TTFT_SECONDS.observe(labels, elapsed)
+                        UPSTREAM_TOTAL_SECONDS.observe(labels, elapsed)
+                    break
+                except AIGenerationException as e:
+                    attempt = await self._before_retry(provider, model, attempt, e)
+                except BaseException:
+                    if not admitted:
+                        # Shed, timed out or cancelled while queued: the call never started, so free its probe slot.
+                        breaker.record_abandoned()
+                    raise
+            if cacheable and response is not None:
+                await self.cache.set(request_key, response)
+            if semantic_scope is not None and response is not None:
+                self._remember_semantic(provider, semantic_scope, prompt, response, semantic_hit)
+            self._account_usage(provider, tracked, usage, prompt_tokens, response or "")
+            self.budgets.settle(reservation, usage, provider)
+            return RouteResult(response, provider, model, usage=usage)
+
+        if self._is_coalescable(parameters, bypass_cache):
+            return await self.single_flight.do(f"{reservation.tenant}:{request_key}", execute)
+        return await execute()
+
+    def _record_success(self, provider: str, model: str, breaker: BreakerTicket, ttft: float, total: float) -> None:
+        breaker.record_success()
+        self.routing.record_success(provider, model, ttft, total)
+
+    def _record_failure(self, provider: str, model: str, breaker: BreakerTicket, error: AIRouterException) -> None:
+        record_error("upstream", error)
+        # Only provider-side failures count against the breaker; a bad model name says nothing about provider health.
+        if isinstance(error, AIGenerationException):
+            breaker.record_failure()
+        else:
+            breaker.record_abandoned()
+        self.routing.record_failure(provider, model)
+
+    async def _before_retry(self, provider: str, model: str, attempt: int, error: AIGenerationException) -> int:
+        """Sleep before the next attempt, or re-raise `error` when retries or the retry budget are used up."""
+        if attempt >= self.max_retries or not self.retry_budget.try_spend():
+            raise error
+        attempt += 1
+        delay = retry_delay(attempt, self.retry_backoff, self.retry_backoff_max)
+        logger.warning(f"Retrying {provider}/{model} in {delay:.2f}s (attempt {attempt}/{self.max_retries}): {error}")
+        await asyncio.sleep(delay)
+        return attempt
+
+    async def _route_group(self, group: str, prompt: str, max_tokens: Optional[int], parameters: Optional[Dict[str, Any]], bypass_cache: bool,
+                           messages: Optional[List[Message]]) -> RouteResult:
+        candidates = self.routing.rank(group)
+        last_error: Optional[AIRouterException] = None
+        index = 0
+        while index < len(candidates):
+            primary = candidates[index]
+            secondary = candidates[index + 1] if index + 1 < len(candidates) else None
+            hedge_delay = self.routing.hedge_delay(primary) if secondary is not None else None
+            try:
+                if hedge_delay is None:
+                    index += 1
+                    return await self.route_request(primary.provider, prompt, primary.model, max_tokens, parameters, bypass_cache, messages)
+                index += 2
+                return await self._route_hedged(primary, secondary, hedge_delay, prompt, max_tokens, parameters, bypass_cache, messages)
+            except AIRouterException as e:
+                logger.warning(f"Candidate {primary.provider}/{primary.model} of group '{group}' failed, falling back: {e}")
+                last_error = e
+        raise last_error
+
+    async def _route_hedged(self, primary: Candidate, secondary: Candidate, delay: float, prompt: str, max_tokens: Optional[int], parameters: Optional[Dict[str, Any]], bypass_cache: bool,
+                            messages: Optional[List[Message]]) -> RouteResult:
+        """Send to `primary`; if it has not answered within `delay` (or failed), also send to `secondary` and take whichever answers first."""
+        attempts = [asyncio.ensure_future(self.route_request(primary.provider, prompt, primary.model, max_tokens, parameters, bypass_cache, messages))]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if done and attempts[0].exception() is None:
+                return attempts[0].result()
+            if not done:
+                self.hedged_requests += 1
+                logger.info(f"{primary.provider}/{primary.model} slower than {delay:.2f}s, hedging to {secondary.provider}/{secondary.model}")
+            attempts.append(asyncio.ensure_future(self.route_request(secondary.provider, prompt, secondary.model, max_tokens, parameters, bypass_cache, messages)))
+            pending = set(attempts)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        return attempt.result()
+                    error = attempt.exception()
+            raise error
+        finally:
+            for attempt in attempts:
+                if not attempt.done():
+                    attempt.cancel()
+
+    async def stream_request(self, provider: str, prompt: str, model: Optional[str] = None, max_tokens: Optional[int] = None, parameters: Optional[Dict[str, Any]] = None, bypass_cache: bool = False, result: Optional[RouteResult] = None,
+                             messages: Optional[List[Message]] = None, session_id: Optional[str] = None) -> AsyncGenerator[str, None]:
+        """Stream from `provider` or a model group. If given, `result` is filled with the serving provider/model before the first chunk.
+
+        `messages` and `session_id` are as for `route_request`; a session turn is stored only if the stream completes.
+        """
+        if result is None:
+            result = RouteResult()
+        self._validate_messages(messages)
+        if session_id:
+            turn = messages or [Message("user", prompt)]
+            async with self.sessions.turn(current_tenant.get(), session_id) as session:
+                chunks = []
+                stream = self.stream_request(provider, prompt, model, max_tokens, parameters, bypass_cache, result, session.history() + turn)
+                try:
+                    async for chunk in stream:
+                        chunks.append(chunk)
+                        yield chunk
+                finally:
+                    await stream.aclose()
+                self.sessions.append(session, turn + [Message("assistant", "".join(chunks))])
+            return
+        if provider in self.routing.groups:
+            async for chunk in self._stream_group(provider, prompt, max_tokens, parameters, bypass_cache, result, messages):
+                yield chunk
+            return
+
+        transport = current_transport.get()
+        validation_started_at = time.perf_counter()
+        with TRACER.span("router.validate", provider=provider):
+            model, max_tokens = self._resolve_input(provider, model, max_tokens)
+            if parameters is None:
+                parameters = {}
+            prompt_tokens = estimate_prompt_tokens(prompt, messages)
+            reservation = self.budgets.reserve(current_tenant.get(), prompt_tokens, max_tokens)
+            max_tokens = reservation.max_tokens
+        ROUTER_VALIDATION_SECONDS.observe((provider, transport), time.perf_counter() - validation_started_at)
+
+        result.provider = provider
+        result.model = model
+        stream = self._stream_single(provider, prompt, messages, model, max_tokens, parameters, bypass_cache, result, transport, prompt_tokens, reservation)
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+            self.budgets.settle(reservation, None)
+
+    async def _stream_single(self, provider: str, prompt: str, messages: Optional[List[Message]], model: str, max_tokens: int, parameters: Dict[str, Any], bypass_cache: bool,
+                             result: RouteResult, transport: str, prompt_tokens: int, reservation: BudgetReservation) -> AsyncGenerator[str, None]:
+        request_key = make_cache_key(provider, model, self._conversation_key(prompt, messages), max_tokens, parameters)
+        cacheable = not bypass_cache and self._is_cacheable(parameters)
+        if cacheable:
+            cached = await self.cache.get(request_key)
+            if cached is not None:
+                logger.info(f"Replaying cached response for {provider} model {model}")
+                result.cached = True
+                for offset in range(0, len(cached), self.cache_replay_chunk_size):
+                    yield cached[offset:offset + self.cache_replay_chunk_size]
+                return
+        semantic_scope = self._semantic_scope(provider, model, max_tokens, parameters, bypass_cache, messages)
+        semantic_hit = None
+        if semantic_scope is not None:
+            semantic_hit = self.semantic_cache.lookup(provider, semantic_scope, prompt)
+            if semantic_hit is not None and not semantic_hit.audit:
+                logger.info(f"Replaying semantic cache match ({semantic_hit.similarity:.3f}) for {provider} model {model}")
+                result.cached = True
+                for offset in range(0, len(semantic_hit.response), self.cache_replay_chunk_size):
+                    yield semantic_hit.response[offset:offset + self.cache_replay_chunk_size]
+                return
+
+        tracked = self._tracked_model(provider, model)
+
+        async def open_stream() -> AsyncGenerator[str, None]:
+            chunks = []
+            self.retry_budget.record_request()
+            attempt = 0
+            while True:
+                breaker = self.breakers.acquire(provider, tracked)
+                admitted = False
+                try:
+                    # Streams are shed on time to first chunk: one that starts in time still delivers output before its deadline.
+                    async with self.admission.admit(provider, tracked, prompt_tokens + max_tokens, tenant=reservation.tenant,
+                                                    expected_seconds=self.routing.stats_for(provider, tracked).ttft) as ticket:
+                        admitted = True
+                        logger.info(f"Streaming request to {provider} using model {model}")
+                        started_at = time.monotonic()
+                        labels = (provider, tracked, transport)
+                        last_chunk_at = None
+                        usage = Usage()
+                        try:
+                            # Ends when the stream completes, so its duration is the stream's.
+                            with TRACER.span("upstream.stream", provider=provider, model=model, attempt=attempt) as span:
+                                async for chunk in self.strategies[provider].stream(self.repositories[provider], prompt, model, max_tokens, parameters, usage, messages):
+                                    now = time.monotonic()
+                                    if last_chunk_at is None:
+                                        ticket.mark_first_chunk()
+                                        UPSTREAM_TTFT_SECONDS.observe(labels, now - started_at)
+                                        TRACER.record("upstream.ttft", started_at, now, span)
+                                    else:
+                                        STREAM_CHUNK_INTERVAL_SECONDS.observe(labels, now - last_chunk_at)
+                                    last_chunk_at = now
+                                    chunks.append(chunk)
+                                    yield chunk
+                                span.set_attribute("chunks", len(chunks))
+                        except AIRouterException as e:
+                            self._record_failure(provider, tracked, breaker, e)
+                            raise
+                        except BaseException:
+                            breaker.record_abandoned()
+                            raise
+                        finished_at = time.monotonic()
+                        first_chunk_at = ticket.first_chunk_at if ticket.first_chunk_at is not None else finished_at
+                        self._record_success(provider, tracked, breaker, first_chunk_at - started_at, finished_at - started_at)
+                        UPSTREAM_TOTAL_SECONDS.observe(labels, finished_at - started_at)
+                    break
+                except AIGenerationException as e:
+                    # Once output has been sent the stream cannot be transparently restarted.
+                    if ticket.first_chunk_at is not None:
+                        raise
+                    attempt = await self._before_retry(provider, model, attempt, e)
+                except BaseException:
+                    if not admitted:
+                        breaker.record_abandoned()
+                    raise
+            response = "".join(chunks)
+            if cacheable:
+                await self.cache.set(request_key, response)
+            if semantic_scope is not None:
+                self._remember_semantic(provider, semantic_scope, prompt, response, semantic_hit)
+            result.usage = self._account_usage(provider, tracked, usage, prompt_tokens, response)
+            self.budgets.settle(reservation, result.usage, provider)
+
+        if self._is_coalescable(parameters, bypass_cache):
+            stream = self.stream_coalescer.subscribe(f"{reservation.tenant}:{request_key}", open_stream)
+        else:
+            stream = open_stream()
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    async def _stream_group(self, group: str, prompt: str, max_tokens: Optional[int], parameters: Optional[Dict[str, Any]], bypass_cache: bool, result: RouteResult,
+                            messages: Optional[List[Message]]) -> AsyncGenerator[str, None]:
+        """Fail over to the next candidate as long as nothing has been sent to the caller yet.
+
+        With speculative streaming on for the request's priority, the top candidates are raced first.
+        """
+        candidates = self.routing.rank(group, streaming=True)
+        last_error: Optional[AIRouterException] = None
+        width = self.routing.race_width(group, current_priority.get())
+        if width > 1:
+            stream = self._stream_speculative(group, candidates[:width], prompt, max_tokens, parameters, bypass_cache, result, messages)
+            started = False
+            try:
+                async for chunk in stream:
+                    started = True
+                    yield chunk
+                return
+            except AIRouterException as e:
+                if started:
+                    raise
+                logger.warning(f"All {width} raced candidates of group '{group}' failed, falling back: {e}")
+                last_error = e
+            finally:
+                await stream.aclose()
+            candidates = candidates[width:]
+        for candidate in candidates:
+            stream = self.stream_request(candidate.provider, prompt, candidate.model, max_tokens, parameters, bypass_cache, result, messages)
+            started = False
+            try:
+                async for chunk in stream:
+                    started = True
+                    yield chunk
+                return
+            except AIRouterException as e:
+                if started:
+                    raise
+                logger.warning(f"Candidate {candidate.provider}/{candidate.model} of group '{group}' failed, falling back: {e}")
+                last_error = e
+            finally:
+                await stream.aclose()
+        raise last_error
+
+    @staticmethod
+    async def _first_chunk(stream: AsyncGenerator[str, None]) -> Optional[str]:
+        """The first non-empty chunk of `stream`, which is left open after it; None if the stream ends without one."""
+        async for chunk in stream:
+            if chunk:
+                return chunk
+        return None
+
+    async def _stream_speculative(self, group: str, candidates: List[Candidate], prompt: str, max_tokens: Optional[int], parameters: Optional[Dict[str, Any]],
+                                  bypass_cache: bool, result: RouteResult, messages: Optional[List[Message]]) -> AsyncGenerator[str, None]:
+        """Open a stream to every candidate at once and continue with the first to send text.
+
+        The other streams are closed as soon as there is a winner, which cancels their upstream calls. A
+        candidate that finishes without text only wins if none of the others sends any. If every candidate
+        fails, the last error is raised.
+        """
+        started_at = time.monotonic()
+        routes = [RouteResult() for _ in candidates]
+        streams = [self.stream_request(candidate.provider, prompt, candidate.model, max_tokens, parameters, bypass_cache, route, messages)
+                   for candidate, route in zip(candidates, routes)]
+        racers = {asyncio.ensure_future(self._first_chunk(stream)): index for index, stream in enumerate(streams)}
+        winner: Optional[int] = None
+        finished_empty: Optional[int] = None
+        first_chunk: Optional[str] = None
+        error: Optional[BaseException] = None
+        try:
+            pending = set(racers)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # On a tie the better-ranked candidate wins.
+                for racer in sorted(done, key=racers.get):
+                    index = racers[racer]
+                    if racer.exception() is not None:
+                        candidate = candidates[index]
+                        logger.warning(f"Raced candidate {candidate.provider}/{candidate.model} of group '{group}' failed: {racer.exception()}")
+                        error = racer.exception()
+                    elif racer.result() is None:
+                        if finished_empty is None:
+                            finished_empty = index
+                    elif winner is None:
+                        winner, first_chunk = index, racer.result()
+            if winner is None:
+                winner = finished_empty
+        finally:
+            for racer in racers:
+                racer.cancel()
+            await asyncio.gather(*racers, return_exceptions=True)
+            for index, stream in enumerate(streams):
+                if index != winner:
+                    await stream.aclose()
+        if winner is None:
+            raise error
+
+        candidate = candidates[winner]
+        ttft = time.monotonic() - started_at
+        self.speculative_streams += 1
+        SPECULATIVE_STREAM_WINS_TOTAL.inc((group, candidate.provider, candidate.model, str(winner)))
+        expected_ttft = self.routing.stats_for(candidates[0].provider, candidates[0].model).ttft
+        if winner == 0:
+            SPECULATIVE_TTFT_SAVED_SECONDS.observe((group,), 0.0)
+        elif expected_ttft is not None:
+            SPECULATIVE_TTFT_SAVED_SECONDS.observe((group,), max(0.0, expected_ttft - ttft))
+        logger.info(f"{candidate.provider}/{candidate.model} won the race of group '{group}' after {ttft:.3f}s")
+
+        route = routes[winner]
+        result.provider = route.provider
+        result.model = route.model
+        stream = streams[winner]
+        try:
+            if first_chunk is not None:
+                yield first_chunk
+                async for chunk in stream:
+                    yield chunk
+        finally:
+            await stream.aclose()
+        result.cached = route.cached
+        result.usage = route.usage
+
+    async def route_batch(self, requests: List[Dict[str, Any]], max_concurrency: Optional[int] = None, timeout: Optional[float] = None) -> AsyncGenerator[BatchItemResult, None]:
+        """Route many requests (each a dict of `route_request` arguments), yielding per-item outcomes as they complete."""
+        if len(requests) > self.batch_max_items:
+            raise BatchTooLargeException(f"Batch of {len(requests)} items exceeds the limit of {self.batch_max_items}")
+        concurrency = min(max_concurrency if max_concurrency and max_concurrency > 0 else self.batch_default_concurrency, self.batch_max_concurrency)
+        timeout = min(timeout, self.batch_timeout) if timeout and timeout > 0 else self.batch_timeout
+        logger.info(f"Routing batch of {len(requests)} items with concurrency {concurrency}")
+        items = run_batch(self.route_request, requests, concurrency, self.batch_max_concurrency_per_provider, timeout)
+        try:
+            async for item in items:
+                yield item
+        finally:
+            await items.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "semantic_cache": self.semantic_cache.stats() if self.semantic_cache is not None else None,
+            "admission": self.admission.stats(),
+            "token_budgets": self.budgets.stats(),
+            "sessions": self.sessions.stats(),
+            "idempotency": self.idempotency.stats() if self.idempotency is not None else None,
+            "circuit_breakers": self.breakers.stats(),
+            "http_pools": get_http_clients().stats(),
+            "providers": {"configured": list(self.providers.specs), "loaded": self.providers.loaded()},
+            "retry_budget": self.retry_budget.stats(),
+            "routing": {
+                "candidates": self.routing.stats(),
+                "hedged_requests": self.hedged_requests,
+                "speculative_streams": self.speculative_streams
+            },
+            "coalescing": {
+                "unary": self.single_flight.stats(),
+                "stream": self.stream_coalescer.stats()
+            }
+        }
 
-        if parameters is None:
-            parameters = {}
+_shared_router: Optional[AIRouter] = None
 
-        if max_tokens is None:
-            max_tokens = config.get_default_max_tokens(provider)
+def get_router() -> AIRouter:
+    """Return the process-wide router shared by the gRPC servicer and the in-process gateway transport."""
+    global _shared_router
+    if _shared_router is None:
+        _shared_router = AIRouter()
+        register_router_metrics(_shared_router)
+    return _shared_router
 
-        repository = self.repositories[provider]
-        strategy = self.strategies[provider]
+def register_router_metrics(router: AIRouter) -> None:
+    """Expose router state as gauges that are read at scrape time."""
+    def gates(attribute):
+        return lambda: [((provider, model), attribute(gate)) for (provider, model), gate in router.admission._gates.items()]
 
-        logger.info(f"Streaming request to {provider} using model {model}")
-        async for chunk in strategy.stream(repository, prompt, model, max_tokens, parameters):
-            yield chunk
+    REGISTRY.register(GaugeFamily("ai_router_admission_queued", "Requests waiting for admission",
+                                  ("provider", "model"), gates(lambda gate: gate.waiting)))
+    REGISTRY.register(GaugeFamily("ai_router_admission_in_flight", "Admitted requests in flight",
+                                  ("provider", "model"), gates(lambda gate: gate.limiter.in_flight)))
+    REGISTRY.register(GaugeFamily("ai_router_admission_concurrency_limit", "Current adaptive concurrency limit",
+                                  ("provider", "model"), gates(lambda gate: int(gate.limiter.limit))))
+    REGISTRY.register(GaugeFamily(
+        "ai_router_circuit_breaker_open", "1 while the circuit breaker rejects calls", ("provider", "model"),
+        lambda: [(key, int(not router.breakers.is_available(*key))) for key in list(router.breakers._breakers)]))
+    REGISTRY.register(GaugeFamily(
+        "ai_router_semantic_cache_entries", "Prompts held in the semantic cache index", (),
+        lambda: [((), router.semantic_cache.stats()["entries"])] if router.semantic_cache is not None else []))
@@ -0,0 +1,145 @@
+import random
+from collections import deque
+from dataclasses import dataclass
+from app.exceptions import ConfigurationException
+from app.repositories.base import Usage
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+@dataclass
+class RouteResult:
+    """What the router produced and which provider/model produced it.
+
+    `stream_request` fills `provider` and `model` of a caller-supplied
+    instance once a candidate has been chosen, and `usage` once the stream
+    has finished; `content` stays empty there. `usage` is None when nothing
+    was sent upstream (cache hits, coalesced streams).
+    """
+    content: str = ""
+    provider: str = ""
+    model: str = ""
+    cached: bool = False
+    usage: Optional[Usage] = None
+
+@dataclass(frozen=True)
+class Candidate:
+    provider: str
+    model: str
+
+class LatencyStats:
+    """EWMA of time-to-first-token, total latency and error rate, plus a window of recent totals for percentiles."""
+
+    def __init__(self, alpha: float, window: int):
+        self.alpha = alpha
+        self.ttft: Optional[float] = None
+        self.total: Optional[float] = None
+        self.error_rate = 0.0
+        self.samples = 0
+        self.recent_totals: Deque[float] = deque(maxlen=window)
+
+    def _ewma(self, current: Optional[float], value: float) -> float:
+        return value if current is None else current + self.alpha * (value - current)
+
+    def record_success(self, ttft: float, total: float) -> None:
+        self.ttft = self._ewma(self.ttft, ttft)
+        self.total = self._ewma(self.total, total)
+        self.error_rate += self.alpha * (0.0 - self.error_rate)
+        self.recent_totals.append(total)
+        self.samples += 1
+
+    def record_failure(self) -> None:
+        self.error_rate += self.alpha * (1.0 - self.error_rate)
+        self.samples += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.recent_totals:
+            return None
+        ordered = sorted(self.recent_totals)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+class LatencyAwareSelector:
+    """Orders the candidates of a model group by observed latency and health.
+
+    Candidates without samples rank first so each gets measured; a small
+    exploration ratio keeps estimates for the others fresh. Candidates over
+    the error-rate threshold, or reported unavailable (for example by an
+    open circuit breaker), are moved to the back instead of being dropped,
+    so a request always has something to try.
+    """
+
+    def __init__(self, routing_config: Dict[str, Any], known_providers: List[str]):
+        self.alpha = float(routing_config.get("ewma_alpha", 0.2))
+        self.window = int(routing_config.get("latency_window", 200))
+        self.error_rate_threshold = float(routing_config.get("error_rate_threshold", 0.5))
+        self.error_penalty = float(routing_config.get("error_penalty", 4.0))
+        self.explore_ratio = float(routing_config.get("explore_ratio", 0.05))
+        hedge_config = routing_config.get("hedge", {})
+        self.hedge_enabled = hedge_config.get("enabled", False)
+        self.hedge_percentile = float(hedge_config.get("percentile", 95))
+        self.hedge_min_samples = int(hedge_config.get("min_samples", 20))
+        speculative_config = routing_config.get("speculative_streaming", {})
+        self.speculative_enabled = speculative_config.get("enabled", False)
+        self.speculative_candidates = int(speculative_config.get("candidates", 2))
+        self.speculative_priorities = set(speculative_config.get("priorities", ["interactive"]))
+        self.is_available: Callable[[str, str], bool] = lambda provider, model: True
+        self.groups: Dict[str, List[Candidate]] = {}
+        for name, candidates in (routing_config.get("groups") or {}).items():
+            if name in known_providers:
+                raise ConfigurationException(f"Model group '{name}' clashes with a provider name")
+            self.groups[name] = []
+            for candidate in candidates:
+                if candidate["provider"] not in known_providers:
+                    raise ConfigurationException(f"Model group '{name}' references unknown provider '{candidate['provider']}'")
+                self.groups[name].append(Candidate(candidate["provider"], candidate["model"]))
+        self._stats: Dict[Tuple[str, str], LatencyStats] = {}
+
+    def stats_for(self, provider: str, model: str) -> LatencyStats:
+        stats = self._stats.get((provider, model))
+        if stats is None:
+            stats = self._stats[(provider, model)] = LatencyStats(self.alpha, self.window)
+        return stats
+
+    def rank(self, group: str, streaming: bool = False) -> List[Candidate]:
+        def score(candidate: Candidate) -> Tuple[int, float]:
+            stats = self.stats_for(candidate.provider, candidate.model)
+            healthy = self.is_available(candidate.provider, candidate.model) and stats.error_rate <= self.error_rate_threshold
+            latency = stats.ttft if streaming else stats.total
+            if latency is None:
+                return (0 if healthy else 1, 0.0)
+            return (0 if healthy else 1, latency * (1 + self.error_penalty * stats.error_rate))
+
+        ranked = sorted(self.groups[group], key=score)
+        if len(ranked) > 1 and random.random() < self.explore_ratio:
+            ranked[0], ranked[1] = ranked[1], ranked[0]
+        return ranked
+
+    def hedge_delay(self, candidate: Candidate) -> Optional[float]:
+        """How long to wait on `candidate` before sending a hedged duplicate, or None to not hedge."""
+        if not self.hedge_enabled:
+            return None
+        stats = self.stats_for(candidate.provider, candidate.model)
+        if len(stats.recent_totals) < self.hedge_min_samples:
+            return None
+        return stats.percentile(self.hedge_percentile)
+
+    def race_width(self, group: str, priority: str) -> int:
+        """How many top-ranked candidates of `group` a stream of `priority` races, or 1 to not race."""
+        if not self.speculative_enabled or priority not in self.speculative_priorities:
+            return 1
+        return max(1, min(self.speculative_candidates, len(self.groups[group])))
+
+    def record_success(self, provider: str, model: str, ttft: float, total: float) -> None:
+        self.stats_for(provider, model).record_success(ttft, total)
+
+    def record_failure(self, provider: str, model: str) -> None:
+        self.stats_for(provider, model).record_failure()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            f"{provider}/{model}": {
+                "ewma_ttft_seconds": stats.ttft,
+                "ewma_total_seconds": stats.total,
+                "error_rate": round(stats.error_rate, 4),
+                "samples": stats.samples,
+            }
+            for (provider, model), stats in self._stats.items()
+        }
@@ -0,0 +1,92 @@
+import heapq
+import itertools
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+
+PRIORITY_HEADER = "x-priority"
+# Seconds the caller is willing to wait for the whole request, for HTTP callers; gRPC callers set a deadline instead.
+TIMEOUT_HEADER = "x-request-timeout"
+
+# Scheduling class and absolute deadline (time.monotonic()) of the current request; set per request by the servicer and gateway.
+current_priority: ContextVar[str] = ContextVar("current_priority", default=INTERACTIVE)
+current_deadline: ContextVar[Optional[float]] = ContextVar("current_deadline", default=None)
+
+def parse_priority(value: Optional[str], default: str = INTERACTIVE) -> str:
+    value = (value or "").strip().lower()
+    return value if value in PRIORITIES else default
+
+def set_request_deadline(timeout: Optional[float]) -> None:
+    current_deadline.set(time.monotonic() + timeout if timeout else None)
+
+def parse_timeout(value: Optional[str]) -> Optional[float]:
+    try:
+        timeout = float(value) if value else None
+    except ValueError:
+        return None
+    return timeout if timeout and timeout > 0 else None
+
+Flow = Tuple[str, str]
+
+class FairQueue:
+    """Weighted fair queue of waiters, one flow per (priority class, tenant).
+
+    Self-clocked fair queueing: each waiter is tagged with a virtual finish
+    time of `max(virtual time, its flow's last tag) + 1 / weight`, and the
+    smallest tag is served first. A flow's weight is its class weight times
+    its tenant weight, so one tenant's backlog only delays others by its
+    share, and a bulk backlog delays an interactive request by about one
+    slot per `interactive / bulk` weight ratio. Waiters that gave up are
+    skipped when they reach the head.
+    """
+
+    def __init__(self, class_weights: Optional[Dict[str, float]] = None, tenant_weights: Optional[Dict[str, float]] = None):
+        self.class_weights = {INTERACTIVE: 8.0, BULK: 1.0, **(class_weights or {})}
+        self.tenant_weights = tenant_weights or {}
+        self.virtual_time = 0.0
+        self._heap: List[Tuple[float, int, Flow, Any]] = []
+        self._finish: Dict[Flow, float] = {}
+        self._sequence = itertools.count()
+
+    def _weight(self, flow: Flow) -> float:
+        priority, tenant = flow
+        return max(1e-6, float(self.class_weights.get(priority, 1.0)) * float(self.tenant_weights.get(tenant, 1.0)))
+
+    def push(self, flow: Flow, waiter: Any) -> None:
+        finish = max(self.virtual_time, self._finish.get(flow, 0.0)) + 1.0 / self._weight(flow)
+        self._finish[flow] = finish
+        heapq.heappush(self._heap, (finish, next(self._sequence), flow, waiter))
+
+    def _prune(self) -> None:
+        while self._heap and self._heap[0][3].done():
+            heapq.heappop(self._heap)
+        if not self._heap:
+            # Nothing is waiting, so every flow starts level again.
+            self._finish.clear()
+
+    def pop(self) -> Optional[Any]:
+        """The next waiter still waiting, or None."""
+        self._prune()
+        if not self._heap:
+            return None
+        finish, _, _, waiter = heapq.heappop(self._heap)
+        self.virtual_time = finish
+        if len(self._finish) > 4 * len(self._heap) + 64:
+            # Flows tagged at or before the virtual time would be tagged the same without an entry.
+            self._finish = {flow: tag for flow, tag in self._finish.items() if tag > finish}
+        return waiter
+
+    def __bool__(self) -> bool:
+        self._prune()
+        return bool(self._heap)
+
+    def queued(self) -> Dict[str, int]:
+        counts = {priority: 0 for priority in PRIORITIES}
+        for _, _, (priority, _), waiter in self._heap:
+            if not waiter.done():
+                counts[priority] = counts.get(priority, 0) + 1
+        return counts
@@ -0,0 +1,131 @@
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import replace
+from app.exceptions import ConfigurationException
+from app.repositories.base import Message
+from app.router.tokens import estimate_message_tokens
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+class Session:
+    __slots__ = ("messages", "tokens", "total_tokens", "updated_at", "lock", "truncations")
+
+    def __init__(self):
+        self.messages: List[Message] = []
+        self.tokens: List[int] = []
+        self.total_tokens = 0
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+        self.truncations = 0
+
+    def history(self) -> List[Message]:
+        """The stored turns, with the last one marked as the end of the cacheable prefix."""
+        if not self.messages:
+            return []
+        return self.messages[:-1] + [replace(self.messages[-1], cache_breakpoint=True)]
+
+class SessionStore:
+    """Conversation history kept server-side, so clients send only the new turn.
+
+    Sessions are keyed by tenant and session ID, evicted least recently used
+    beyond `max_sessions` and dropped after `ttl_seconds` idle. Turns of one
+    session run one at a time, so each sees the previous answer. When the
+    history passes `max_history_tokens`, the oldest turns are dropped until
+    it is down to `truncate_to` of the budget (system messages are kept).
+    Truncating well below the budget, rather than one turn at a time, keeps
+    the history prefix unchanged for several turns, so provider prompt
+    caches keep hitting in between.
+    """
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 3600, max_history_tokens: int = 8000, truncate_to: float = 0.75):
+        if not 0 < truncate_to <= 1:
+            raise ConfigurationException(f"sessions.truncate_to must be in (0, 1], got {truncate_to}")
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_history_tokens = max_history_tokens
+        self.truncate_to = truncate_to
+        self._sessions: "OrderedDict[Tuple[str, str], Session]" = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_config(cls, session_config: Dict[str, Any]) -> "SessionStore":
+        return cls(
+            max_sessions=int(session_config.get("max_sessions", 10000)),
+            ttl_seconds=float(session_config.get("ttl_seconds", 3600)),
+            max_history_tokens=int(session_config.get("max_history_tokens", 8000)),
+            truncate_to=float(session_config.get("truncate_to", 0.75))
+        )
+
+    def _get(self, key: Tuple[str, str]) -> Session:
+        session = self._sessions.get(key)
+        if session is not None and time.monotonic() - session.updated_at > self.ttl_seconds and not session.lock.locked():
+            del self._sessions[key]
+            self.expirations += 1
+            session = None
+        if session is None:
+            session = self._sessions[key] = Session()
+            self._evict()
+        else:
+            self._sessions.move_to_end(key)
+        return session
+
+    def _evict(self) -> None:
+        excess = len(self._sessions) - self.max_sessions
+        if excess <= 0:
+            return
+        evicted = []
+        for key, session in self._sessions.items():
+            if len(evicted) == excess:
+                break
+            # Sessions with a turn in progress are skipped so the turn's answer is not lost.
+            if not session.lock.locked():
+                evicted.append(key)
+        for key in evicted:
+            del self._sessions[key]
+        self.evictions += len(evicted)
+
+    @asynccontextmanager
+    async def turn(self, tenant: str, session_id: str) -> AsyncIterator[Session]:
+        session = self._get((tenant, session_id))
+        async with session.lock:
+            yield session
+            session.updated_at = time.monotonic()
+
+    def append(self, session: Session, messages: List[Message]) -> None:
+        for message in messages:
+            tokens = estimate_message_tokens(message.content)
+            session.messages.append(replace(message, cache_breakpoint=False))
+            session.tokens.append(tokens)
+            session.total_tokens += tokens
+        if session.total_tokens > self.max_history_tokens:
+            self._truncate(session)
+
+    def _truncate(self, session: Session) -> None:
+        target = self.max_history_tokens * self.truncate_to
+        # The latest question and everything after it are always kept.
+        last_user = max((index for index, message in enumerate(session.messages) if message.role == "user"), default=0)
+        keep = [True] * len(session.messages)
+        total = session.total_tokens
+        for index in range(last_user):
+            role = session.messages[index].role
+            if role == "system":
+                continue
+            # Past the target, keep dropping answers so the history does not open with one.
+            if total <= target and role != "assistant":
+                break
+            keep[index] = False
+            total -= session.tokens[index]
+        session.messages = [message for message, kept in zip(session.messages, keep) if kept]
+        session.tokens = [tokens for tokens, kept in zip(session.tokens, keep) if kept]
+        session.total_tokens = total
+        session.truncations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "max_history_tokens": self.max_history_tokens
+        }
@@ -0,0 +1,143 @@
+import logging
+from collections import OrderedDict
+from contextvars import ContextVar
+from app.exceptions import TokenBudgetExceededException
+from app.metrics import TENANT_BUDGET_DECISIONS_TOTAL, TENANT_TOKENS_TOTAL
+from app.repositories.base import Usage
+from app.router.admission import TokenBucket
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+TENANT_HEADER = "x-tenant-id"
+DEFAULT_TENANT = "default"
+
+# Who a request is billed to, from the x-tenant-id HTTP header or gRPC metadata; set per request by the servicer and gateway.
+current_tenant: ContextVar[str] = ContextVar("current_tenant", default=DEFAULT_TENANT)
+
+class TenantUsage:
+    __slots__ = ("requests", "prompt_tokens", "completion_tokens", "clipped", "rejected")
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.clipped = 0
+        self.rejected = 0
+
+class BudgetReservation:
+    """Tokens held for one request until `TenantBudgets.settle` replaces the estimate with actual usage."""
+
+    __slots__ = ("tenant", "bucket", "reserved", "max_tokens", "settled", "charged")
+
+    def __init__(self, tenant: str, bucket: Optional[TokenBucket], reserved: int, max_tokens: int):
+        self.tenant = tenant
+        self.bucket = bucket
+        self.reserved = reserved
+        self.max_tokens = max_tokens
+        self.settled = False
+        self.charged = False
+
+class TenantBudgets:
+    """Per-tenant token budgets, enforced before a request is sent.
+
+    Each tenant has a token bucket that refills at `tokens_per_second` and
+    holds up to `burst_seconds` of it. A request reserves its estimated
+    prompt tokens plus max_tokens. If that does not fit, the request is
+    clipped (max_tokens lowered to what is left) or rejected, depending on
+    `over_budget`. Once the provider reports usage, the reservation is
+    settled against it, so the bucket tracks what was actually consumed.
+    Usage is counted per tenant even with budgets disabled.
+    """
+
+    def __init__(self, budget_config: Dict[str, Any]):
+        self.enabled = bool(budget_config.get("enabled", False))
+        self.default_rate = float(budget_config.get("tokens_per_second", 0))
+        self.burst_seconds = float(budget_config.get("burst_seconds", 10))
+        self.over_budget = budget_config.get("over_budget", "clip")
+        self.min_max_tokens = int(budget_config.get("min_max_tokens", 16))
+        self.max_tracked_tenants = int(budget_config.get("max_tracked_tenants", 10000))
+        self.overrides: Dict[str, Dict[str, Any]] = budget_config.get("tenants") or {}
+        self._buckets: "OrderedDict[str, Optional[TokenBucket]]" = OrderedDict()
+        self._usage: "OrderedDict[str, TenantUsage]" = OrderedDict()
+
+    def _label(self, tenant: str) -> str:
+        # Metric labels are limited to configured tenants so arbitrary ids cannot blow up cardinality.
+        return tenant if tenant == DEFAULT_TENANT or tenant in self.overrides else "other"
+
+    def _tracked(self, table: "OrderedDict[str, Any]", tenant: str, create) -> Any:
+        value = table.get(tenant)
+        if value is None and tenant not in table:
+            value = table[tenant] = create()
+            if len(table) > self.max_tracked_tenants:
+                table.popitem(last=False)
+        else:
+            table.move_to_end(tenant)
+        return value
+
+    def _new_bucket(self, tenant: str) -> Optional[TokenBucket]:
+        rate = float(self.overrides.get(tenant, {}).get("tokens_per_second", self.default_rate))
+        if rate <= 0:
+            return None
+        return TokenBucket(rate * 60, capacity=rate * self.burst_seconds)
+
+    def reserve(self, tenant: str, prompt_tokens: int, max_tokens: int) -> BudgetReservation:
+        """Hold budget for a request; returns the max_tokens to send, clipped if needed. Raises TokenBudgetExceededException."""
+        bucket = self._tracked(self._buckets, tenant, lambda: self._new_bucket(tenant)) if self.enabled else None
+        if bucket is None:
+            return BudgetReservation(tenant, None, 0, max_tokens)
+        cost = prompt_tokens + max_tokens
+        available = bucket.available()
+        label = self._label(tenant)
+        if cost > available:
+            allowed = int(available) - prompt_tokens
+            if self.over_budget != "clip" or allowed < self.min_max_tokens:
+                self._tracked(self._usage, tenant, TenantUsage).rejected += 1
+                TENANT_BUDGET_DECISIONS_TOTAL.inc((label, "rejected"))
+                raise TokenBudgetExceededException(
+                    f"Tenant '{tenant}' token budget exceeded: request needs ~{cost} tokens, {max(0, int(available))} available")
+            max_tokens = allowed
+            cost = prompt_tokens + max_tokens
+            self._tracked(self._usage, tenant, TenantUsage).clipped += 1
+            TENANT_BUDGET_DECISIONS_TOTAL.inc((label, "clipped"))
+        else:
+            TENANT_BUDGET_DECISIONS_TOTAL.inc((label, "admitted"))
+        bucket.reserve(cost)
+        return BudgetReservation(tenant, bucket, cost, max_tokens)
+
+    def settle(self, reservation: BudgetReservation, usage: Optional[Usage], provider: str = "") -> None:
+        """Replace the reservation with `usage` (None: nothing reached the provider, release it all).
+
+        Usage still counts when it arrives after the reservation was released, as when the caller that
+        started a coalesced stream leaves while others keep reading it; it is then charged in full.
+        """
+        if reservation.charged or (reservation.settled and usage is None):
+            return
+        reserved = 0 if reservation.settled else reservation.reserved
+        reservation.settled = True
+        reservation.charged = usage is not None
+        consumed = usage.total_tokens if usage is not None else 0
+        if reservation.bucket is not None:
+            difference = reserved - consumed
+            if difference > 0:
+                reservation.bucket.refund(difference)
+            elif difference < 0:
+                reservation.bucket.reserve(-difference)
+        if usage is None:
+            return
+        tenant_usage = self._tracked(self._usage, reservation.tenant, TenantUsage)
+        tenant_usage.requests += 1
+        tenant_usage.prompt_tokens += usage.prompt_tokens
+        tenant_usage.completion_tokens += usage.completion_tokens
+        label = self._label(reservation.tenant)
+        TENANT_TOKENS_TOTAL.inc((label, provider, "prompt"), usage.prompt_tokens)
+        TENANT_TOKENS_TOTAL.inc((label, provider, "completion"), usage.completion_tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        tenants: Dict[str, Dict[str, Any]] = {}
+        for tenant, usage in list(self._usage.items()):
+            tenants[tenant] = {name: getattr(usage, name) for name in TenantUsage.__slots__}
+        for tenant, bucket in list(self._buckets.items()):
+            if bucket is not None:
+                tenants.setdefault(tenant, {})["budget_available"] = int(bucket.available())
+        return {"enabled": self.enabled, "over_budget": self.over_budget, "tenants": tenants}
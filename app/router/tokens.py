@@ -0,0 +1,36 @@
+import re
+import string
+from app.repositories.base import Message
+from typing import List, Optional
+
+_STRIP_SYMBOLS = str.maketrans("", "", string.punctuation)
+# Kana, CJK ideographs and Hangul come out at roughly one token per character.
+_WIDE = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]")
+
+def estimate_text_tokens(text: str) -> int:
+    """Fast local estimate of the tokens `text` encodes to with the providers' BPE tokenizers.
+
+    Takes the larger of ~4 characters per token and one token per word plus
+    one per ASCII symbol, so punctuation-heavy text and code are not
+    undercounted, and adds one per CJK character. Errs high rather than low,
+    which is the safe side for budgets. Only str builtins run for ASCII
+    text, so this costs a few microseconds per kilobyte.
+    """
+    if not text:
+        return 0
+    symbols = len(text) - len(text.translate(_STRIP_SYMBOLS))
+    estimate = max((len(text) + 3) // 4, len(text.split()) + symbols)
+    if not text.isascii():
+        estimate += len(_WIDE.findall(text))
+    return estimate
+
+# Role markers and separators the chat formats add around each message.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def estimate_message_tokens(content: str) -> int:
+    return estimate_text_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+def estimate_prompt_tokens(prompt: str, messages: Optional[List[Message]] = None) -> int:
+    if not messages:
+        return estimate_text_tokens(prompt)
+    return sum(estimate_message_tokens(message.content) for message in messages)
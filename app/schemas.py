@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, List, Literal, Optional
+
+class ChatMessage(BaseModel):
+    role: Literal["system", "user", "assistant"]
+    content: str
+
+class AIRequest(BaseModel):
+    provider: str
+    prompt: str = ""
+    model: Optional[str] = None
+    max_tokens: Optional[int] = None
+    parameters: Dict[str, str] = {}
+    bypass_cache: bool = False
+    # Sent instead of prompt; with session_id, only the new turn.
+    messages: List[ChatMessage] = []
+    session_id: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _require_input(self) -> "AIRequest":
+        if not self.prompt and not self.messages:
+            raise ValueError("either prompt or messages is required")
+        return self
+
+class BatchRequest(BaseModel):
+    requests: List[AIRequest]
+    max_concurrency: Optional[int] = Field(default=None, gt=0)
+    timeout_seconds: Optional[float] = Field(default=None, gt=0)
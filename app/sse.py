@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import re
+import time
+import uuid
+from collections import OrderedDict, deque
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+from typing import Any, AsyncIterator, Deque, Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LAST_EVENT_ID_HEADER = "last-event-id"
+
+# Comment frame; clients ignore it, proxies see traffic on an idle stream.
+HEARTBEAT = b": ping\n\n"
+_LINE_BREAK = re.compile(rb"\r\n|\r|\n")
+
+# An event is (event type or None for plain data, data).
+Event = Tuple[Optional[bytes], str]
+
+def encode_event(data: str, event: Optional[bytes] = None, event_id: Optional[bytes] = None) -> bytes:
+    """Frame one server-sent event.
+
+    Each line of `data` becomes its own `data:` field, so newlines inside a
+    token survive and the client reassembles them. Single-line data, which
+    is nearly every token, takes one join of the encoded text between
+    constant fragments.
+    """
+    # Searching the str is several times cheaper than searching the encoded bytes.
+    if event is None and "\n" not in data and "\r" not in data:
+        if event_id is None:
+            return b"".join((b"data: ", data.encode(), b"\n\n"))
+        return b"".join((b"id: ", event_id, b"\ndata: ", data.encode(), b"\n\n"))
+    parts = []
+    if event_id is not None:
+        parts += (b"id: ", event_id, b"\n")
+    if event is not None:
+        parts += (b"event: ", event, b"\n")
+    for line in _LINE_BREAK.split(data.encode()):
+        parts += (b"data: ", line, b"\n")
+    parts.append(b"\n")
+    return b"".join(parts)
+
+async def encode_events(events: AsyncIterator[Event]) -> AsyncIterator[bytes]:
+    async for event, data in events:
+        yield encode_event(data, event)
+
+class EventStreamResponse(Response):
+    """`text/event-stream` response that hands pre-encoded frames straight to the ASGI send.
+
+    While no frame has been sent for `heartbeat_seconds`, a comment frame is
+    sent so proxies and clients keep the connection open. The frame source
+    is cancelled when the client disconnects.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(self, frames: AsyncIterator[bytes], heartbeat_seconds: float = 0, headers: Optional[Mapping[str, str]] = None):
+        self.frames = frames
+        self.heartbeat_seconds = heartbeat_seconds
+        self.status_code = 200
+        self.background = None
+        # Proxies such as nginx would otherwise buffer the stream.
+        self.init_headers({"cache-control": "no-cache", "x-accel-buffering": "no", **(headers or {})})
+        self._last_sent = 0.0
+
+    async def _send_frames(self, send: Send) -> None:
+        try:
+            async for frame in self.frames:
+                await send({"type": "http.response.body", "body": frame, "more_body": True})
+                self._last_sent = time.monotonic()
+        finally:
+            aclose = getattr(self.frames, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _send_heartbeats(self, send: Send) -> None:
+        while True:
+            idle = time.monotonic() - self._last_sent
+            if idle < self.heartbeat_seconds:
+                await asyncio.sleep(self.heartbeat_seconds - idle)
+                continue
+            await send({"type": "http.response.body", "body": HEARTBEAT, "more_body": True})
+            self._last_sent = time.monotonic()
+
+    @staticmethod
+    async def _wait_for_disconnect(receive: Receive) -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        self._last_sent = time.monotonic()
+        sender = asyncio.ensure_future(self._send_frames(send))
+        tasks = {sender, asyncio.ensure_future(self._wait_for_disconnect(receive))}
+        if self.heartbeat_seconds > 0:
+            tasks.add(asyncio.ensure_future(self._send_heartbeats(send)))
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if sender.done() and not sender.cancelled() and sender.exception() is not None:
+            raise sender.exception()
+
+class ReplayLog:
+    """Encoded events of one stream, kept so a client can resume it with Last-Event-ID.
+
+    A producer task reads the events and appends them with ids
+    `<stream id>-<sequence>`. Clients follow the log from a sequence on.
+    The last `capacity` events are kept, and the producer pauses rather
+    than drop one that has not been sent yet. So a client that reconnects
+    within `detach_grace` seconds misses nothing. After that, the producer,
+    and with it the upstream call, is cancelled.
+    """
+
+    def __init__(self, stream_id: str, tenant: str, capacity: int, detach_grace: float):
+        self.stream_id = stream_id
+        self.tenant = tenant
+        self.capacity = capacity
+        self.detach_grace = detach_grace
+        self.frames: Deque[bytes] = deque()
+        self.first_sequence = 0
+        self.next_sequence = 0
+        # Highest sequence a client has been sent, plus one.
+        self.sent = 0
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._id_prefix = f"{stream_id}-".encode()
+        self._appended: Optional[asyncio.Future] = None
+        self._space: Optional[asyncio.Future] = None
+        self._detach_timer: Optional[asyncio.TimerHandle] = None
+
+    @staticmethod
+    def _wake(waiter: Optional[asyncio.Future]) -> None:
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def produce(self, events: AsyncIterator[Event]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            async for event, data in events:
+                while self.next_sequence - self.sent >= self.capacity:
+                    self._space = loop.create_future()
+                    await self._space
+                self.frames.append(encode_event(data, event, self._id_prefix + str(self.next_sequence).encode()))
+                self.next_sequence += 1
+                if len(self.frames) > self.capacity:
+                    self.frames.popleft()
+                    self.first_sequence += 1
+                self._wake(self._appended)
+        except Exception as e:
+            logger.error(f"Error producing stream {self.stream_id}: {e}")
+            self.error = e
+        finally:
+            self.done = True
+            self._wake(self._appended)
+            aclose = getattr(events, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def can_resume(self, sequence: int) -> bool:
+        return self.first_sequence <= sequence + 1 <= self.next_sequence
+
+    async def follow(self, after: int = -1) -> AsyncIterator[bytes]:
+        """Frames after sequence `after`, as they are produced; frames already waiting are sent together."""
+        loop = asyncio.get_running_loop()
+        self.followers += 1
+        if self._detach_timer is not None:
+            self._detach_timer.cancel()
+            self._detach_timer = None
+        cursor = after + 1
+        try:
+            while True:
+                if cursor < self.first_sequence:
+                    # Only possible when several clients follow at once and another one let the log move on.
+                    raise RuntimeError(f"Stream {self.stream_id} no longer holds event {cursor}")
+                if cursor < self.next_sequence:
+                    end = self.next_sequence
+                    offset = cursor - self.first_sequence
+                    frame = self.frames[offset] if end - cursor == 1 else b"".join([self.frames[index] for index in range(offset, offset + end - cursor)])
+                    yield frame
+                    cursor = end
+                    if cursor > self.sent:
+                        self.sent = cursor
+                        self._wake(self._space)
+                    continue
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                self._appended = loop.create_future()
+                await self._appended
+        finally:
+            self.followers -= 1
+            if self.followers == 0 and not self.done and self.task is not None:
+                self._detach_timer = loop.call_later(self.detach_grace, self.task.cancel)
+
+class ReplayStore:
+    """Recent streams of this process by stream id, from the `sse` section of config.yaml."""
+
+    def __init__(self, sse_config: Dict[str, Any]):
+        self.capacity = int(sse_config.get("replay_events", 256))
+        self.ttl = float(sse_config.get("replay_ttl_seconds", 60))
+        self.detach_grace = float(sse_config.get("detach_grace_seconds", 10))
+        self.max_streams = int(sse_config.get("max_streams", 10000))
+        self._logs: "OrderedDict[str, ReplayLog]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def start(self, tenant: str, events: AsyncIterator[Event]) -> ReplayLog:
+        log = ReplayLog(uuid.uuid4().hex, tenant, self.capacity, self.detach_grace)
+        log.task = asyncio.ensure_future(log.produce(events))
+        log.task.add_done_callback(lambda _: asyncio.get_running_loop().call_later(self.ttl, self._logs.pop, log.stream_id, None))
+        self._logs[log.stream_id] = log
+        if len(self._logs) > self.max_streams:
+            # Streams are only forgotten early once finished; running ones are bounded by the server's concurrency.
+            finished = next((stream_id for stream_id, other in self._logs.items() if other.done), None)
+            if finished is not None:
+                del self._logs[finished]
+        return log
+
+    def find(self, tenant: str, last_event_id: str) -> Optional[Tuple[ReplayLog, int]]:
+        """The log and sequence `last_event_id` points at, or None if that stream can no longer be resumed."""
+        stream_id, _, sequence = last_event_id.strip().rpartition("-")
+        log = self._logs.get(stream_id)
+        if log is None or log.tenant != tenant or not sequence.isdigit() or not log.can_resume(int(sequence)):
+            return None
+        return log, int(sequence)
@@ -0,0 +1,46 @@
+import asyncio
+import grpc
+from app.exceptions import (AdmissionTimeoutException, AIRouterException, BatchTooLargeException, CircuitOpenException, DeadlineUnattainableException,
+                            IdempotencyKeyReusedException, InvalidRequestException, ModelNotFoundException, ProviderNotFoundException,
+                            RateLimitedException, TokenBudgetExceededException)
+
+GRPC_STATUS_CODES = {
+    ProviderNotFoundException: grpc.StatusCode.INVALID_ARGUMENT,
+    ModelNotFoundException: grpc.StatusCode.INVALID_ARGUMENT,
+    InvalidRequestException: grpc.StatusCode.INVALID_ARGUMENT,
+    BatchTooLargeException: grpc.StatusCode.INVALID_ARGUMENT,
+    AdmissionTimeoutException: grpc.StatusCode.RESOURCE_EXHAUSTED,
+    RateLimitedException: grpc.StatusCode.RESOURCE_EXHAUSTED,
+    CircuitOpenException: grpc.StatusCode.UNAVAILABLE,
+    TokenBudgetExceededException: grpc.StatusCode.RESOURCE_EXHAUSTED,
+    DeadlineUnattainableException: grpc.StatusCode.DEADLINE_EXCEEDED,
+    IdempotencyKeyReusedException: grpc.StatusCode.FAILED_PRECONDITION,
+}
+
+HTTP_STATUS_CODES = {
+    grpc.StatusCode.INVALID_ARGUMENT: 400,
+    grpc.StatusCode.RESOURCE_EXHAUSTED: 429,
+    grpc.StatusCode.UNAVAILABLE: 503,
+    grpc.StatusCode.DEADLINE_EXCEEDED: 504,
+    grpc.StatusCode.FAILED_PRECONDITION: 422,
+}
+
+def grpc_status_for(error: Exception) -> grpc.StatusCode:
+    """gRPC status for a router exception; anything unmapped (e.g. a provider failure) is INTERNAL."""
+    for cls in type(error).__mro__:
+        if cls in GRPC_STATUS_CODES:
+            return GRPC_STATUS_CODES[cls]
+    return grpc.StatusCode.INTERNAL
+
+def http_status_for(error: Exception) -> int:
+    """HTTP status for a gRPC error or router exception; anything unmapped is 500."""
+    code = error.code() if isinstance(error, grpc.RpcError) else grpc_status_for(error)
+    return HTTP_STATUS_CODES.get(code, 500)
+
+def item_status_for(error: BaseException) -> grpc.StatusCode:
+    """gRPC status for a failed batch item, which may also have timed out or failed unexpectedly."""
+    if isinstance(error, AIRouterException):
+        return grpc_status_for(error)
+    if isinstance(error, asyncio.TimeoutError):
+        return grpc.StatusCode.DEADLINE_EXCEEDED
+    return grpc.StatusCode.INTERNAL
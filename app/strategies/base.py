@@ -1,12 +1,25 @@
 from abc import ABC, abstractmethod
-from app.repositories.base import BaseAIRepository
-from typing import AsyncGenerator, Optional
+from app.repositories.base import BaseAIRepository, Message, Usage
+from typing import AsyncGenerator, List, Optional
 
 class BaseAIStrategy(ABC):
     @abstractmethod
-    async def execute(self, repository: BaseAIRepository, prompt: str, model: str, max_tokens: int, parameters: dict) -> Optional[str]:
+    async def execute(self, repository: BaseAIRepository, prompt: str, model: str, max_tokens: int, parameters: dict, usage: Optional[Usage] = None,
+                      messages: Optional[List[Message]] = None) -> Optional[str]:
         pass
 
     @abstractmethod
-    def stream(self, repository: BaseAIRepository, prompt: str, model: str, max_tokens: int, parameters: dict) -> AsyncGenerator[Optional[str], None]:
+    def stream(self, repository: BaseAIRepository, prompt: str, model: str, max_tokens: int, parameters: dict, usage: Optional[Usage] = None,
+               messages: Optional[List[Message]] = None) -> AsyncGenerator[Optional[str], None]:
         pass
+
+class PassthroughStrategy(BaseAIStrategy):
+    """Hands the request to the repository unchanged; the default for providers configured without a strategy."""
+
+    async def execute(self, repository: BaseAIRepository, prompt: str, model: str, max_tokens: int, parameters: dict, usage: Optional[Usage] = None,
+                      messages: Optional[List[Message]] = None) -> Optional[str]:
+        return await repository.generate_response(prompt, model, max_tokens, parameters, usage, messages)
+
+    def stream(self, repository: BaseAIRepository, prompt: str, model: str, max_tokens: int, parameters: dict, usage: Optional[Usage] = None,
+               messages: Optional[List[Message]] = None) -> AsyncGenerator[Optional[str], None]:
+        return repository.stream_response(prompt, model, max_tokens, parameters, usage, messages)
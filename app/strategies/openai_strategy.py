@@ -1,10 +1,12 @@
 from .base import BaseAIStrategy
-from app.repositories.base import BaseAIRepository
-from typing import AsyncGenerator, Optional
+from app.repositories.base import BaseAIRepository, Message, Usage
+from typing import AsyncGenerator, List, Optional
 
 class OpenAIStrategy(BaseAIStrategy):
-    async def execute(self, repository: BaseAIRepository, prompt: str, model: str, max_tokens: int, parameters: dict) -> Optional[str]:
-        return await repository.generate_response(prompt, model, max_tokens, parameters)
+    async def execute(self, repository: BaseAIRepository, prompt: str, model: str, max_tokens: int, parameters: dict, usage: Optional[Usage] = None,
+                      messages: Optional[List[Message]] = None) -> Optional[str]:
+        return await repository.generate_response(prompt, model, max_tokens, parameters, usage, messages)
 
-    def stream(self, repository: BaseAIRepository, prompt: str, model: str, max_tokens:int, parameters: dict) -> AsyncGenerator[Optional[str], None]:
-        return repository.stream_response(prompt, model, max_tokens, parameters)
+    def stream(self, repository: BaseAIRepository, prompt: str, model: str, max_tokens:int, parameters: dict, usage: Optional[Usage] = None,
+               messages: Optional[List[Message]] = None) -> AsyncGenerator[Optional[str], None]:
+        return repository.stream_response(prompt, model, max_tokens, parameters, usage, messages)
@@ -0,0 +1,127 @@
+import asyncio
+from collections import deque
+from app.config import config
+from typing import AsyncGenerator, Deque, Optional
+
+class StreamSettings:
+    """How token deltas are merged into frames, from the `streaming` section of config.yaml."""
+
+    def __init__(self, streaming_config: dict):
+        self.flush_size = int(streaming_config.get("flush_size", 256))
+        self.flush_interval = float(streaming_config.get("flush_interval_ms", 20)) / 1000
+        self.max_pending_chunks = max(1, int(streaming_config.get("max_pending_chunks", 64)))
+
+    @property
+    def enabled(self) -> bool:
+        return self.flush_size > 1 and self.flush_interval > 0
+
+    @classmethod
+    def from_config(cls) -> "StreamSettings":
+        return cls(config.get_section("streaming"))
+
+async def coalesce_chunks(stream: AsyncGenerator[str, None], settings: StreamSettings) -> AsyncGenerator[str, None]:
+    """Merge small chunks of `stream` into fewer, larger ones.
+
+    The first chunk is passed through at once so time to first token does
+    not suffer. After that, chunks are buffered until `flush_size` characters
+    have accumulated or `flush_interval` has passed since the first buffered
+    chunk, whichever comes first. Upstream is read by a pump task that stops
+    once `max_pending_chunks` are waiting, so a slow consumer pauses the
+    upstream read instead of growing a buffer. For a router stream, the pause
+    reaches the provider once the coalescing fan-out buffer is full too.
+    """
+    if not settings.enabled:
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+        return
+
+    loop = asyncio.get_running_loop()
+    pending: Deque[str] = deque()
+    data_waiter: Optional[asyncio.Future] = None
+    space_waiter: Optional[asyncio.Future] = None
+    done = False
+    error: Optional[BaseException] = None
+
+    pending_size = 0
+    wanted = 1
+
+    def wake(waiter: Optional[asyncio.Future]) -> None:
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def pump() -> None:
+        nonlocal done, error, space_waiter, pending_size
+        try:
+            async for chunk in stream:
+                while len(pending) >= settings.max_pending_chunks:
+                    space_waiter = loop.create_future()
+                    await space_waiter
+                pending.append(chunk)
+                pending_size += len(chunk)
+                # Only wake the consumer once it has enough to flush; the timer covers the rest.
+                if pending_size >= wanted or len(pending) >= settings.max_pending_chunks:
+                    wake(data_waiter)
+        except Exception as e:
+            error = e
+        finally:
+            done = True
+            wake(data_waiter)
+            await stream.aclose()
+
+    async def wait_for_data(size: int, timeout: Optional[float] = None) -> None:
+        nonlocal data_waiter, wanted
+        wanted = size
+        data_waiter = loop.create_future()
+        timer = loop.call_later(timeout, wake, data_waiter) if timeout is not None else None
+        try:
+            await data_waiter
+        finally:
+            data_waiter = None
+            if timer is not None:
+                timer.cancel()
+
+    def take() -> str:
+        nonlocal pending_size
+        chunk = pending.popleft()
+        pending_size -= len(chunk)
+        return chunk
+
+    pump_task = asyncio.ensure_future(pump())
+    try:
+        first = True
+        while True:
+            if not pending and not done:
+                await wait_for_data(1)
+            if not pending:
+                break
+            if first:
+                first = False
+                chunk = take()
+                wake(space_waiter)
+                yield chunk
+                continue
+
+            parts = []
+            size = 0
+            deadline = loop.time() + settings.flush_interval
+            while True:
+                while pending and size < settings.flush_size:
+                    chunk = take()
+                    parts.append(chunk)
+                    size += len(chunk)
+                wake(space_waiter)
+                if size >= settings.flush_size or done:
+                    break
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                await wait_for_data(settings.flush_size - size, remaining)
+            yield "".join(parts)
+        if error is not None:
+            raise error
+    finally:
+        pump_task.cancel()
+        await asyncio.gather(pump_task, return_exceptions=True)
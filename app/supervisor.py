@@ -0,0 +1,110 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from multiprocessing.connection import wait
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Bind the listening socket once in the supervisor so every worker accepts from it."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+class WorkerSupervisor:
+    """Runs `target(*args)` in N worker processes, restarting any that die.
+
+    SIGTERM/SIGINT are forwarded to the workers, which drain on their own; any
+    worker still alive after `shutdown_timeout` seconds is killed. SIGHUP is
+    passed on to every worker so they all reload their config.
+    """
+
+    def __init__(self, target: Callable[..., Any], args: Tuple[Any, ...], workers: int,
+                 shutdown_timeout: float = 30.0, min_uptime: float = 5.0, max_restart_delay: float = 30.0):
+        self.target = target
+        self.args = args
+        self.workers = workers
+        self.shutdown_timeout = shutdown_timeout
+        self.min_uptime = min_uptime
+        self.max_restart_delay = max_restart_delay
+        # spawn rather than fork: gRPC core state must not be inherited across fork().
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        self._started_at: List[float] = [0.0] * workers
+        self._restart_delay: List[float] = [0.0] * workers
+        self._restart_at: List[float] = [0.0] * workers
+        self._stopping = False
+
+    def run(self) -> None:
+        previous_handlers = {sig: signal.signal(sig, self._request_stop) for sig in (signal.SIGTERM, signal.SIGINT)}
+        if hasattr(signal, "SIGHUP"):
+            previous_handlers[signal.SIGHUP] = signal.signal(signal.SIGHUP, self._forward_reload)
+        try:
+            for index in range(self.workers):
+                self._start_worker(index)
+            while not self._stopping:
+                self._supervise()
+        finally:
+            self._shutdown()
+            for sig, handler in previous_handlers.items():
+                signal.signal(sig, handler)
+
+    def _request_stop(self, signum: int, frame: Any) -> None:
+        logger.info(f"Received signal {signum}, stopping workers...")
+        self._stopping = True
+
+    def _forward_reload(self, signum: int, frame: Any) -> None:
+        logger.info("Received SIGHUP, asking workers to reload their config")
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                os.kill(process.pid, signum)
+
+    def _start_worker(self, index: int) -> None:
+        process = self._context.Process(target=self.target, args=self.args, name=f"ai-router-worker-{index}")
+        process.start()
+        self._processes[index] = process
+        self._started_at[index] = time.monotonic()
+        logger.info(f"Started worker {index} (pid {process.pid})")
+
+    def _supervise(self) -> None:
+        sentinels = [process.sentinel for process in self._processes if process is not None and process.is_alive()]
+        wait(sentinels, timeout=1.0)
+        now = time.monotonic()
+        for index, process in enumerate(self._processes):
+            if self._stopping:
+                return
+            if process is not None and not process.is_alive():
+                process.join()
+                uptime = now - self._started_at[index]
+                if uptime < self.min_uptime:
+                    # Crash loop: back off exponentially instead of spinning.
+                    self._restart_delay[index] = min(self.max_restart_delay, max(1.0, self._restart_delay[index] * 2))
+                else:
+                    self._restart_delay[index] = 0.0
+                self._restart_at[index] = now + self._restart_delay[index]
+                logger.warning(f"Worker {index} (pid {process.pid}) exited with code {process.exitcode}, "
+                               f"restarting in {self._restart_delay[index]:.0f}s")
+                self._processes[index] = None
+            if self._processes[index] is None and now >= self._restart_at[index]:
+                self._start_worker(index)
+
+    def _shutdown(self) -> None:
+        alive = [process for process in self._processes if process is not None and process.is_alive()]
+        for process in alive:
+            process.terminate()
+        deadline = time.monotonic() + self.shutdown_timeout
+        for process in alive:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Worker pid {process.pid} did not stop in time, killing it")
+                process.kill()
+                process.join()
+        logger.info("All workers stopped")
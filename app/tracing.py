@@ -0,0 +1,246 @@
+import atexit
+import importlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from app.config import config
+from app.exceptions import ConfigurationException
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# W3C trace context, as an HTTP header and as gRPC metadata.
+TRACEPARENT_HEADER = "traceparent"
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+class Span:
+    """One timed operation of a trace. Times are time.monotonic(); exporters convert them to wall-clock time.
+
+    A span that is not `recording` only carries the trace context of an
+    unsampled trace, so it can still be propagated; nothing is recorded on it.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "recording", "start", "end", "attributes", "events", "error")
+
+    def __init__(self, name: str, trace_id: str, span_id: str, parent_id: Optional[str], recording: bool,
+                 start: Optional[float] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.recording = recording
+        self.start = time.monotonic() if start is None else start
+        self.end: Optional[float] = None
+        self.attributes = attributes if attributes is not None else {}
+        self.events: List[Tuple[float, str]] = []
+        self.error: Optional[str] = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.recording else '00'}"
+
+    def set_attribute(self, name: str, value: Any) -> None:
+        if self.recording:
+            self.attributes[name] = value
+
+    def add_event(self, name: str) -> None:
+        if self.recording:
+            self.events.append((time.monotonic(), name))
+
+    def record_error(self, error: BaseException) -> None:
+        if self.recording:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self, wall_offset: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_unix_nano": int((self.start + wall_offset) * 1e9),
+            "end_unix_nano": int((self.end + wall_offset) * 1e9) if self.end is not None else None,
+            "duration_ms": (self.end - self.start) * 1000 if self.end is not None else None,
+            "attributes": self.attributes,
+            "events": [{"name": name, "unix_nano": int((at + wall_offset) * 1e9)} for at, name in self.events],
+            "error": self.error,
+        }
+
+# Stands in for every span while tracing is disabled.
+NOOP_SPAN = Span("noop", "0" * 32, "0" * 16, None, False, start=0.0)
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+class SpanScope:
+    """`with` block that makes a span current and ends it on exit, recording any exception that escapes."""
+
+    __slots__ = ("span", "token")
+
+    def __init__(self, span: Span):
+        self.span = span
+        self.token = None
+
+    def __enter__(self) -> Span:
+        self.token = current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc is not None:
+            self.span.record_error(exc)
+        TRACER.end(self.span)
+        try:
+            current_span.reset(self.token)
+        except ValueError:
+            # Exited in another context, as when the event loop finalizes an abandoned async generator.
+            pass
+
+class _NoopScope:
+    __slots__ = ()
+
+    def __enter__(self) -> Span:
+        return current_span.get() or NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        pass
+
+_NOOP_SCOPE = _NoopScope()
+
+class SpanExporter:
+    """Receives finished, sampled spans. Subclasses are named in `tracing.exporter` as "module:Class"."""
+
+    def export(self, span: Span) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        pass
+
+class InMemorySpanExporter(SpanExporter):
+    """Keeps the last `max_spans` finished spans in the process, for tests."""
+
+    def __init__(self, tracing_config: Dict[str, Any]):
+        self.spans: Deque[Span] = deque(maxlen=int(tracing_config.get("max_spans", 10000)))
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def trace(self, trace_id: str) -> List[Span]:
+        return sorted((span for span in self.spans if span.trace_id == trace_id), key=lambda span: span.start)
+
+class FileSpanExporter(SpanExporter):
+    """Appends spans as JSON lines to `tracing.file_path`, through a buffered file flushed at exit."""
+
+    def __init__(self, tracing_config: Dict[str, Any]):
+        self.path = tracing_config.get("file_path", "traces.jsonl")
+        self.wall_offset = time.time() - time.monotonic()
+        self._file = open(self.path, "a", buffering=64 * 1024)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(self.wall_offset), default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._file.close()
+
+EXPORTERS = {
+    "memory": InMemorySpanExporter,
+    "file": FileSpanExporter,
+}
+
+def _create_exporter(tracing_config: Dict[str, Any]) -> SpanExporter:
+    name = tracing_config.get("exporter", "memory")
+    exporter_class = EXPORTERS.get(name)
+    if exporter_class is None:
+        module_name, _, attribute = name.partition(":")
+        try:
+            exporter_class = getattr(importlib.import_module(module_name), attribute)
+        except (ImportError, AttributeError, ValueError) as e:
+            raise ConfigurationException(f"Could not load span exporter '{name}': {e}")
+    return exporter_class(tracing_config)
+
+class Tracer:
+    """Creates spans and hands sampled ones to the exporter, from the `tracing` section of config.yaml.
+
+    Sampling is decided once per trace: a trace that arrives with a
+    traceparent follows the caller's sampled flag, and a new one is sampled
+    with probability `sample_ratio`. An unsampled trace gets one
+    non-recording span whose ids are propagated; nothing under it is
+    recorded. With tracing disabled, every span is NOOP_SPAN and nothing is
+    propagated.
+    """
+
+    def __init__(self, tracing_config: Dict[str, Any]):
+        self.enabled = bool(tracing_config.get("enabled", False))
+        self.sample_ratio = float(tracing_config.get("sample_ratio", 0.01))
+        self.exporter = _create_exporter(tracing_config) if self.enabled else SpanExporter()
+        self._random = random.Random()
+        if self.enabled:
+            atexit.register(self.exporter.shutdown)
+
+    def _id(self, size: int) -> str:
+        return self._random.getrandbits(size * 8).to_bytes(size, "big").hex()
+
+    def start_span(self, name: str, traceparent: Optional[str] = None, parent: Optional[Span] = None,
+                   start: Optional[float] = None, **attributes: Any) -> Span:
+        """Start a span under `traceparent` (a remote caller), `parent`, or the current span, in that order."""
+        if not self.enabled:
+            return NOOP_SPAN
+        if traceparent:
+            match = _TRACEPARENT.match(traceparent.strip().lower())
+            if match is not None:
+                trace_id, parent_id, flags = match.groups()
+                return Span(name, trace_id, self._id(8), parent_id, bool(int(flags, 16) & 1), start, attributes)
+        if parent is None:
+            parent = current_span.get()
+        if parent is None or parent is NOOP_SPAN:
+            # An unsampled trace still gets its own ids; they are propagated so the next hop does not sample it either.
+            recording = self._random.random() < self.sample_ratio
+            return Span(name, self._id(16), self._id(8), None, recording, start, attributes if recording else None)
+        if not parent.recording:
+            # Unsampled: the parent's context is all there is to propagate.
+            return parent
+        return Span(name, parent.trace_id, self._id(8), parent.span_id, True, start, attributes)
+
+    def span(self, name: str, traceparent: Optional[str] = None, **attributes: Any):
+        """`with TRACER.span(name):` runs the block in a new current span."""
+        if not self.enabled:
+            return _NOOP_SCOPE
+        span = self.start_span(name, traceparent, **attributes)
+        if not span.recording and span is current_span.get():
+            return _NOOP_SCOPE
+        return SpanScope(span)
+
+    def end(self, span: Span, end: Optional[float] = None) -> None:
+        if span.recording and span.end is None:
+            span.end = time.monotonic() if end is None else end
+            self.exporter.export(span)
+
+    def record(self, name: str, start: float, end: float, parent: Optional[Span] = None, error: Optional[BaseException] = None,
+               **attributes: Any) -> None:
+        """Record an operation that has already happened, timed by the caller, under `parent` or the current span."""
+        if not self.enabled:
+            return
+        if parent is None:
+            parent = current_span.get()
+        if parent is None or not parent.recording:
+            return
+        span = Span(name, parent.trace_id, self._id(8), parent.span_id, True, start, attributes)
+        if error is not None:
+            span.record_error(error)
+        self.end(span, end)
+
+def inject(span: Optional[Span] = None) -> Tuple[Tuple[str, str], ...]:
+    """Metadata carrying the trace context of `span` or the current span, for outgoing calls."""
+    if span is None:
+        span = current_span.get()
+    if span is None or span is NOOP_SPAN:
+        return ()
+    return ((TRACEPARENT_HEADER, span.traceparent),)
+
+TRACER = Tracer(config.get_section("tracing"))
@@ -0,0 +1,269 @@
+import grpc
+import logging
+import time
+from abc import ABC, abstractmethod
+from app import ai_router_pb2
+from app.config import config
+from app.exceptions import ConfigurationException
+from app.grpc_pool import GrpcChannelPool
+from app.http_clients import get_http_clients
+from app.metrics import GRPC_HOP_SECONDS, Timer, current_transport
+from app.repositories.base import Message, Usage
+from app.router.batch import BatchItemResult
+from app.router.router import AIRouter, get_router
+from app.router.routing import RouteResult
+from app.router.idempotency import IDEMPOTENCY_HEADER, current_idempotency_key
+from app.router.scheduler import PRIORITY_HEADER, current_deadline, current_priority
+from app.router.tenants import TENANT_HEADER, current_tenant
+from app.schemas import AIRequest, BatchRequest
+from app.status_codes import HTTP_STATUS_CODES, item_status_for
+from app.streaming import StreamSettings, coalesce_chunks
+from app.tracing import TRACER, Span, inject
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+GRPC_TRANSPORT = "grpc"
+IN_PROCESS_TRANSPORT = "in_process"
+
+def create_grpc_request(request: AIRequest) -> ai_router_pb2.AIRequest:
+    grpc_request = ai_router_pb2.AIRequest(
+        provider=request.provider,
+        prompt=request.prompt,
+        parameters=request.parameters,
+        bypass_cache=request.bypass_cache,
+        messages=[ai_router_pb2.Message(role=message.role, content=message.content) for message in request.messages],
+        session_id=request.session_id or ""
+    )
+    if request.max_tokens is not None:
+        grpc_request.max_tokens = request.max_tokens
+    if request.model is not None:
+        grpc_request.model = request.model
+    return grpc_request
+
+def create_grpc_batch_request(request: BatchRequest) -> ai_router_pb2.BatchRequest:
+    return ai_router_pb2.BatchRequest(
+        requests=[create_grpc_request(item) for item in request.requests],
+        max_concurrency=request.max_concurrency or 0,
+        timeout_seconds=request.timeout_seconds or 0
+    )
+
+def usage_dict(usage: Optional[Usage]) -> Optional[Dict[str, Any]]:
+    if usage is None:
+        return None
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+        "estimated": usage.estimated,
+        "cached_prompt_tokens": usage.cached_prompt_tokens
+    }
+
+def _usage_from_message(response: ai_router_pb2.AIResponse) -> Optional[Usage]:
+    if not response.HasField("usage"):
+        return None
+    return Usage(response.usage.prompt_tokens, response.usage.completion_tokens, response.usage.estimated, response.usage.cached_prompt_tokens)
+
+def route_arguments(request: AIRequest) -> Dict[str, Any]:
+    """`AIRouter.route_request` arguments for a gateway request."""
+    return {
+        "provider": request.provider,
+        "prompt": request.prompt,
+        "model": request.model,
+        "max_tokens": request.max_tokens,
+        "parameters": dict(request.parameters),
+        "bypass_cache": request.bypass_cache,
+        "messages": [Message(message.role, message.content) for message in request.messages] or None,
+        "session_id": request.session_id
+    }
+
+def _batch_item_error(index: int, code: grpc.StatusCode, error: str) -> Dict[str, Any]:
+    return {"index": index, "error": error, "status_code": HTTP_STATUS_CODES.get(code, 500)}
+
+class BaseGatewayTransport(ABC):
+    """How the HTTP gateway reaches the router."""
+
+    name: str
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    @abstractmethod
+    async def generate(self, request: AIRequest) -> Dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def stream(self, request: AIRequest, result: Optional[RouteResult] = None) -> AsyncGenerator[str, None]:
+        """Content chunks; if given, `result.usage` is filled once the stream has finished."""
+
+    @abstractmethod
+    def stream_batch(self, request: BatchRequest) -> AsyncGenerator[Dict[str, Any], None]:
+        """Per-item results as they complete."""
+
+    async def generate_batch(self, request: BatchRequest) -> List[Dict[str, Any]]:
+        """Per-item results in request order."""
+        results: List[Optional[Dict[str, Any]]] = [None] * len(request.requests)
+        async for item in self.stream_batch(request):
+            results[item["index"]] = item
+        return results
+
+class GrpcTransport(BaseGatewayTransport):
+    """Forwards requests over pooled gRPC channels, for deployments where the router runs elsewhere."""
+
+    name = GRPC_TRANSPORT
+
+    def __init__(self, pool: GrpcChannelPool):
+        self.pool = pool
+
+    async def start(self) -> None:
+        await self.pool.start()
+
+    async def close(self) -> None:
+        await self.pool.close(grace=5)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"grpc_pool": self.pool.stats()}
+
+    @staticmethod
+    def _call_options(span: Optional[Span] = None) -> Dict[str, Any]:
+        """Tenant, priority, idempotency key and trace context as metadata, and the request deadline as the call's gRPC deadline."""
+        metadata = ((TENANT_HEADER, current_tenant.get()), (PRIORITY_HEADER, current_priority.get())) + inject(span)
+        idempotency_key = current_idempotency_key.get()
+        if idempotency_key:
+            metadata += ((IDEMPOTENCY_HEADER, idempotency_key),)
+        options: Dict[str, Any] = {"metadata": metadata}
+        deadline = current_deadline.get()
+        if deadline is not None:
+            options["timeout"] = max(0.0, deadline - time.monotonic())
+        return options
+
+    async def generate(self, request: AIRequest) -> Dict[str, Any]:
+        with Timer(GRPC_HOP_SECONDS, ("RouteRequest",)), TRACER.span("grpc.client RouteRequest"):
+            response = await self.pool.get_stub().RouteRequest(create_grpc_request(request), **self._call_options())
+        return {
+            "content": response.content,
+            "provider": response.provider,
+            "model": response.model,
+            "usage": usage_dict(_usage_from_message(response))
+        }
+
+    async def stream(self, request: AIRequest, result: Optional[RouteResult] = None) -> AsyncGenerator[str, None]:
+        started_at = time.perf_counter()
+        first = True
+        # Not made current: the generator's context is its consumer's between chunks.
+        span = TRACER.start_span("grpc.client StreamingRouteRequest")
+        try:
+            async for response in self.pool.get_stub().StreamingRouteRequest(create_grpc_request(request), **self._call_options(span)):
+                if first:
+                    GRPC_HOP_SECONDS.observe(("StreamingRouteRequest",), time.perf_counter() - started_at)
+                    span.add_event("first_message")
+                    first = False
+                if response.HasField("usage"):
+                    # The closing message carries usage and no content.
+                    if result is not None:
+                        result.usage = _usage_from_message(response)
+                    continue
+                yield response.content
+        except Exception as e:
+            span.record_error(e)
+            raise
+        finally:
+            TRACER.end(span)
+
+    async def generate_batch(self, request: BatchRequest) -> List[Dict[str, Any]]:
+        response = await self.pool.get_stub().BatchRouteRequest(create_grpc_batch_request(request), **self._call_options())
+        return [self._batch_item(item) for item in response.results]
+
+    async def stream_batch(self, request: BatchRequest) -> AsyncGenerator[Dict[str, Any], None]:
+        async for item in self.pool.get_stub().StreamingBatchRouteRequest(create_grpc_batch_request(request), **self._call_options()):
+            yield self._batch_item(item)
+
+    @staticmethod
+    def _batch_item(item: ai_router_pb2.BatchItemResult) -> Dict[str, Any]:
+        if item.error_code:
+            return _batch_item_error(item.index, grpc.StatusCode[item.error_code], item.error)
+        return {
+            "index": item.index,
+            "content": item.response.content,
+            "provider": item.response.provider,
+            "model": item.response.model,
+            "usage": usage_dict(_usage_from_message(item.response))
+        }
+
+class InProcessTransport(BaseGatewayTransport):
+    """Calls the shared AIRouter directly, skipping protobuf encoding and the loopback round trip."""
+
+    name = IN_PROCESS_TRANSPORT
+
+    def __init__(self, router: Optional[AIRouter] = None):
+        self.router = router
+        self.stream_settings = StreamSettings.from_config()
+
+    async def start(self) -> None:
+        if self.router is None:
+            self.router = get_router()
+        self.router.providers.preload()
+        await get_http_clients().warm(self.router.providers.specs)
+
+    async def close(self) -> None:
+        await get_http_clients().close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"router": self.router.stats() if self.router is not None else None}
+
+    async def generate(self, request: AIRequest) -> Dict[str, Any]:
+        current_transport.set(self.name)
+        result = await self.router.route_request(**route_arguments(request), idempotency_key=current_idempotency_key.get())
+        return {
+            "content": result.content,
+            "provider": result.provider,
+            "model": result.model,
+            "usage": usage_dict(result.usage)
+        }
+
+    async def stream(self, request: AIRequest, result: Optional[RouteResult] = None) -> AsyncGenerator[str, None]:
+        current_transport.set(self.name)
+        stream = coalesce_chunks(self.router.stream_request(**route_arguments(request), result=result), self.stream_settings)
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    async def stream_batch(self, request: BatchRequest) -> AsyncGenerator[Dict[str, Any], None]:
+        current_transport.set(self.name)
+        async for item in self.router.route_batch(
+            [route_arguments(entry) for entry in request.requests],
+            max_concurrency=request.max_concurrency,
+            timeout=request.timeout_seconds
+        ):
+            yield self._batch_item(item)
+
+    @staticmethod
+    def _batch_item(item: BatchItemResult) -> Dict[str, Any]:
+        if item.error is not None:
+            code = item_status_for(item.error)
+            if code == grpc.StatusCode.INTERNAL:
+                logger.error(f"Unexpected error in batch item {item.index}: {item.error}")
+                return _batch_item_error(item.index, code, "Internal server error")
+            return _batch_item_error(item.index, code, str(item.error))
+        return {
+            "index": item.index,
+            "content": item.result.content,
+            "provider": item.result.provider,
+            "model": item.result.model,
+            "usage": usage_dict(item.result.usage)
+        }
+
+def create_transport(name: str) -> BaseGatewayTransport:
+    if name == GRPC_TRANSPORT:
+        return GrpcTransport(GrpcChannelPool(config.grpc_target, config.grpc_pool_size))
+    if name == IN_PROCESS_TRANSPORT:
+        return InProcessTransport()
+    raise ConfigurationException(f"Unsupported gateway transport: {name}")
@@ -0,0 +1,32 @@
+import asyncio
+import os
+from app.repositories.base import BaseAIRepository, Message, Usage
+from typing import AsyncGenerator, Dict, List, Optional
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def open_fds() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+class EchoRepository(BaseAIRepository):
+    """Provider stand-in that answers instantly, so benchmarks measure only router overhead."""
+
+    def __init__(self, chunks: int = 16, delay: float = 0.0):
+        self.chunks = chunks
+        self.delay = delay
+
+    async def generate_response(self, prompt: str, model: str, max_tokens: int, parameters: Dict[str, str], usage: Optional[Usage] = None,
+                                messages: Optional[List[Message]] = None) -> str:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return prompt
+
+    async def stream_response(self, prompt: str, model: str, max_tokens: int, parameters: Dict[str, str], usage: Optional[Usage] = None,
+                              messages: Optional[List[Message]] = None) -> AsyncGenerator[str, None]:
+        for index in range(self.chunks):
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield f"token-{index} "
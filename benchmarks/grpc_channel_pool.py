@@ -0,0 +1,68 @@
+"""Compare dialing a gRPC channel per request with the pooled gateway channels.
+
+Starts an in-process gRPC server with an echo servicer and reports p50/p99
+latency and file-descriptor growth for both strategies.
+
+    python -m benchmarks.grpc_channel_pool --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import grpc
+from app import ai_router_pb2, ai_router_pb2_grpc
+from app.grpc_pool import GrpcChannelPool
+from benchmarks.common import open_fds, percentile
+
+class EchoServicer(ai_router_pb2_grpc.AIRouterServicer):
+    async def RouteRequest(self, request, context):
+        return ai_router_pb2.AIResponse(content=request.prompt, provider=request.provider, model=request.model)
+
+async def run(get_stub, requests: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    request = ai_router_pb2.AIRequest(provider="openai", model="bench", prompt="ping")
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            stub = get_stub()
+            await stub.RouteRequest(request)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    fds_before = open_fds()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies, open_fds() - fds_before
+
+def report(name: str, latencies, fd_growth: int) -> None:
+    print(f"{name:<12} p50={statistics.median(latencies):.3f}ms "
+          f"p99={percentile(latencies, 99):.3f}ms fd_growth={fd_growth}")
+
+async def main(args):
+    server = grpc.aio.server()
+    ai_router_pb2_grpc.add_AIRouterServicer_to_server(EchoServicer(), server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    await server.start()
+    target = f"127.0.0.1:{port}"
+
+    def dial_per_request():
+        # Mirrors the previous gateway behaviour: a new channel per call, never closed.
+        return ai_router_pb2_grpc.AIRouterStub(grpc.aio.insecure_channel(target))
+
+    latencies, fd_growth = await run(dial_per_request, args.requests, args.concurrency)
+    report("per-request", latencies, fd_growth)
+
+    pool = GrpcChannelPool(target, args.pool_size)
+    await pool.start()
+    latencies, fd_growth = await run(pool.get_stub, args.requests, args.concurrency)
+    report("pooled", latencies, fd_growth)
+    await pool.close()
+
+    await server.stop(0)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--pool-size", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
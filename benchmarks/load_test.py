@@ -0,0 +1,248 @@
+"""Load test of the full stack against the local mock provider.
+
+Starts benchmarks.mock_provider and main.py as subprocesses (HTTP gateway ->
+gRPC -> AIRouter -> repositories -> mock), then offers load at each RPS
+level with a cap on concurrent requests. Reports achieved throughput,
+latency and time-to-first-chunk percentiles, and the server's RSS and FD
+growth per level. Admission limits are disabled in the server config unless
+--keep-admission is given, so the provider rate limits do not cap the test.
+
+    python -m benchmarks.load_test --mode stream --rps 50,100,200 --duration 20 --save baseline.json
+    python -m benchmarks.load_test --mode stream --rps 50,100,200 --duration 20 --compare baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import aiohttp
+import yaml
+from benchmarks.common import percentile
+from benchmarks.mock_provider import add_settings_arguments
+from typing import Any, Dict, List, Optional
+
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms", "ttfc_p50_ms", "ttfc_p95_ms", "ttfc_p99_ms")
+
+def process_rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+def process_fds(pid: int) -> int:
+    return len(os.listdir(f"/proc/{pid}/fd"))
+
+def write_server_config(keep_admission: bool) -> str:
+    with open(os.getenv("CONFIG_PATH", "config.yaml")) as config_file:
+        server_config = yaml.safe_load(config_file)
+    server_config.setdefault("admission", {})["enabled"] = keep_admission
+    handle, path = tempfile.mkstemp(prefix="ai-router-load-", suffix=".yaml")
+    with os.fdopen(handle, "w") as config_file:
+        yaml.safe_dump(server_config, config_file)
+    return path
+
+async def wait_until_healthy(session: aiohttp.ClientSession, url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{url}/health") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not become healthy within {timeout}s")
+
+async def send_request(session: aiohttp.ClientSession, url: str, mode: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    started_at = time.perf_counter()
+    first_chunk_at: Optional[float] = None
+    error: Optional[str] = None
+    try:
+        async with session.post(f"{url}/{mode}", json=payload) as response:
+            if mode == "stream":
+                event = None
+                async for line in response.content:
+                    line = line.rstrip(b"\r\n")
+                    if not line:
+                        event = None
+                    elif line.startswith(b"event:"):
+                        event = line[6:].strip()
+                    elif line.startswith(b"data:"):
+                        if event is None:
+                            if first_chunk_at is None:
+                                first_chunk_at = time.perf_counter()
+                        elif event == b"error":
+                            # The gateway ends a failed stream with `event: error` and a JSON body.
+                            try:
+                                error = f"stream_{json.loads(line[5:])['status_code']}"
+                            except (ValueError, KeyError, TypeError):
+                                error = "stream_error"
+            else:
+                await response.read()
+                first_chunk_at = time.perf_counter()
+            if response.status != 200:
+                error = f"http_{response.status}"
+    except aiohttp.ClientError as e:
+        error = type(e).__name__
+    finished_at = time.perf_counter()
+    return {
+        "latency": finished_at - started_at,
+        "ttfc": (first_chunk_at - started_at) if first_chunk_at is not None else None,
+        "error": error
+    }
+
+async def run_level(session: aiohttp.ClientSession, url: str, args, rps: float, server_pid: int) -> Dict[str, Any]:
+    """Open-loop load at `rps`: requests are started on schedule unless `concurrency` are already in flight."""
+    slots = asyncio.Semaphore(args.concurrency)
+    results: List[Dict[str, Any]] = []
+    tasks = []
+    saturated = 0
+
+    async def one(index: int) -> None:
+        try:
+            payload = {"provider": args.provider, "prompt": f"load test request {rps}-{index} " + "x" * args.prompt_bytes,
+                       "max_tokens": 64, "bypass_cache": True}
+            results.append(await send_request(session, url, args.mode, payload))
+        finally:
+            slots.release()
+
+    rss_before, fds_before = process_rss_kb(server_pid), process_fds(server_pid)
+    started_at = time.perf_counter()
+    total = int(rps * args.duration)
+    for index in range(total):
+        delay = started_at + index / rps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if slots.locked():
+            saturated += 1
+        await slots.acquire()
+        tasks.append(asyncio.ensure_future(one(index)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started_at
+
+    latencies = [result["latency"] * 1000 for result in results if result["error"] is None]
+    ttfcs = [result["ttfc"] * 1000 for result in results if result["error"] is None and result["ttfc"] is not None]
+    errors: Dict[str, int] = {}
+    for result in results:
+        if result["error"] is not None:
+            errors[result["error"]] = errors.get(result["error"], 0) + 1
+
+    def pct(samples: List[float], value: float) -> Optional[float]:
+        return round(percentile(samples, value), 2) if samples else None
+
+    return {
+        "target_rps": rps,
+        "achieved_rps": round(len(results) / elapsed, 2),
+        "requests": len(results),
+        "errors": errors,
+        "saturated_starts": saturated,
+        "p50_ms": pct(latencies, 50), "p95_ms": pct(latencies, 95), "p99_ms": pct(latencies, 99),
+        "ttfc_p50_ms": pct(ttfcs, 50), "ttfc_p95_ms": pct(ttfcs, 95), "ttfc_p99_ms": pct(ttfcs, 99),
+        "rss_growth_kb": process_rss_kb(server_pid) - rss_before,
+        "fd_growth": process_fds(server_pid) - fds_before,
+    }
+
+def print_level(level: Dict[str, Any]) -> None:
+    print(f"rps {level['target_rps']:>7}: achieved={level['achieved_rps']:>8} req/s  "
+          f"p50={level['p50_ms']}ms p95={level['p95_ms']}ms p99={level['p99_ms']}ms  "
+          f"ttfc p50={level['ttfc_p50_ms']}ms p99={level['ttfc_p99_ms']}ms  "
+          f"errors={sum(level['errors'].values())}  rss {level['rss_growth_kb']:+d}KB  fds {level['fd_growth']:+d}")
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> bool:
+    """Print per-level changes against `baseline`; returns False if anything regressed by more than `tolerance`."""
+    for key in ("mode", "provider", "concurrency", "mock"):
+        if current[key] != baseline.get(key):
+            print(f"warning: {key} differs from the baseline ({baseline.get(key)} -> {current[key]})")
+    ok = True
+    previous_levels = {level["target_rps"]: level for level in baseline["levels"]}
+    for level in current["levels"]:
+        previous = previous_levels.get(level["target_rps"])
+        if previous is None:
+            print(f"rps {level['target_rps']}: not in baseline")
+            continue
+        changes = []
+        for key in LATENCY_KEYS + ("achieved_rps",):
+            if not level.get(key) or not previous.get(key):
+                continue
+            change = (level[key] - previous[key]) / previous[key]
+            regressed = change < -tolerance if key == "achieved_rps" else change > tolerance
+            ok = ok and not regressed
+            changes.append(f"{key} {previous[key]} -> {level[key]} ({change:+.1%}){' REGRESSION' if regressed else ''}")
+        print(f"rps {level['target_rps']}:\n  " + "\n  ".join(changes))
+    return ok
+
+async def main(args) -> int:
+    url = f"http://127.0.0.1:{args.http_port}"
+    mock = subprocess.Popen([sys.executable, "-m", "benchmarks.mock_provider", "--port", str(args.mock_port),
+                             "--latency", str(args.latency), "--latency-jitter", str(args.latency_jitter),
+                             "--chunks", str(args.chunks), "--chunk-interval", str(args.chunk_interval),
+                             "--error-rate", str(args.error_rate), "--rate-limit-rate", str(args.rate_limit_rate)],
+                            stdout=subprocess.DEVNULL)
+    config_path = write_server_config(args.keep_admission)
+    server_env = {
+        **os.environ,
+        "CONFIG_PATH": config_path,
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.mock_port}/v1",
+        "ANTHROPIC_BASE_URL": f"http://127.0.0.1:{args.mock_port}",
+        "OPENAI_API_KEY": "mock",
+        "ANTHROPIC_API_KEY": "mock",
+    }
+    server = subprocess.Popen([sys.executable, "main.py"], env=server_env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL if not args.server_logs else None)
+    try:
+        connector = aiohttp.TCPConnector(limit=args.concurrency)
+        async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=args.request_timeout)) as session:
+            await wait_until_healthy(session, url)
+            levels = []
+            for rps in args.rps:
+                level = await run_level(session, url, args, rps, server.pid)
+                print_level(level)
+                levels.append(level)
+        report = {
+            "mode": args.mode,
+            "provider": args.provider,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "mock": {"latency": args.latency, "latency_jitter": args.latency_jitter, "chunks": args.chunks,
+                     "chunk_interval": args.chunk_interval, "error_rate": args.error_rate, "rate_limit_rate": args.rate_limit_rate},
+            "levels": levels,
+        }
+        if args.save:
+            with open(args.save, "w") as baseline_file:
+                json.dump(report, baseline_file, indent=2)
+            print(f"Saved results to {args.save}")
+        if args.compare:
+            with open(args.compare) as baseline_file:
+                if not compare(report, json.load(baseline_file), args.tolerance):
+                    return 1
+        return 0
+    finally:
+        server.terminate()
+        mock.terminate()
+        server.wait(timeout=60)
+        mock.wait(timeout=10)
+        os.remove(config_path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("generate", "stream"), default="stream")
+    parser.add_argument("--provider", default="openai", help="Provider or model group to send requests to")
+    parser.add_argument("--rps", type=lambda value: [float(rps) for rps in value.split(",")], default=[50.0, 100.0],
+                        help="Comma-separated offered load levels")
+    parser.add_argument("--concurrency", type=int, default=256, help="Cap on requests in flight")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per level")
+    parser.add_argument("--prompt-bytes", type=int, default=512)
+    parser.add_argument("--request-timeout", type=float, default=60.0)
+    parser.add_argument("--http-port", type=int, default=8000, help="Port main.py serves HTTP on")
+    parser.add_argument("--mock-port", type=int, default=9100)
+    parser.add_argument("--keep-admission", action="store_true", help="Leave admission control as configured")
+    parser.add_argument("--server-logs", action="store_true", help="Show the server's log output")
+    parser.add_argument("--save", help="Write the results as JSON to this path")
+    parser.add_argument("--compare", help="Compare against results saved earlier with --save")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative change treated as a regression in --compare")
+    add_settings_arguments(parser)
+    sys.exit(asyncio.run(main(parser.parse_args())))
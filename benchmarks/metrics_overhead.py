@@ -0,0 +1,82 @@
+"""Measure what metrics recording costs on the hot path.
+
+Reports the time per histogram observation and per counter increment, the
+memory retained after a million observations of an existing series, and
+the end-to-end cost on a streamed router request with recording enabled
+versus replaced by a no-op.
+
+    python -m benchmarks.metrics_overhead --observations 1000000 --iterations 2000
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from app import metrics
+from app.metrics import ERRORS_TOTAL, Histogram
+from app.router.router import AIRouter
+from benchmarks.common import EchoRepository, percentile
+
+def measure_observe(observations: int) -> None:
+    histogram = Histogram("bench_seconds", "benchmark", ("provider", "model", "transport"))
+    labels = ("openai", "gpt-4o-mini", "grpc")
+    histogram.observe(labels, 0.01)
+
+    blocks_before = sys.getallocatedblocks()
+    start = time.perf_counter()
+    for index in range(observations):
+        histogram.observe(labels, index * 1e-6)
+    elapsed = time.perf_counter() - start
+    blocks_after = sys.getallocatedblocks()
+    print(f"histogram.observe      {elapsed / observations * 1e9:8.1f}ns/op  retained blocks: {blocks_after - blocks_before}")
+
+    error = TimeoutError()
+    start = time.perf_counter()
+    for _ in range(observations):
+        ERRORS_TOTAL.inc(("bench", "TimeoutError"))
+    elapsed = time.perf_counter() - start
+    print(f"counter.inc            {elapsed / observations * 1e9:8.1f}ns/op")
+
+    start = time.perf_counter()
+    for _ in range(observations):
+        metrics.record_error("bench", error)
+    elapsed = time.perf_counter() - start
+    print(f"record_error           {elapsed / observations * 1e9:8.1f}ns/op")
+
+async def measure_stream(label: str, router: AIRouter, iterations: int) -> None:
+    async def call():
+        async for _ in router.stream_request("openai", "hello", "bench", 16, bypass_cache=True):
+            pass
+
+    for _ in range(min(100, iterations)):
+        await call()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    print(f"{label:<22} mean={statistics.fmean(samples):8.1f}us "
+          f"p50={statistics.median(samples):8.1f}us p99={percentile(samples, 99):8.1f}us")
+
+async def main(args):
+    measure_observe(args.observations)
+
+    router = AIRouter()
+    router.repositories = {name: EchoRepository(chunks=args.chunks) for name in router.repositories}
+    # Keep the rate limits out of the way; only the recording cost is of interest here.
+    router.admission.enabled = False
+    await measure_stream("stream, recording", router, args.iterations)
+
+    original_observe = Histogram.observe
+    Histogram.observe = lambda self, labels, value: None
+    try:
+        await measure_stream("stream, no-op", router, args.iterations)
+    finally:
+        Histogram.observe = original_observe
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--observations", type=int, default=1_000_000)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--chunks", type=int, default=64)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,164 @@
+"""Local stand-in for the OpenAI and Anthropic APIs, for load tests that should not cost anything.
+
+Serves `POST /v1/chat/completions` and `POST /v1/messages`, unary and
+streamed, with configurable time to first chunk, chunk count and spacing,
+and injected 500s and 429s. Point the router at it with
+
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1 ANTHROPIC_BASE_URL=http://127.0.0.1:9100
+
+    python -m benchmarks.mock_provider --port 9100 --latency 0.2 --chunks 32 --chunk-interval 0.01 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+from aiohttp import web
+
+@dataclass
+class MockSettings:
+    latency: float = 0.05
+    latency_jitter: float = 0.0
+    chunks: int = 16
+    chunk_interval: float = 0.005
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+
+SETTINGS = web.AppKey("settings", MockSettings)
+
+def _injected_failure(settings: MockSettings):
+    """(status, kind) of an injected failure for this request, or None."""
+    roll = random.random()
+    if roll < settings.rate_limit_rate:
+        return 429, "rate_limit"
+    if roll < settings.rate_limit_rate + settings.error_rate:
+        return 500, "server_error"
+    return None
+
+async def _first_chunk_delay(settings: MockSettings) -> None:
+    delay = settings.latency + random.uniform(0, settings.latency_jitter)
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+def _tokens(settings: MockSettings):
+    return [f"token{index} " for index in range(settings.chunks)]
+
+async def _sse(request: web.Request) -> web.StreamResponse:
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    await response.prepare(request)
+    return response
+
+async def openai_chat_completions(request: web.Request) -> web.StreamResponse:
+    settings: MockSettings = request.app[SETTINGS]
+    body = await request.json()
+    model = body.get("model", "mock")
+    failure = _injected_failure(settings)
+    await _first_chunk_delay(settings)
+    if failure is not None:
+        status, kind = failure
+        return web.json_response({"error": {"message": f"Injected {kind}", "type": kind, "code": kind}}, status=status)
+
+    created = int(time.time())
+    tokens = _tokens(settings)
+    if not body.get("stream"):
+        await asyncio.sleep(settings.chunk_interval * max(0, len(tokens) - 1))
+        return web.json_response({
+            "id": "chatcmpl-mock", "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(body["messages"][-1]["content"]) // 4, "completion_tokens": len(tokens),
+                      "total_tokens": len(body["messages"][-1]["content"]) // 4 + len(tokens)}
+        })
+
+    response = await _sse(request)
+    for index, token in enumerate(tokens):
+        if index:
+            await asyncio.sleep(settings.chunk_interval)
+        chunk = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created, "model": model,
+                 "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+        await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+    final = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created, "model": model,
+             "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+    await response.write(f"data: {json.dumps(final)}\n\n".encode())
+    if (body.get("stream_options") or {}).get("include_usage"):
+        prompt_tokens = len(body["messages"][-1]["content"]) // 4
+        usage = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created, "model": model, "choices": [],
+                 "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens)}}
+        await response.write(f"data: {json.dumps(usage)}\n\n".encode())
+    await response.write(b"data: [DONE]\n\n")
+    await response.write_eof()
+    return response
+
+async def anthropic_messages(request: web.Request) -> web.StreamResponse:
+    settings: MockSettings = request.app[SETTINGS]
+    body = await request.json()
+    model = body.get("model", "mock")
+    failure = _injected_failure(settings)
+    await _first_chunk_delay(settings)
+    if failure is not None:
+        status, kind = failure
+        error_type = "rate_limit_error" if status == 429 else "api_error"
+        return web.json_response({"type": "error", "error": {"type": error_type, "message": f"Injected {kind}"}}, status=status)
+
+    tokens = _tokens(settings)
+    input_tokens = len(body["messages"][-1]["content"]) // 4
+    message = {"id": "msg_mock", "type": "message", "role": "assistant", "model": model,
+               "stop_reason": None, "stop_sequence": None}
+    if not body.get("stream"):
+        await asyncio.sleep(settings.chunk_interval * max(0, len(tokens) - 1))
+        return web.json_response({**message, "content": [{"type": "text", "text": "".join(tokens)}], "stop_reason": "end_turn",
+                                  "usage": {"input_tokens": input_tokens, "output_tokens": len(tokens)}})
+
+    def event(name: str, data: dict) -> bytes:
+        return f"event: {name}\ndata: {json.dumps(data)}\n\n".encode()
+
+    response = await _sse(request)
+    await response.write(event("message_start", {"type": "message_start", "message": {
+        **message, "content": [], "usage": {"input_tokens": input_tokens, "output_tokens": 0}}}))
+    await response.write(event("content_block_start", {"type": "content_block_start", "index": 0,
+                                                       "content_block": {"type": "text", "text": ""}}))
+    for index, token in enumerate(tokens):
+        if index:
+            await asyncio.sleep(settings.chunk_interval)
+        await response.write(event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                           "delta": {"type": "text_delta", "text": token}}))
+    await response.write(event("content_block_stop", {"type": "content_block_stop", "index": 0}))
+    await response.write(event("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                                 "usage": {"output_tokens": len(tokens)}}))
+    await response.write(event("message_stop", {"type": "message_stop"}))
+    await response.write_eof()
+    return response
+
+def create_app(settings: MockSettings) -> web.Application:
+    app = web.Application()
+    app[SETTINGS] = settings
+    app.router.add_post("/v1/chat/completions", openai_chat_completions)
+    app.router.add_post("/v1/messages", anthropic_messages)
+    return app
+
+async def start_mock_provider(settings: MockSettings, host: str = "127.0.0.1", port: int = 0) -> web.AppRunner:
+    """Start the mock on the running loop; the bound port is in `runner.addresses`."""
+    runner = web.AppRunner(create_app(settings), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+def add_settings_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", type=float, default=MockSettings.latency, help="Seconds before the first chunk")
+    parser.add_argument("--latency-jitter", type=float, default=MockSettings.latency_jitter, help="Extra uniform random delay, in seconds")
+    parser.add_argument("--chunks", type=int, default=MockSettings.chunks, help="Chunks per response")
+    parser.add_argument("--chunk-interval", type=float, default=MockSettings.chunk_interval, help="Seconds between chunks")
+    parser.add_argument("--error-rate", type=float, default=MockSettings.error_rate, help="Fraction of requests answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=MockSettings.rate_limit_rate, help="Fraction of requests answered with a 429")
+
+def settings_from_args(args) -> MockSettings:
+    return MockSettings(latency=args.latency, latency_jitter=args.latency_jitter, chunks=args.chunks,
+                        chunk_interval=args.chunk_interval, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+    web.run_app(create_app(settings_from_args(args)), host=args.host, port=args.port, access_log=None)
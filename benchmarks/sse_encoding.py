@@ -0,0 +1,83 @@
+"""Measure per-chunk CPU time and peak memory of the gateway's SSE framing.
+
+Drives one response at a time directly over ASGI with a no-op send, from a
+source that yields `--chunks` tokens without waiting, so only the framing
+and response machinery is measured. Compares (a) the previous framing,
+f-string events through Starlette's `StreamingResponse`, (b)
+`EventStreamResponse` over `encode_events`, and (c) the same through a
+`ReplayLog`, as `/stream` runs with resume enabled. Peak memory is traced
+with tracemalloc over one response in a separate pass.
+
+    python -m benchmarks.sse_encoding --streams 200 --chunks 500
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from starlette.responses import StreamingResponse
+from app.sse import EventStreamResponse, ReplayStore, encode_events
+
+SCOPE = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "path": "/stream", "headers": []}
+
+async def tokens(count: int, text: str):
+    for index in range(count):
+        yield None, f"{text}{index} "
+
+async def previous_framing(count: int, text: str):
+    async for _, content in tokens(count, text):
+        yield f"data: {content}\n\n"
+
+def previous(count: int, text: str):
+    return StreamingResponse(previous_framing(count, text), media_type="text/event-stream")
+
+def direct(count: int, text: str):
+    return EventStreamResponse(encode_events(tokens(count, text)))
+
+def replayed(store: ReplayStore):
+    def build(count: int, text: str):
+        return EventStreamResponse(store.start("bench", tokens(count, text)).follow())
+    return build
+
+async def respond(response) -> int:
+    sent = 0
+    done = asyncio.Event()
+
+    async def receive():
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal sent
+        if message["type"] == "http.response.body":
+            sent += len(message.get("body", b""))
+            if not message.get("more_body", False):
+                done.set()
+
+    await response(SCOPE, receive, send)
+    return sent
+
+async def measure(label: str, build, args) -> None:
+    await respond(build(args.chunks, args.text))
+    cpu_before = time.process_time()
+    for _ in range(args.streams):
+        await respond(build(args.chunks, args.text))
+    cpu = time.process_time() - cpu_before
+
+    tracemalloc.start()
+    await respond(build(args.chunks, args.text))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<34} cpu={cpu * 1e6 / (args.streams * args.chunks):6.2f}us/chunk  peak={peak / 1024:8.1f}KiB/stream")
+
+async def main(args):
+    store = ReplayStore({"replay_events": 256, "replay_ttl_seconds": 0})
+    await measure("StreamingResponse + f-string", previous, args)
+    await measure("EventStreamResponse", direct, args)
+    await measure("EventStreamResponse + replay log", replayed(store), args)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=500, help="Chunks per stream")
+    parser.add_argument("--text", default="token", help="Chunk text before the chunk index")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,78 @@
+"""Measure process startup: import time of main.py, router construction, first provider load and RSS.
+
+Each run is a fresh interpreter, so module caches from earlier runs do not
+hide import cost. Fails (exit 1) when the median import + router time is
+above `--max-startup-ms` or when building the router imported a provider
+SDK, so it can gate CI:
+
+    python -m benchmarks.startup --runs 5 --max-startup-ms 1500
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from benchmarks.common import percentile
+
+PROBE = """
+import json, sys, time
+started_at = time.perf_counter()
+import main
+imported_at = time.perf_counter()
+from app.router.router import get_router
+router = get_router()
+built_at = time.perf_counter()
+sdk_modules = sorted(name for name in ("openai", "anthropic") if name in sys.modules)
+rss_kb = 0
+with open("/proc/self/status") as status:
+    for line in status:
+        if line.startswith("VmRSS:"):
+            rss_kb = int(line.split()[1])
+first_provider = next(iter(router.repositories))
+load_started_at = time.perf_counter()
+router.repositories[first_provider]
+loaded_at = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported_at - started_at) * 1000,
+    "router_ms": (built_at - imported_at) * 1000,
+    "first_provider_ms": (loaded_at - load_started_at) * 1000,
+    "first_provider": first_provider,
+    "rss_kb": rss_kb,
+    "sdk_modules_at_startup": sdk_modules,
+}))
+"""
+
+def run_probe() -> dict:
+    env = {**os.environ, "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "startup-benchmark"),
+           "ANTHROPIC_API_KEY": os.getenv("ANTHROPIC_API_KEY", "startup-benchmark")}
+    output = subprocess.run([sys.executable, "-c", PROBE], env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main(args) -> int:
+    results = [run_probe() for _ in range(args.runs)]
+
+    def median(key: str) -> float:
+        return percentile([result[key] for result in results], 50)
+
+    startup_ms = percentile([result["import_ms"] + result["router_ms"] for result in results], 50)
+    print(f"import main       {median('import_ms'):8.1f} ms")
+    print(f"build router      {median('router_ms'):8.1f} ms")
+    print(f"startup total     {startup_ms:8.1f} ms")
+    print(f"first provider    {median('first_provider_ms'):8.1f} ms  ({results[0]['first_provider']}, paid on its first request)")
+    print(f"rss after startup {median('rss_kb') / 1024:8.1f} MB")
+
+    ok = True
+    eager = sorted({name for result in results for name in result["sdk_modules_at_startup"]})
+    if eager:
+        print(f"FAIL: provider SDKs imported at startup: {', '.join(eager)}")
+        ok = False
+    if args.max_startup_ms and startup_ms > args.max_startup_ms:
+        print(f"FAIL: startup {startup_ms:.1f} ms is above the {args.max_startup_ms} ms limit")
+        ok = False
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-startup-ms", type=float, default=0, help="Fail above this median import + router time; 0 disables")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,96 @@
+"""Measure CPU time per delivered token on the streaming paths, with and without chunk coalescing.
+
+Runs concurrent streams from an echo provider that emits one small token
+per `--token-interval` through the gateway's `/stream` endpoint (driven
+directly over ASGI, without sockets) with (a) the gRPC transport, servicer
+included, and (b) the in-process transport, and divides the process CPU
+time by the number of tokens delivered.
+
+    python -m benchmarks.stream_cpu --streams 200 --tokens 200 --token-interval 0.002
+"""
+import argparse
+import asyncio
+import json
+import time
+import grpc
+from app import ai_router_pb2_grpc, http_gateway
+from app.grpc_pool import GrpcChannelPool
+from app.grpc_server import AIRouterServicer
+from app.router.router import AIRouter
+from app.streaming import StreamSettings
+from app.transports import GrpcTransport, InProcessTransport
+from benchmarks.common import EchoRepository
+
+async def stream_over_asgi(body: bytes) -> int:
+    """POST /stream to the gateway app and count the body frames it sends."""
+    frames = 0
+    received = False
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal frames
+        if message["type"] == "http.response.body" and message.get("body"):
+            frames += 1
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+             "path": "/stream", "raw_path": b"/stream", "root_path": "", "query_string": b"",
+             "headers": [(b"content-type", b"application/json")], "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80)}
+    await http_gateway.app(scope, receive, send)
+    return frames
+
+async def run_streams(streams: int) -> int:
+    bodies = [json.dumps({"provider": "openai", "model": "bench", "prompt": f"stream {index}", "bypass_cache": True}).encode()
+              for index in range(streams)]
+    return sum(await asyncio.gather(*(stream_over_asgi(body) for body in bodies)))
+
+async def measure(label: str, transport, args) -> None:
+    http_gateway.transport = transport
+    await run_streams(min(args.streams, 10))
+    cpu_before, wall_before = time.process_time(), time.perf_counter()
+    frames = await run_streams(args.streams)
+    cpu = time.process_time() - cpu_before
+    wall = time.perf_counter() - wall_before
+    tokens = args.streams * args.tokens
+    print(f"{label:<28} cpu={cpu * 1e6 / tokens:7.2f}us/token  frames/stream={frames / args.streams:7.1f}  wall={wall:6.2f}s")
+
+async def main(args):
+    router = AIRouter()
+    router.repositories = {name: EchoRepository(chunks=args.tokens, delay=args.token_interval) for name in router.repositories}
+    router.admission.enabled = False
+
+    servicer = AIRouterServicer(router)
+    server = grpc.aio.server()
+    ai_router_pb2_grpc.add_AIRouterServicer_to_server(servicer, server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    await server.start()
+    grpc_transport = GrpcTransport(GrpcChannelPool(f"127.0.0.1:{port}", 4))
+    in_process_transport = InProcessTransport(router)
+    await grpc_transport.start()
+
+    variants = (
+        ("per-token frames", StreamSettings({"flush_size": 0})),
+        ("coalesced", StreamSettings({"flush_size": args.flush_size, "flush_interval_ms": args.flush_interval_ms})),
+    )
+    for name, settings in variants:
+        servicer.stream_settings = settings
+        in_process_transport.stream_settings = settings
+        await measure(f"grpc, {name}", grpc_transport, args)
+        await measure(f"in_process, {name}", in_process_transport, args)
+
+    await grpc_transport.close()
+    await server.stop(0)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=200)
+    parser.add_argument("--tokens", type=int, default=200, help="Tokens per stream")
+    parser.add_argument("--token-interval", type=float, default=0.002, help="Seconds between upstream tokens")
+    parser.add_argument("--flush-size", type=int, default=256)
+    parser.add_argument("--flush-interval-ms", type=float, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,76 @@
+"""Measure what the loopback gRPC hop costs compared with the in-process transport.
+
+Both transports drive the same AIRouter backed by an instant echo provider,
+so the difference is protobuf encoding, the extra copies and the loopback
+round trip.
+
+    python -m benchmarks.transport_overhead --iterations 2000 --prompt-bytes 2048
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import grpc
+from app import ai_router_pb2_grpc
+from app.grpc_pool import GrpcChannelPool
+from app.grpc_server import AIRouterServicer
+from app.router.router import AIRouter
+from app.schemas import AIRequest
+from app.transports import GrpcTransport, InProcessTransport
+from benchmarks.common import EchoRepository, percentile
+
+def build_router(chunks: int) -> AIRouter:
+    router = AIRouter()
+    router.repositories = {name: EchoRepository(chunks=chunks) for name in router.repositories}
+    # Every iteration sends the same request; keep the rate limits, coalescing and caches from answering it instead of the provider.
+    router.admission.enabled = False
+    router.coalescing_enabled = False
+    router.cache = None
+    router.semantic_cache = None
+    return router
+
+async def measure(label: str, call, iterations: int) -> None:
+    for _ in range(min(100, iterations)):
+        await call()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    print(f"{label:<22} mean={statistics.fmean(samples):8.1f}us "
+          f"p50={statistics.median(samples):8.1f}us p99={percentile(samples, 99):8.1f}us")
+
+async def main(args):
+    router = build_router(args.chunks)
+    server = grpc.aio.server()
+    ai_router_pb2_grpc.add_AIRouterServicer_to_server(AIRouterServicer(router), server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    await server.start()
+
+    grpc_transport = GrpcTransport(GrpcChannelPool(f"127.0.0.1:{port}", 1))
+    in_process_transport = InProcessTransport(router)
+    await grpc_transport.start()
+    await in_process_transport.start()
+
+    request = AIRequest(provider="openai", model="bench", prompt="x" * args.prompt_bytes, max_tokens=16)
+
+    for transport in (grpc_transport, in_process_transport):
+        async def generate():
+            await transport.generate(request)
+
+        async def stream():
+            async for _ in transport.stream(request):
+                pass
+
+        await measure(f"{transport.name} /generate", generate, args.iterations)
+        await measure(f"{transport.name} /stream", stream, args.iterations)
+
+    await grpc_transport.close()
+    await server.stop(0)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--prompt-bytes", type=int, default=2048)
+    parser.add_argument("--chunks", type=int, default=16)
+    asyncio.run(main(parser.parse_args()))
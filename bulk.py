@@ -0,0 +1,228 @@
+"""Run a JSONL file of requests through the router without the HTTP/gRPC hops.
+
+Each input line is an AIRequest object (an optional "id" is echoed back).
+Results are appended to the output JSONL as they complete, so they are not
+in input order; every record carries the input "line" number.
+
+    python bulk.py requests.jsonl results.jsonl --concurrency 64
+
+Progress is checkpointed next to the output. Re-running the same command
+after an interruption resumes where it stopped; items that completed after
+the last checkpoint are found in the output and not sent again.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from collections import Counter
+from app.metrics import current_transport
+from app.router.router import AIRouter
+from app.router.tenants import DEFAULT_TENANT, current_tenant
+from app.router.tokens import estimate_text_tokens
+from app.schemas import AIRequest
+from app.transports import route_arguments
+from typing import Any, BinaryIO, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class Checkpoint:
+    """Every input line before `next_line` (which starts at `input_offset`) has a result in the output.
+
+    Results of later lines can only appear after `output_offset`, the output
+    position when `next_line` was started, which is where resuming rescans.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.next_line = 0
+        self.input_offset = 0
+        self.output_offset = 0
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, "r") as checkpoint_file:
+            state = json.load(checkpoint_file)
+        self.next_line = state["next_line"]
+        self.input_offset = state["input_offset"]
+        self.output_offset = state["output_offset"]
+        return True
+
+    def save(self) -> None:
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as checkpoint_file:
+            json.dump({"next_line": self.next_line, "input_offset": self.input_offset, "output_offset": self.output_offset}, checkpoint_file)
+        os.replace(temporary_path, self.path)
+
+class Progress:
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.completed = 0
+        self.succeeded = 0
+        self.tokens = 0
+        self.errors: Counter = Counter()
+
+    def report(self, final: bool = False) -> None:
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        errors = ", ".join(f"{name}={count}" for name, count in self.errors.most_common()) or "none"
+        print(f"{'done' if final else 'progress'}: {self.completed} items in {elapsed:.0f}s, "
+              f"{self.completed / elapsed:.1f} items/s, ~{self.tokens / elapsed:.0f} tokens/s, "
+              f"{self.succeeded} ok, errors: {errors}", file=sys.stderr, flush=True)
+
+def _completed_since_checkpoint(output: BinaryIO, checkpoint: Checkpoint) -> Set[int]:
+    """Lines at or after the checkpoint that already have a result; also drops a record left half-written by a crash."""
+    done: Set[int] = set()
+    output.seek(checkpoint.output_offset)
+    valid_until = checkpoint.output_offset
+    for raw in output:
+        if not raw.endswith(b"\n"):
+            break
+        done.add(json.loads(raw)["line"])
+        valid_until += len(raw)
+    output.truncate(valid_until)
+    output.seek(valid_until)
+    return done
+
+class BulkRunner:
+    def __init__(self, router: AIRouter, input_path: str, output_path: str, checkpoint: Checkpoint,
+                 concurrency: int, checkpoint_interval: float, report_interval: float):
+        self.router = router
+        self.input_path = input_path
+        self.output_path = output_path
+        self.checkpoint = checkpoint
+        self.concurrency = concurrency
+        self.checkpoint_interval = checkpoint_interval
+        self.report_interval = report_interval
+        self.progress = Progress()
+        # Input and output offsets, at start, of every line not finished yet; the smallest line is the resume point.
+        self.in_flight: Dict[int, Tuple[int, int]] = {}
+        self.next_line = 0
+        self.next_offset = 0
+        self.output: Optional[BinaryIO] = None
+        self.stop_requested = asyncio.Event()
+
+    async def run(self) -> bool:
+        """Process the input; returns False if the run was interrupted."""
+        resumed = self.checkpoint.load()
+        if resumed and not os.path.exists(self.output_path):
+            logger.warning(f"Checkpoint {self.checkpoint.path} found but {self.output_path} is missing, starting over")
+            self.checkpoint = Checkpoint(self.checkpoint.path)
+            resumed = False
+        self.output = open(self.output_path, "r+b" if resumed else "w+b")
+        skip = _completed_since_checkpoint(self.output, self.checkpoint) if resumed else set()
+        if resumed:
+            logger.info(f"Resuming at line {self.checkpoint.next_line} ({len(skip)} later lines already done)")
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stop_requested.set)
+
+        window = asyncio.Semaphore(self.concurrency)
+        tasks: Set[asyncio.Task] = set()
+        reporter = asyncio.ensure_future(self._report_periodically())
+        last_checkpoint = time.monotonic()
+        try:
+            with open(self.input_path, "rb") as input_file:
+                input_file.seek(self.checkpoint.input_offset)
+                self.next_line = self.checkpoint.next_line
+                self.next_offset = self.checkpoint.input_offset
+                for raw in input_file:
+                    line, offset = self.next_line, self.next_offset
+                    self.next_line += 1
+                    self.next_offset += len(raw)
+                    if line in skip or not raw.strip():
+                        continue
+                    await window.acquire()
+                    if self.stop_requested.is_set():
+                        window.release()
+                        break
+                    self.in_flight[line] = (offset, self.output.tell())
+                    task = asyncio.ensure_future(self._process(line, raw))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    task.add_done_callback(lambda _: window.release())
+                    if time.monotonic() - last_checkpoint >= self.checkpoint_interval:
+                        self._save_checkpoint()
+                        last_checkpoint = time.monotonic()
+            while tasks and not self.stop_requested.is_set():
+                await asyncio.wait(set(tasks), timeout=self.checkpoint_interval)
+                self._save_checkpoint()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            reporter.cancel()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(sig)
+            self._save_checkpoint()
+            self.output.close()
+            self.progress.report(final=True)
+        return not self.stop_requested.is_set()
+
+    async def _process(self, line: int, raw: bytes) -> None:
+        record: Dict[str, Any] = {"line": line}
+        try:
+            payload = json.loads(raw)
+            if isinstance(payload, dict) and "id" in payload:
+                record["id"] = payload["id"]
+            request = AIRequest.model_validate(payload)
+            result = await self.router.route_request(**route_arguments(request))
+            record.update(content=result.content, provider=result.provider, model=result.model, cached=result.cached)
+            if result.usage is not None:
+                record["usage"] = {"prompt_tokens": result.usage.prompt_tokens, "completion_tokens": result.usage.completion_tokens,
+                                   "estimated": result.usage.estimated}
+            self.progress.succeeded += 1
+            self.progress.tokens += result.usage.completion_tokens if result.usage is not None else estimate_text_tokens(result.content or "")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            record.update(error=str(e), error_type=type(e).__name__)
+            self.progress.errors[type(e).__name__] += 1
+        self.output.write(json.dumps(record).encode() + b"\n")
+        self.progress.completed += 1
+        del self.in_flight[line]
+
+    def _save_checkpoint(self) -> None:
+        self.output.flush()
+        if self.in_flight:
+            line = min(self.in_flight)
+            self.checkpoint.next_line = line
+            self.checkpoint.input_offset, self.checkpoint.output_offset = self.in_flight[line]
+        else:
+            self.checkpoint.next_line, self.checkpoint.input_offset = self.next_line, self.next_offset
+            self.checkpoint.output_offset = self.output.tell()
+        self.checkpoint.save()
+
+    async def _report_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self.progress.report()
+
+async def run(args) -> bool:
+    current_transport.set("bulk")
+    current_tenant.set(args.tenant)
+    checkpoint = Checkpoint(args.checkpoint or f"{args.output}.checkpoint")
+    runner = BulkRunner(AIRouter(), args.input, args.output, checkpoint,
+                        concurrency=args.concurrency, checkpoint_interval=args.checkpoint_interval,
+                        report_interval=args.report_interval)
+    return await runner.run()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format=LOG_FORMAT)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of AIRequest objects")
+    parser.add_argument("output", help="JSONL file results are appended to")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight at once")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--checkpoint-interval", type=float, default=5.0, help="Seconds between checkpoints")
+    parser.add_argument("--tenant", default=DEFAULT_TENANT, help="Tenant the requests are accounted and budgeted to")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="Seconds between progress lines")
+    completed = asyncio.run(run(parser.parse_args()))
+    sys.exit(0 if completed else 130)
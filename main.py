@@ -1,30 +1,54 @@
+import argparse
 import asyncio
+import contextlib
 import logging
-import threading
+import socket
+from app.config import config
 from app.grpc_server import serve as serve_grpc
+from app.http_clients import get_http_clients
 from app.http_gateway import app as fastapi_app
+from app.supervisor import WorkerSupervisor, bind_socket
 import uvicorn
-from typing import Any
+from typing import Any, List, Optional
 
 logger = logging.getLogger(__name__)
 
+HTTP_HOST = "0.0.0.0"
+HTTP_PORT = 8000
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class _EmbeddedUvicornServer(uvicorn.Server):
+    # SIGTERM/SIGINT are handled by the gRPC server, which drains in-flight calls
+    # and then lets run_servers stop this server.
+    @contextlib.contextmanager
+    def capture_signals(self):
+        yield
+
 class UvicornServer:
+    # Runs on the same event loop as the gRPC server so both can share one AIRouter
+    # (the provider SDK clients are bound to the loop they were first used on).
     def __init__(self, app: Any, host: str, port: int):
-        self.server = uvicorn.Server(config=uvicorn.Config(app, host=host, port=port, log_level="info"))
-        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        # On stop, in-flight requests (including /stream responses) get the same grace as gRPC calls.
+        grace = float(config.get_section("grpc").get("shutdown_grace_seconds", 30))
+        self.server = _EmbeddedUvicornServer(config=uvicorn.Config(app, host=host, port=port, log_level="info",
+                                                                   timeout_graceful_shutdown=grace))
+        self.task: Optional[asyncio.Task] = None
 
-    def start(self):
-        self.thread.start()
+    def start(self, sockets: Optional[List[socket.socket]] = None):
+        self.task = asyncio.create_task(self.server.serve(sockets=sockets))
 
-    def stop(self):
+    async def stop(self):
         self.server.should_exit = True
-        self.thread.join()
+        if self.task is not None:
+            await self.task
 
-async def run_servers():
-    http_server = UvicornServer(fastapi_app, host="0.0.0.0", port=8000)
-    http_server.start()
+async def run_servers(sockets: Optional[List[socket.socket]] = None):
+    http_server = UvicornServer(fastapi_app, host=HTTP_HOST, port=HTTP_PORT)
+    http_server.start(sockets)
 
-    grpc_task = asyncio.create_task(serve_grpc())
+    # The HTTP gateway may still be streaming through the shared provider pools after the gRPC server stops.
+    # Workers get their HTTP socket passed in and share the gRPC port with each other.
+    grpc_task = asyncio.create_task(serve_grpc(close_http_clients=False, reuse_port=sockets is not None))
 
     try:
         await grpc_task
@@ -34,11 +58,12 @@ async def run_servers():
         logger.error(f"Error in gRPC server: {e}")
     finally:
         logger.info("Stopping HTTP server...")
-        http_server.stop()
+        await http_server.stop()
         logger.info("HTTP server stopped")
+        await get_http_clients().close()
 
-async def main():
-    servers_task = asyncio.create_task(run_servers())
+async def main(sockets: Optional[List[socket.socket]] = None):
+    servers_task = asyncio.create_task(run_servers(sockets))
 
     try:
         await servers_task
@@ -49,11 +74,31 @@ async def main():
         await asyncio.sleep(1)
         logger.info("Shutdown complete.")
 
+def run_worker(http_socket: socket.socket):
+    """Entry point of each process in --workers mode: both servers on the shared ports."""
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    try:
+        asyncio.run(main([http_socket]))
+    except KeyboardInterrupt:
+        pass
+
 if __name__ == "__main__":
-    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+
+    parser = argparse.ArgumentParser(description="Run the AI Router HTTP gateway and gRPC server")
+    parser.add_argument("--workers", type=int, default=config.workers,
+                        help="Number of worker processes; each serves HTTP and gRPC on the shared ports")
+    args = parser.parse_args()
 
     try:
-        asyncio.run(main())
+        if args.workers > 1:
+            # The HTTP socket is bound here and inherited by every worker; the gRPC
+            # servers share their port through SO_REUSEPORT.
+            http_socket = bind_socket(HTTP_HOST, HTTP_PORT)
+            WorkerSupervisor(run_worker, (http_socket,), args.workers,
+                             shutdown_timeout=config.worker_shutdown_timeout).run()
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         pass
     except Exception as e:
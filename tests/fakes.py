@@ -0,0 +1,44 @@
+import asyncio
+from app.repositories.base import BaseAIRepository, Message, Usage
+from typing import AsyncGenerator, Dict, List, Optional
+
+class FakeRepository(BaseAIRepository):
+    """Provider stand-in that echoes the prompt, or streams `chunks` numbered tokens, and counts what it was asked for.
+
+    With `error`, every call raises it instead (a stream after `chunks` tokens).
+    """
+
+    def __init__(self, chunks: int = 16, delay: float = 0.0, response: Optional[str] = None, error: Optional[Exception] = None):
+        self.chunks = chunks
+        self.delay = delay
+        self.response = response
+        self.error = error
+        self.calls = 0
+        self.produced = 0
+        self.prompts: List[str] = []
+        self.messages: List[Optional[List[Message]]] = []
+
+    async def generate_response(self, prompt: str, model: str, max_tokens: int, parameters: Dict[str, str], usage: Optional[Usage] = None,
+                                messages: Optional[List[Message]] = None) -> str:
+        self.calls += 1
+        self.prompts.append(prompt)
+        self.messages.append(messages)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.response if self.response is not None else prompt
+
+    async def stream_response(self, prompt: str, model: str, max_tokens: int, parameters: Dict[str, str], usage: Optional[Usage] = None,
+                              messages: Optional[List[Message]] = None) -> AsyncGenerator[str, None]:
+        self.calls += 1
+        self.prompts.append(prompt)
+        self.messages.append(messages)
+        for index in range(self.chunks):
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            self.produced += 1
+            yield f"token-{index} "
+            await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
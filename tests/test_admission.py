@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+import time
+from app.exceptions import AdmissionTimeoutException, DeadlineUnattainableException, RateLimitedException
+from app.router.admission import AdaptiveConcurrencyLimiter, AdmissionController, TokenBucket
+from app.router.scheduler import BULK, INTERACTIVE, current_priority, set_request_deadline
+
+def test_token_bucket_reports_how_long_a_reservation_must_wait():
+    bucket = TokenBucket(60, capacity=10)
+    assert bucket.reserve(10) == 0.0
+    assert bucket.reserve(2) == pytest.approx(2.0, abs=0.05)
+    bucket.refund(2)
+    assert bucket.available() == pytest.approx(0.0, abs=0.05)
+
+def test_limit_grows_with_fast_calls_and_shrinks_on_overload():
+    limiter = AdaptiveConcurrencyLimiter(initial=4, minimum=2, maximum=5, latency_target=1.0, decrease_factor=0.5, decrease_cooldown=60)
+    for _ in range(8):
+        limiter.on_success(0.1)
+    assert int(limiter.limit) == 5
+    limiter.on_overload()
+    assert limiter.limit == 2.5
+    limiter.on_overload()
+    assert limiter.limit == 2.5, "a second decrease within the cooldown is ignored"
+
+def test_slow_calls_shrink_the_limit_down_to_its_minimum():
+    limiter = AdaptiveConcurrencyLimiter(initial=4, minimum=2, maximum=8, latency_target=1.0, decrease_factor=0.5, decrease_cooldown=0)
+    limiter.on_success(2.0)
+    assert limiter.limit == 2
+    limiter.on_success(2.0)
+    assert limiter.limit == 2
+
+def test_waiters_get_released_slots_and_time_out_otherwise():
+    async def scenario():
+        limiter = AdaptiveConcurrencyLimiter(initial=1, minimum=1, maximum=1, latency_target=1.0)
+        await limiter.acquire(None)
+        with pytest.raises(asyncio.TimeoutError):
+            await limiter.acquire(0.01)
+        waiter = asyncio.ensure_future(limiter.acquire(1.0))
+        await asyncio.sleep(0)
+        limiter.release()
+        await waiter
+        return limiter.in_flight, limiter.queued
+
+    assert asyncio.run(scenario()) == (1, 0)
+
+def make_controller(**defaults) -> AdmissionController:
+    return AdmissionController({
+        "enabled": True,
+        "queue_timeout_seconds": 1,
+        "defaults": {"requests_per_minute": 60, "tokens_per_minute": 6000, "initial_concurrency": 4, **defaults},
+    })
+
+def test_request_is_shed_when_the_rate_limit_wait_exceeds_the_queue_timeout():
+    async def scenario():
+        controller = make_controller()
+        async with controller.admit("openai", "gpt-4o-mini", 6000):
+            pass
+        # The token bucket refills 100 tokens a second, so 200 more would wait about 2s.
+        with pytest.raises(AdmissionTimeoutException):
+            async with controller.admit("openai", "gpt-4o-mini", 200):
+                pass
+
+    asyncio.run(scenario())
+
+def test_request_is_shed_when_its_deadline_cannot_be_met():
+    async def scenario():
+        controller = make_controller()
+        set_request_deadline(0.5)
+        with pytest.raises(DeadlineUnattainableException):
+            async with controller.admit("openai", "gpt-4o-mini", 10, expected_seconds=2.0):
+                pass
+
+    asyncio.run(scenario())
+
+def test_provider_429_lowers_the_concurrency_limit():
+    async def scenario():
+        controller = make_controller()
+        with pytest.raises(RateLimitedException):
+            async with controller.admit("openai", "gpt-4o-mini", 10):
+                raise RateLimitedException("429")
+        return controller.stats()["gates"]["openai/gpt-4o-mini"]
+
+    gate = asyncio.run(scenario())
+    assert gate["concurrency_limit"] == 2
+    assert gate["in_flight"] == 0
+
+def test_interactive_request_is_not_queued_behind_bulk_rate_limit_debt():
+    async def scenario():
+        controller = AdmissionController({
+            "enabled": True,
+            "queue_timeout_seconds": 30,
+            "defaults": {"requests_per_minute": 600, "tokens_per_minute": 10000000, "initial_concurrency": 64, "max_concurrency": 64},
+        })
+
+        async def call(priority: str) -> float:
+            current_priority.set(priority)
+            started_at = time.monotonic()
+            async with controller.admit("openai", "gpt-4o-mini", 10, tenant="tenant"):
+                pass
+            return time.monotonic() - started_at
+
+        # The bucket holds 600 requests; the 20 bulk requests beyond that owe about 2s.
+        bulk = [asyncio.ensure_future(call(BULK)) for _ in range(620)]
+        await asyncio.sleep(0.05)
+        interactive_wait = await call(INTERACTIVE)
+        for task in bulk:
+            task.cancel()
+        await asyncio.gather(*bulk, return_exceptions=True)
+        return interactive_wait
+
+    assert asyncio.run(scenario()) < 0.5
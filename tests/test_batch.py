@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from app.exceptions import BatchTooLargeException, ProviderNotFoundException
+from app.router.batch import BatchDeadlineExceeded, run_batch
+from app.router.router import AIRouter
+from app.router.routing import RouteResult
+from tests.fakes import FakeRepository
+
+class Route:
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.in_flight = {}
+        self.peak = {}
+
+    async def __call__(self, provider: str, prompt: str) -> RouteResult:
+        self.in_flight[provider] = self.in_flight.get(provider, 0) + 1
+        self.peak[provider] = max(self.peak.get(provider, 0), self.in_flight[provider])
+        try:
+            await asyncio.sleep(self.delay)
+            if prompt == "fail":
+                raise ProviderNotFoundException(f"Unsupported provider: {provider}")
+            return RouteResult(prompt, provider)
+        finally:
+            self.in_flight[provider] -= 1
+
+async def collect(items):
+    return [item async for item in items]
+
+def test_every_item_reports_its_own_outcome():
+    requests = [{"provider": "openai", "prompt": str(index)} for index in range(5)] + [{"provider": "openai", "prompt": "fail"}]
+    items = asyncio.run(collect(run_batch(Route(), requests, 8, 8, None)))
+    assert sorted(item.index for item in items) == list(range(6))
+    by_index = {item.index: item for item in items}
+    assert [by_index[index].result.content for index in range(5)] == ["0", "1", "2", "3", "4"]
+    assert isinstance(by_index[5].error, ProviderNotFoundException)
+
+def test_each_provider_lane_is_bounded():
+    route = Route()
+    requests = [{"provider": provider, "prompt": "x"} for provider in ("openai", "anthropic") for _ in range(10)]
+    asyncio.run(collect(run_batch(route, requests, 8, 3, None)))
+    assert route.peak == {"openai": 3, "anthropic": 3}
+
+def test_items_unfinished_at_the_deadline_fail():
+    requests = [{"provider": "openai", "prompt": str(index)} for index in range(4)]
+    items = asyncio.run(collect(run_batch(Route(delay=0.05), requests, 2, 2, 0.08)))
+    assert len(items) == 4
+    assert sum(isinstance(item.error, BatchDeadlineExceeded) for item in items) == 2
+
+def test_router_rejects_batches_over_the_limit_and_runs_the_rest():
+    async def scenario():
+        router = AIRouter()
+        router.admission.enabled = False
+        router.repositories = {name: FakeRepository(response="ok") for name in router.repositories}
+        router.batch_max_items = 3
+        with pytest.raises(BatchTooLargeException):
+            await collect(router.route_batch([{"provider": "openai", "prompt": "x"}] * 4))
+        return await collect(router.route_batch([{"provider": "openai", "prompt": "x", "bypass_cache": True}] * 3))
+
+    items = asyncio.run(scenario())
+    assert [item.result.content for item in items] == ["ok"] * 3
@@ -0,0 +1,52 @@
+import asyncio
+import json
+from bulk import BulkRunner, Checkpoint
+from app.router.router import AIRouter
+from tests.fakes import FakeRepository
+
+def make_runner(tmp_path, repository: FakeRepository) -> BulkRunner:
+    router = AIRouter()
+    router.admission.enabled = False
+    router.cache = None
+    router.repositories = {name: repository for name in router.repositories}
+    checkpoint = Checkpoint(str(tmp_path / "results.jsonl.checkpoint"))
+    return BulkRunner(router, str(tmp_path / "requests.jsonl"), str(tmp_path / "results.jsonl"), checkpoint,
+                      concurrency=4, checkpoint_interval=0.01, report_interval=60)
+
+def write_requests(tmp_path, lines):
+    (tmp_path / "requests.jsonl").write_bytes(b"".join(line.encode() + b"\n" for line in lines))
+
+def read_results(tmp_path):
+    return sorted((json.loads(line) for line in (tmp_path / "results.jsonl").read_text().splitlines()), key=lambda record: record["line"])
+
+def test_every_line_gets_a_result_or_an_error(tmp_path):
+    write_requests(tmp_path, [
+        json.dumps({"id": "a", "provider": "openai", "prompt": "first"}),
+        "",
+        "not json",
+        json.dumps({"provider": "openai"}),
+        json.dumps({"id": "b", "provider": "openai", "prompt": "second"}),
+    ])
+    assert asyncio.run(make_runner(tmp_path, FakeRepository()).run())
+    records = read_results(tmp_path)
+    assert [record["line"] for record in records] == [0, 2, 3, 4]
+    assert (records[0]["id"], records[0]["content"]) == ("a", "first")
+    assert records[1]["error_type"] == "JSONDecodeError"
+    assert records[2]["error_type"] == "ValidationError"
+    assert (records[3]["id"], records[3]["content"]) == ("b", "second")
+    checkpoint = json.loads((tmp_path / "results.jsonl.checkpoint").read_text())
+    assert checkpoint["next_line"] == 5
+
+def test_resume_skips_lines_already_done_and_drops_a_torn_record(tmp_path):
+    lines = [json.dumps({"provider": "openai", "prompt": f"prompt-{index}"}) for index in range(4)]
+    write_requests(tmp_path, lines)
+    done = [json.dumps({"line": 0, "content": "prompt-0"}) + "\n", json.dumps({"line": 2, "content": "prompt-2"}) + "\n"]
+    (tmp_path / "results.jsonl").write_text("".join(done) + '{"line": 3, "cont')
+    checkpoint = Checkpoint(str(tmp_path / "results.jsonl.checkpoint"))
+    checkpoint.next_line, checkpoint.input_offset, checkpoint.output_offset = 1, len(lines[0]) + 1, len(done[0])
+    checkpoint.save()
+
+    repository = FakeRepository()
+    assert asyncio.run(make_runner(tmp_path, repository).run())
+    assert sorted(repository.prompts) == ["prompt-1", "prompt-3"]
+    assert [(record["line"], record["content"]) for record in read_results(tmp_path)] == [(index, f"prompt-{index}") for index in range(4)]
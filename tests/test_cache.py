@@ -0,0 +1,63 @@
+import asyncio
+from app.cache.base import make_cache_key
+from app.cache.memory_cache import InMemoryResponseCache
+from app.cache.redis_cache import RedisResponseCache
+from app.router.router import AIRouter
+from tests.fakes import FakeRepository
+
+def test_cache_key_normalizes_numeric_parameters():
+    key = make_cache_key("openai", "gpt", "hello", 16, {"temperature": "0", "top_p": 1})
+    assert key == make_cache_key("openai", "gpt", "hello", 16, {"top_p": "1.0", "temperature": 0.0})
+    assert key != make_cache_key("openai", "gpt", "hello", 32, {"temperature": "0", "top_p": 1})
+
+def test_memory_cache_evicts_least_recently_used_and_expires_entries():
+    async def scenario():
+        cache = InMemoryResponseCache(max_entries=2, max_bytes=1024, ttl_seconds=60)
+        await cache.set("a", "1")
+        await cache.set("b", "2")
+        assert await cache.get("a") == "1"
+        await cache.set("c", "3")
+        evicted = await cache.get("b")
+        expiring = InMemoryResponseCache(max_entries=2, max_bytes=1024, ttl_seconds=0)
+        await expiring.set("a", "1")
+        return cache, evicted, await expiring.get("a"), expiring
+
+    cache, evicted, expired, expiring = asyncio.run(scenario())
+    assert evicted is None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["entries"] == 2
+    assert expired is None and expiring.stats()["expirations"] == 1
+
+def test_redis_cache_works_with_any_async_client():
+    class FakeRedis:
+        def __init__(self):
+            self.values = {}
+
+        async def get(self, key):
+            return self.values.get(key)
+
+        async def set(self, key, value, ex):
+            self.values[key] = value.encode("utf-8")
+
+    async def scenario():
+        cache = RedisResponseCache(FakeRedis(), ttl_seconds=60)
+        await cache.set("key", "value")
+        return await cache.get("key"), await cache.get("other")
+
+    assert asyncio.run(scenario()) == ("value", None)
+
+def test_router_caches_only_deterministic_requests():
+    async def scenario():
+        router = AIRouter()
+        router.cache = InMemoryResponseCache(max_entries=100, max_bytes=1 << 20, ttl_seconds=60)
+        repository = FakeRepository(chunks=3)
+        router.repositories = {name: repository for name in router.repositories}
+        deterministic = [await router.route_request("openai", "hello", parameters={"temperature": "0"}) for _ in range(2)]
+        sampled = [await router.route_request("openai", "hello", parameters={"temperature": "0.7"}) for _ in range(2)]
+        replayed = "".join([chunk async for chunk in router.stream_request("openai", "hello", parameters={"temperature": "0"})])
+        return repository.calls, deterministic, sampled, replayed
+
+    calls, deterministic, sampled, replayed = asyncio.run(scenario())
+    assert calls == 3
+    assert [result.cached for result in deterministic] == [False, True]
+    assert not any(result.cached for result in sampled)
+    assert replayed == "hello"
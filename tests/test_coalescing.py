@@ -0,0 +1,122 @@
+import asyncio
+import pytest
+from app.exceptions import AIGenerationException
+from app.router.coalescing import SingleFlight, StreamCoalescer
+from app.router.router import AIRouter
+from tests.fakes import FakeRepository
+from typing import Optional
+
+class CountingSource:
+    def __init__(self, chunks: int):
+        self.chunks = chunks
+        self.produced = 0
+
+    async def stream(self):
+        for index in range(self.chunks):
+            self.produced += 1
+            yield f"chunk-{index}"
+            await asyncio.sleep(0)
+
+def test_lone_slow_reader_paces_upstream():
+    async def scenario():
+        coalescer = StreamCoalescer(buffer_size=4)
+        source = CountingSource(50)
+        received = []
+        max_read_ahead = 0
+        async for chunk in coalescer.subscribe("key", source.stream):
+            received.append(chunk)
+            max_read_ahead = max(max_read_ahead, source.produced - len(received))
+            await asyncio.sleep(0.001)
+        return coalescer, received, max_read_ahead
+
+    coalescer, received, max_read_ahead = asyncio.run(scenario())
+    assert received == [f"chunk-{index}" for index in range(50)]
+    assert coalescer.stats()["dropped_subscribers"] == 0
+    assert max_read_ahead <= 4 + 1
+
+def test_laggard_is_dropped_while_others_keep_reading():
+    async def scenario():
+        coalescer = StreamCoalescer(buffer_size=4)
+        source = CountingSource(50)
+        fast = coalescer.subscribe("key", source.stream)
+        slow = coalescer.subscribe("key", source.stream)
+        first = await slow.__anext__()
+
+        async def read_slowly():
+            chunks = [first]
+            async for chunk in slow:
+                chunks.append(chunk)
+                await asyncio.sleep(0.01)
+            return chunks
+
+        slow_task = asyncio.ensure_future(read_slowly())
+        fast_chunks = [chunk async for chunk in fast]
+        with pytest.raises(AIGenerationException):
+            await slow_task
+        return coalescer, fast_chunks
+
+    coalescer, fast_chunks = asyncio.run(scenario())
+    assert len(fast_chunks) == 50
+    assert coalescer.stats()["dropped_subscribers"] == 1
+
+@pytest.mark.parametrize("temperature, upstream_calls", [("0", 1), ("0.7", 5)])
+def test_only_deterministic_requests_are_coalesced(temperature, upstream_calls):
+    async def scenario():
+        router = AIRouter()
+        router.admission.enabled = False
+        router.cache = None
+        repository = FakeRepository(delay=0.01)
+        router.repositories = {name: repository for name in router.repositories}
+        router.coalescing_enabled = True
+        await asyncio.gather(*(router.route_request("openai", "hello", parameters={"temperature": temperature}) for _ in range(5)))
+        return repository.calls
+
+    assert asyncio.run(scenario()) == upstream_calls
+
+class Call:
+    def __init__(self, error: Optional[Exception] = None):
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        try:
+            await asyncio.sleep(0.02)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return "answer"
+
+def test_concurrent_calls_share_one_result_or_error():
+    async def scenario():
+        flight, call, failing = SingleFlight(), Call(), Call(RuntimeError("upstream"))
+        results = await asyncio.gather(*(flight.do("key", call) for _ in range(3)))
+        errors = await asyncio.gather(*(flight.do("other", failing) for _ in range(2)), return_exceptions=True)
+        await flight.do("key", call)
+        return results, [str(error) for error in errors], call.calls, failing.calls, flight.stats()
+
+    results, errors, calls, failing_calls, stats = asyncio.run(scenario())
+    assert results == ["answer"] * 3
+    assert errors == ["upstream"] * 2
+    assert (calls, failing_calls) == (2, 1)
+    assert stats["coalesced"] == 3
+
+def test_call_is_cancelled_only_once_every_caller_left():
+    async def scenario():
+        flight, call = SingleFlight(), Call()
+        first = asyncio.ensure_future(flight.do("key", call))
+        second = asyncio.ensure_future(flight.do("key", call))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "answer"
+        lone = asyncio.ensure_future(flight.do("key", call))
+        await asyncio.sleep(0)
+        lone.cancel()
+        await asyncio.gather(lone, return_exceptions=True)
+        await asyncio.sleep(0)
+        return call.cancelled
+
+    assert asyncio.run(scenario())
@@ -0,0 +1,61 @@
+import pytest
+import yaml
+from app.config import Config, ConfigSnapshot
+from app.exceptions import ConfigurationException
+
+def config_yaml(**providers):
+    return {"server": {"grpc_port": 50051, "http_port": 8000}, "providers": providers or {"mock": {"default_model": "small"}}}
+
+def test_snapshot_applies_defaults_and_environment_overrides(monkeypatch):
+    monkeypatch.setenv("MOCK_DEFAULT_MAX_TOKENS", "64")
+    snapshot = ConfigSnapshot(config_yaml(), version=1)
+    provider = snapshot.providers["mock"]
+    assert (provider.default_model, provider.default_max_tokens, provider.base_url) == ("small", 64, None)
+
+def test_snapshot_is_immutable():
+    snapshot = ConfigSnapshot(config_yaml(), version=1)
+    with pytest.raises(AttributeError):
+        snapshot.version = 2
+    with pytest.raises(AttributeError):
+        snapshot.providers["mock"].default_model = "large"
+    with pytest.raises(TypeError):
+        snapshot.providers["other"] = None
+
+@pytest.mark.parametrize("yaml_config", [
+    [],
+    {"server": {"grpc_port": "50051", "http_port": 8000}, "providers": {"mock": {}}},
+    {"server": {"grpc_port": 50051, "http_port": 8000}, "providers": {}},
+    config_yaml(mock={"default_max_tokens": 0}),
+    config_yaml(mock={"default_max_tokens": "many"}),
+    config_yaml(mock={"default_model": 4}),
+])
+def test_invalid_config_is_rejected(yaml_config):
+    with pytest.raises(ConfigurationException):
+        ConfigSnapshot(yaml_config, version=1)
+
+def test_reload_swaps_the_snapshot_or_keeps_the_current_one(tmp_path, monkeypatch):
+    path = tmp_path / "config.yaml"
+    monkeypatch.setenv("CONFIG_PATH", str(path))
+    path.write_text(yaml.safe_dump(config_yaml()))
+    settings = Config()
+    assert settings.get_default_model("mock") == "small"
+    before = settings.snapshot
+
+    path.write_text(yaml.safe_dump(config_yaml(mock={"default_model": "large"})))
+    assert settings.reload()
+    assert settings.get_default_model("mock") == "large"
+    assert settings.snapshot.version == 2
+    assert before.providers["mock"].default_model == "small"
+
+    path.write_text(yaml.safe_dump(config_yaml(mock={"default_max_tokens": -1})))
+    assert not settings.reload()
+    path.write_text("providers: [")
+    assert not settings.reload()
+    assert settings.get_default_model("mock") == "large"
+    assert settings.snapshot.version == 2
+
+def test_unknown_provider_gets_the_defaults(tmp_path, monkeypatch):
+    path = tmp_path / "config.yaml"
+    monkeypatch.setenv("CONFIG_PATH", str(path))
+    path.write_text(yaml.safe_dump(config_yaml()))
+    assert Config().get_default_max_tokens("unconfigured") == 1000
@@ -0,0 +1,59 @@
+import asyncio
+import grpc
+import pytest
+from app import ai_router_pb2, ai_router_pb2_grpc
+from app.exceptions import ConfigurationException
+from app.grpc_pool import GrpcChannelPool
+from app.grpc_server import AIRouterServicer
+from app.router.router import AIRouter
+from tests.fakes import FakeRepository
+
+def test_pool_size_must_be_positive():
+    with pytest.raises(ConfigurationException):
+        GrpcChannelPool("localhost:1", 0)
+
+def test_stubs_are_only_handed_out_once_started():
+    async def scenario():
+        server = grpc.aio.server()
+        port = server.add_insecure_port("127.0.0.1:0")
+        await server.start()
+        pool = GrpcChannelPool(f"127.0.0.1:{port}", 3)
+        try:
+            with pytest.raises(ConfigurationException):
+                pool.get_stub()
+            await pool.start()
+            await pool.start()
+            return [pool.get_stub() for _ in range(6)], pool.stats()
+        finally:
+            await pool.close()
+            await server.stop(None)
+
+    stubs, stats = asyncio.run(scenario())
+    assert len(set(map(id, stubs))) == 3
+    assert stubs[:3] == stubs[3:]
+    assert stats["open_channels"] == 3
+
+def test_requests_round_trip_over_pooled_channels():
+    async def scenario():
+        router = AIRouter()
+        router.admission.enabled = False
+        router.repositories = {name: FakeRepository(chunks=3) for name in router.repositories}
+        server = grpc.aio.server()
+        ai_router_pb2_grpc.add_AIRouterServicer_to_server(AIRouterServicer(router), server)
+        port = server.add_insecure_port("127.0.0.1:0")
+        await server.start()
+        pool = GrpcChannelPool(f"127.0.0.1:{port}", 2)
+        await pool.start()
+        try:
+            request = ai_router_pb2.AIRequest(provider="openai", prompt="hello", bypass_cache=True)
+            responses = await asyncio.gather(*(pool.get_stub().RouteRequest(request) for _ in range(4)))
+            chunks = [response.content async for response in pool.get_stub().StreamingRouteRequest(request) if not response.HasField("usage")]
+            return [response.content for response in responses], "".join(chunks), pool.stats()
+        finally:
+            await pool.close()
+            await server.stop(None)
+
+    contents, streamed, stats = asyncio.run(scenario())
+    assert contents == ["hello"] * 4
+    assert streamed == "token-0 token-1 token-2 "
+    assert stats["healthy"] and stats["ready_connections"] == 2
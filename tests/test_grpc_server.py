@@ -0,0 +1,52 @@
+import asyncio
+import grpc
+import pytest
+from app import ai_router_pb2, ai_router_pb2_grpc
+from app.grpc_server import AIRouterServicer, build_server_options
+from app.router.router import AIRouter
+from tests.fakes import FakeRepository
+
+def test_http2_tuning_comes_from_config():
+    options = dict(build_server_options({"http2": {"bdp_probe": False, "stream_window_bytes": 1048576}}))
+    assert options["grpc.http2.bdp_probe"] == 0
+    assert options["grpc.http2.lookahead_bytes"] == 1048576
+    assert "grpc.http2.max_frame_size" not in options
+
+def bind_twice(reuse_port: bool) -> int:
+    async def scenario():
+        first = grpc.aio.server(options=build_server_options({}, reuse_port))
+        port = first.add_insecure_port("127.0.0.1:0")
+        second = grpc.aio.server(options=build_server_options({}, reuse_port))
+        try:
+            return second.add_insecure_port(f"127.0.0.1:{port}")
+        finally:
+            await first.stop(None)
+            await second.stop(None)
+
+    return asyncio.run(scenario())
+
+def test_port_is_shared_only_when_asked():
+    with pytest.raises(RuntimeError):
+        bind_twice(reuse_port=False)
+    assert bind_twice(reuse_port=True) > 0
+
+def test_client_deadline_bounds_the_call():
+    async def scenario():
+        router = AIRouter()
+        router.admission.enabled = False
+        router.repositories = {name: FakeRepository(delay=1.0) for name in router.repositories}
+        server = grpc.aio.server()
+        ai_router_pb2_grpc.add_AIRouterServicer_to_server(AIRouterServicer(router), server)
+        port = server.add_insecure_port("127.0.0.1:0")
+        await server.start()
+        try:
+            async with grpc.aio.insecure_channel(f"127.0.0.1:{port}") as channel:
+                stub = ai_router_pb2_grpc.AIRouterStub(channel)
+                request = ai_router_pb2.AIRequest(provider="openai", prompt="hello", bypass_cache=True)
+                with pytest.raises(grpc.aio.AioRpcError) as error:
+                    await stub.RouteRequest(request, timeout=0.1)
+                return error.value.code()
+        finally:
+            await server.stop(None)
+
+    assert asyncio.run(scenario()) == grpc.StatusCode.DEADLINE_EXCEEDED
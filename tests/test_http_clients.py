@@ -0,0 +1,49 @@
+import asyncio
+from app.config import config
+from app.http_clients import ProviderHttpClients
+
+def test_warm_opens_pools_for_configured_providers(monkeypatch):
+    monkeypatch.setattr(config, "get_base_url", lambda provider: None)
+    touched = []
+
+    async def scenario():
+        clients = ProviderHttpClients({"warm_connections": 2})
+        original = clients._create_client
+
+        def create(origin):
+            client = original(origin)
+
+            async def head(url, **kwargs):
+                touched.append(url)
+            client.head = head
+            return client
+
+        clients._create_client = create
+        await clients.warm(["openai", "anthropic", "custom-without-base-url"])
+        origins = sorted(clients._clients)
+        await clients.close()
+        return origins
+
+    origins = asyncio.run(scenario())
+    assert origins == ["https://api.anthropic.com", "https://api.openai.com"]
+    assert sorted(touched) == ["https://api.anthropic.com"] * 2 + ["https://api.openai.com"] * 2
+
+def test_pool_stats_are_skipped_for_unknown_httpx_releases(monkeypatch):
+    import httpx
+
+    monkeypatch.setattr(config, "get_base_url", lambda provider: None)
+
+    async def scenario():
+        clients = ProviderHttpClients({})
+        clients.client_for("openai")
+        supported = clients.stats()["pools"]
+        clients._pool_stats_supported = None
+        monkeypatch.setattr(httpx, "__version__", "9.0.0")
+        unsupported = clients.stats()["pools"], clients._gauge("active")
+        await clients.close()
+        return supported, unsupported
+
+    supported, (unsupported, gauge) = asyncio.run(scenario())
+    assert supported["https://api.openai.com"]["connections"] == 0
+    assert unsupported == {}
+    assert gauge == []
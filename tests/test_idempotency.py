@@ -0,0 +1,127 @@
+import asyncio
+import pytest
+from app.cache.memory_cache import InMemoryResponseCache
+from app.cache.sqlite_cache import SqliteResponseCache
+from app.exceptions import AIGenerationException, IdempotencyKeyReusedException
+from app.repositories.base import Message, Usage
+from app.router.idempotency import IdempotencyStore, request_fingerprint
+from app.router.router import AIRouter
+from app.router.routing import RouteResult
+from tests.fakes import FakeRepository
+
+def fingerprint(prompt: str = "hello", **overrides) -> str:
+    request = {"model": None, "max_tokens": None, "parameters": None, "bypass_cache": False, "messages": None, "session_id": None}
+    request.update(overrides)
+    return request_fingerprint("openai", prompt, **request)
+
+def test_fingerprint_treats_unset_and_empty_alike():
+    assert fingerprint() == fingerprint(model="", max_tokens=0, parameters={}, messages=[], session_id="")
+    assert fingerprint(parameters={"a": "1", "b": "2"}) == fingerprint(parameters={"b": "2", "a": "1"})
+    assert fingerprint() != fingerprint("goodbye")
+    assert fingerprint(messages=[Message("user", "hello")]) != fingerprint(messages=[Message("system", "hello")])
+
+def make_store() -> IdempotencyStore:
+    return IdempotencyStore(InMemoryResponseCache(max_entries=100, max_bytes=1 << 20, ttl_seconds=60))
+
+class Upstream:
+    def __init__(self, delay: float = 0.0, error: bool = False):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self) -> RouteResult:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise AIGenerationException("provider failed")
+        return RouteResult("answer", "openai", "gpt-4o-mini", usage=Usage(3, 5))
+
+def test_retries_attach_to_the_running_call_and_then_replay_it():
+    async def scenario():
+        store, upstream = make_store(), Upstream(delay=0.01)
+        running = await asyncio.gather(*(store.run("acme", "key-1", fingerprint(), upstream) for _ in range(3)))
+        replayed = await store.run("acme", "key-1", fingerprint(), upstream)
+        return upstream.calls, running, replayed
+
+    calls, running, replayed = asyncio.run(scenario())
+    assert calls == 1
+    assert [result.cached for result in running] == [False, True, True]
+    assert replayed.cached and replayed.content == "answer"
+    assert (replayed.usage.prompt_tokens, replayed.usage.completion_tokens) == (3, 5)
+
+def test_call_keeps_running_when_its_first_caller_gives_up():
+    async def scenario():
+        store, upstream = make_store(), Upstream(delay=0.02)
+        first = asyncio.ensure_future(store.run("acme", "key-1", fingerprint(), upstream))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        retry = await store.run("acme", "key-1", fingerprint(), upstream)
+        return upstream.calls, retry
+
+    calls, retry = asyncio.run(scenario())
+    assert calls == 1
+    assert retry.content == "answer"
+
+def test_key_reused_for_another_request_is_rejected():
+    async def scenario():
+        store, upstream = make_store(), Upstream()
+        await store.run("acme", "key-1", fingerprint(), upstream)
+        with pytest.raises(IdempotencyKeyReusedException):
+            await store.run("acme", "key-1", fingerprint("goodbye"), upstream)
+        await store.run("other-tenant", "key-1", fingerprint("goodbye"), upstream)
+        return upstream.calls
+
+    assert asyncio.run(scenario()) == 2
+
+def test_failed_calls_are_not_stored():
+    async def scenario():
+        store, failing = make_store(), Upstream(error=True)
+        with pytest.raises(AIGenerationException):
+            await store.run("acme", "key-1", fingerprint(), failing)
+        upstream = Upstream()
+        result = await store.run("acme", "key-1", fingerprint(), upstream)
+        return upstream.calls, result, store.stats()["running"]
+
+    calls, result, running = asyncio.run(scenario())
+    assert calls == 1
+    assert not result.cached
+    assert running == 0
+
+def test_sqlite_store_survives_a_restart_and_expires_entries(tmp_path):
+    path = str(tmp_path / "idempotency.db")
+
+    async def scenario():
+        await SqliteResponseCache(path, ttl_seconds=60, max_entries=10).set("kept", "value")
+        await SqliteResponseCache(path, ttl_seconds=-1, max_entries=10).set("expired", "value")
+        reopened = SqliteResponseCache(path, ttl_seconds=60, max_entries=10)
+        return await reopened.get("kept"), await reopened.get("expired")
+
+    assert asyncio.run(scenario()) == ("value", None)
+
+def test_sqlite_store_prunes_the_oldest_entries_beyond_its_size(tmp_path):
+    async def scenario():
+        cache = SqliteResponseCache(str(tmp_path / "idempotency.db"), ttl_seconds=60, max_entries=2, prune_every=4)
+        for index in range(4):
+            await cache.set(f"key-{index}", str(index))
+        return [await cache.get(f"key-{index}") for index in range(4)], cache.counters.evictions
+
+    values, evictions = asyncio.run(scenario())
+    assert values == [None, None, "2", "3"]
+    assert evictions == 2
+
+def test_router_sends_a_retried_request_upstream_once():
+    async def scenario():
+        repository = FakeRepository(response="done")
+        router = AIRouter()
+        router.admission.enabled = False
+        router.cache = None
+        router.idempotency = make_store()
+        router.repositories = {name: repository for name in router.repositories}
+        first = await router.route_request("openai", "charge the card", idempotency_key="order-7")
+        retry = await router.route_request("openai", "charge the card", idempotency_key="order-7")
+        return repository.calls, first, retry
+
+    calls, first, retry = asyncio.run(scenario())
+    assert calls == 1
+    assert (first.cached, retry.cached) == (False, True)
+    assert retry.content == "done"
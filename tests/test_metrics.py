@@ -0,0 +1,43 @@
+from fastapi.testclient import TestClient
+from app import http_gateway
+from app.metrics import Counter, GaugeFamily, Histogram, MetricsRegistry, Timer
+
+def test_histogram_renders_cumulative_buckets_sum_and_count():
+    histogram = Histogram("latency_seconds", "Latency", ("provider",), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(("openai",), value)
+    assert list(histogram.render()) == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{provider="openai",le="0.1"} 2',
+        'latency_seconds_bucket{provider="openai",le="1"} 3',
+        'latency_seconds_bucket{provider="openai",le="+Inf"} 4',
+        'latency_seconds_sum{provider="openai"} 3.65',
+        'latency_seconds_count{provider="openai"} 4',
+    ]
+
+def test_counter_escapes_label_values():
+    counter = Counter("errors_total", "Errors", ("exception",))
+    counter.inc(('say "hi"\\\n',))
+    counter.inc(('say "hi"\\\n',), 2)
+    assert list(counter.render())[-1] == 'errors_total{exception="say \\"hi\\"\\\\\\n"} 3'
+
+def test_registry_renders_gauges_collected_at_scrape_time():
+    state = {"in_flight": 1}
+    registry = MetricsRegistry()
+    registry.register(GaugeFamily("in_flight", "Calls in flight", (), lambda: [((), state["in_flight"])]))
+    state["in_flight"] = 5
+    assert registry.render().endswith("in_flight 5\n")
+
+def test_timer_observes_the_block():
+    histogram = Histogram("block_seconds", "Block", ())
+    with Timer(histogram, ()):
+        pass
+    assert list(histogram.render())[-1] == "block_seconds_count 1"
+
+def test_metrics_endpoint_serves_prometheus_text():
+    with TestClient(http_gateway.app) as client:
+        response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE ai_router_upstream_ttft_seconds histogram" in response.text
@@ -0,0 +1,50 @@
+import asyncio
+import pytest
+from app import http_clients
+from app.config import config
+from app.exceptions import AIGenerationException, RateLimitedException
+from app.http_clients import ProviderHttpClients
+from app.repositories.anthropic_repo import AnthropicRepository
+from app.repositories.base import Usage
+from app.repositories.openai_repo import OpenAIRepository
+from benchmarks.mock_provider import MockSettings, start_mock_provider
+
+REPOSITORIES = {"openai": OpenAIRepository, "anthropic": AnthropicRepository}
+
+def run_against_mock(monkeypatch, provider: str, settings: MockSettings, exercise):
+    async def scenario():
+        runner = await start_mock_provider(settings)
+        host, port = runner.addresses[0][:2]
+        base_urls = {"openai": f"http://{host}:{port}/v1", "anthropic": f"http://{host}:{port}"}
+        monkeypatch.setattr(config, "get_base_url", base_urls.get)
+        monkeypatch.setattr(config, f"{provider}_api_key", "mock-key")
+        monkeypatch.setattr(http_clients, "_shared_clients", ProviderHttpClients({}))
+        try:
+            return await exercise(REPOSITORIES[provider]())
+        finally:
+            await http_clients.get_http_clients().close()
+            await runner.cleanup()
+
+    return asyncio.run(scenario())
+
+@pytest.mark.parametrize("provider", ["openai", "anthropic"])
+def test_sdk_repositories_generate_and_stream_against_the_mock(monkeypatch, provider):
+    async def exercise(repository):
+        usage, stream_usage = Usage(), Usage()
+        text = await repository.generate_response("hello", "mock-model", 64, {}, usage)
+        streamed = "".join([chunk async for chunk in repository.stream_response("hello", "mock-model", 64, {}, stream_usage)])
+        return text, usage, streamed, stream_usage
+
+    settings = MockSettings(latency=0, chunks=4, chunk_interval=0)
+    text, usage, streamed, stream_usage = run_against_mock(monkeypatch, provider, settings, exercise)
+    assert text == streamed == "token0 token1 token2 token3 "
+    assert usage.completion_tokens == stream_usage.completion_tokens == 4
+
+@pytest.mark.parametrize("provider", ["openai", "anthropic"])
+@pytest.mark.parametrize("failure, expected", [({"rate_limit_rate": 1.0}, RateLimitedException), ({"error_rate": 1.0}, AIGenerationException)])
+def test_injected_failures_surface_as_router_exceptions(monkeypatch, provider, failure, expected):
+    async def exercise(repository):
+        with pytest.raises(expected):
+            await repository.generate_response("hello", "mock-model", 64, {})
+
+    run_against_mock(monkeypatch, provider, MockSettings(latency=0, **failure), exercise)
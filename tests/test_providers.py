@@ -0,0 +1,39 @@
+import pytest
+from app.exceptions import ConfigurationException
+from app.providers import DEFAULT_STRATEGY, ProviderRegistry
+from tests.fakes import FakeRepository
+
+FAKE = "tests.fakes:FakeRepository"
+
+def test_config_overrides_entry_points_which_override_builtins():
+    registry = ProviderRegistry({"openai": {"repository": FAKE}, "local": {"repository": FAKE}},
+                                {"anthropic": {"repository": "plugin.module:Repository"}, "local": {"repository": "plugin.module:Local"}})
+    assert registry.specs["openai"].repository_path == FAKE
+    assert registry.specs["openai"].strategy_path == "app.strategies.openai_strategy:OpenAIStrategy"
+    assert registry.specs["anthropic"].repository_path == "plugin.module:Repository"
+    assert registry.specs["local"].repository_path == FAKE
+    assert registry.specs["local"].strategy_path == DEFAULT_STRATEGY
+
+def test_provider_without_a_repository_is_rejected():
+    with pytest.raises(ConfigurationException):
+        ProviderRegistry({"unknown": {}})
+
+def test_providers_are_built_on_first_use_only():
+    registry = ProviderRegistry({"local": {"repository": FAKE}, "other": {"repository": FAKE}})
+    assert "local" in registry.repositories and len(registry.repositories) == 2
+    assert registry.loaded() == []
+    repository = registry.repositories["local"]
+    assert isinstance(repository, FakeRepository)
+    assert registry.repositories["local"] is repository
+    assert registry.loaded() == ["local"]
+
+def test_preload_builds_marked_providers():
+    registry = ProviderRegistry({"local": {"repository": FAKE, "preload": True}, "other": {"repository": FAKE}})
+    assert registry.preload() == ["local"]
+    assert registry.loaded() == ["local"]
+
+@pytest.mark.parametrize("path", ["tests.fakes:Missing", "no_such_module:Repository", "tests.fakes:Usage"])
+def test_bad_repository_paths_fail_on_load(path):
+    registry = ProviderRegistry({"local": {"repository": path}})
+    with pytest.raises(ConfigurationException):
+        registry.repositories["local"]
@@ -0,0 +1,55 @@
+from app.router.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, RetryBudget
+
+def make_breaker() -> CircuitBreaker:
+    return CircuitBreaker("openai/gpt", window_seconds=30, buckets=10, min_requests=4, error_rate_threshold=0.5,
+                          open_seconds=0, half_open_max_calls=2)
+
+def open_breaker(breaker: CircuitBreaker) -> None:
+    for _ in range(4):
+        breaker.allow().record_failure()
+    assert breaker.state == OPEN
+
+def test_breaker_opens_on_error_rate_and_closes_after_probe_successes():
+    breaker = make_breaker()
+    open_breaker(breaker)
+    probes = [breaker.allow(), breaker.allow()]
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is None
+    for probe in probes:
+        probe.record_success()
+    assert breaker.state == CLOSED
+
+def test_call_from_before_half_open_does_not_free_a_probe_slot():
+    breaker = make_breaker()
+    stale = [breaker.allow() for _ in range(3)]
+    open_breaker(breaker)
+    probes = [breaker.allow(), breaker.allow()]
+    stale[0].record_success()
+    stale[1].record_abandoned()
+    stale[2].record_failure()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is None
+    probes[0].record_abandoned()
+    assert breaker.allow() is not None
+
+def test_probe_from_an_earlier_half_open_period_is_ignored():
+    breaker = make_breaker()
+    open_breaker(breaker)
+    old_probe, failing_probe = breaker.allow(), breaker.allow()
+    failing_probe.record_failure()
+    assert breaker.state == OPEN
+    new_probes = [breaker.allow(), breaker.allow()]
+    old_probe.record_success()
+    assert breaker.allow() is None
+    for probe in new_probes:
+        probe.record_success()
+    assert breaker.state == CLOSED
+
+def test_retry_budget_caps_retries_at_a_share_of_requests():
+    budget = RetryBudget(ratio=0.5, min_per_second=0, max_tokens=1)
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    for _ in range(2):
+        budget.record_request()
+    assert budget.try_spend()
+    assert budget.stats()["exhausted"] == 1
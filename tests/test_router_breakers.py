@@ -0,0 +1,38 @@
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from app.exceptions import AdmissionTimeoutException
+from app.router.resilience import HALF_OPEN, OPEN
+from app.router.router import AIRouter
+from tests.fakes import FakeRepository
+
+@asynccontextmanager
+async def rejecting_admit(*args, **kwargs):
+    raise AdmissionTimeoutException("Timed out waiting for capacity")
+    yield
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_admission_failures_free_half_open_probe_slots(streaming):
+    async def call(router):
+        if streaming:
+            return "".join([chunk async for chunk in router.stream_request("openai", "hello", bypass_cache=True)])
+        return (await router.route_request("openai", "hello", bypass_cache=True)).content
+
+    async def scenario():
+        router = AIRouter()
+        router.repositories = {name: FakeRepository() for name in router.repositories}
+        model, _ = router._resolve_input("openai", None, None)
+        breaker = router.breakers.get("openai", model)
+        breaker.state = OPEN
+        breaker._opened_at = -breaker.open_seconds
+        admit = router.admission.admit
+        router.admission.admit = rejecting_admit
+        for _ in range(breaker.half_open_max_calls):
+            with pytest.raises(AdmissionTimeoutException):
+                await call(router)
+        assert breaker.state == HALF_OPEN
+        assert breaker._probes_in_flight == 0
+        router.admission.admit = admit
+        assert await call(router)
+
+    asyncio.run(scenario())
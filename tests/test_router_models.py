@@ -0,0 +1,26 @@
+import asyncio
+import pytest
+from app.router.router import OTHER_MODEL, AIRouter
+from tests.fakes import FakeRepository
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_unconfigured_models_share_per_model_state(streaming):
+    async def call(router, model):
+        if streaming:
+            return "".join([chunk async for chunk in router.stream_request("openai", "hello", model, bypass_cache=True)])
+        return (await router.route_request("openai", "hello", model, bypass_cache=True)).content
+
+    async def scenario():
+        router = AIRouter()
+        router.admission.enabled = True
+        router.repositories = {name: FakeRepository() for name in router.repositories}
+        default_model, _ = router._resolve_input("openai", None, None)
+        await call(router, None)
+        for index in range(50):
+            assert await call(router, f"made-up-model-{index}")
+        expected = {f"openai/{default_model}", f"openai/{OTHER_MODEL}"}
+        assert set(router.breakers.stats()["states"]) == expected
+        assert set(router.admission.stats()["gates"]) == expected
+        assert set(router.routing.stats()) == expected
+
+    asyncio.run(scenario())
@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from app.exceptions import AIGenerationException, ConfigurationException
+from app.router.router import AIRouter
+from app.router.routing import Candidate, LatencyAwareSelector
+from app.router.scheduler import BULK, INTERACTIVE
+from tests.fakes import FakeRepository
+
+GROUP = [{"provider": "openai", "model": "fast"}, {"provider": "anthropic", "model": "slow"}]
+
+def make_selector(**routing_config) -> LatencyAwareSelector:
+    return LatencyAwareSelector({"groups": {"auto": GROUP}, "explore_ratio": 0, **routing_config}, ["openai", "anthropic"])
+
+def ranked(selector: LatencyAwareSelector, streaming: bool = False):
+    return [candidate.provider for candidate in selector.rank("auto", streaming)]
+
+def test_unmeasured_candidates_are_tried_first():
+    selector = make_selector()
+    selector.record_success("openai", "fast", 0.1, 0.5)
+    assert ranked(selector) == ["anthropic", "openai"]
+
+def test_candidates_are_ranked_by_the_latency_that_matters():
+    selector = make_selector()
+    selector.record_success("openai", "fast", ttft=0.5, total=1.0)
+    selector.record_success("anthropic", "slow", ttft=0.1, total=3.0)
+    assert ranked(selector) == ["openai", "anthropic"]
+    assert ranked(selector, streaming=True) == ["anthropic", "openai"]
+
+def test_failing_or_unavailable_candidates_go_last():
+    selector = make_selector(ewma_alpha=0.5)
+    selector.record_success("openai", "fast", 0.1, 0.5)
+    selector.record_success("anthropic", "slow", 0.2, 1.0)
+    selector.record_failure("openai", "fast")
+    selector.record_failure("openai", "fast")
+    assert ranked(selector) == ["anthropic", "openai"]
+    healthy = make_selector()
+    healthy.is_available = lambda provider, model: provider != "openai"
+    assert ranked(healthy) == ["anthropic", "openai"]
+
+def test_hedge_delay_waits_for_enough_samples():
+    selector = make_selector(hedge={"enabled": True, "percentile": 50, "min_samples": 3})
+    candidate = Candidate("openai", "fast")
+    for total in (1.0, 2.0):
+        selector.record_success("openai", "fast", 0.1, total)
+    assert selector.hedge_delay(candidate) is None
+    selector.record_success("openai", "fast", 0.1, 3.0)
+    assert selector.hedge_delay(candidate) == 2.0
+
+def test_race_width_is_limited_to_configured_priorities():
+    selector = make_selector(speculative_streaming={"enabled": True, "candidates": 5})
+    assert selector.race_width("auto", INTERACTIVE) == 2
+    assert selector.race_width("auto", BULK) == 1
+
+def test_groups_must_not_clash_with_or_reference_unknown_providers():
+    with pytest.raises(ConfigurationException):
+        LatencyAwareSelector({"groups": {"openai": GROUP}}, ["openai", "anthropic"])
+    with pytest.raises(ConfigurationException):
+        LatencyAwareSelector({"groups": {"auto": [{"provider": "nope", "model": "x"}]}}, ["openai"])
+
+def make_router(**repositories) -> AIRouter:
+    router = AIRouter()
+    router.admission.enabled = False
+    router.cache = None
+    router.max_retries = 0
+    router.routing = make_selector()
+    router.routing.is_available = router.breakers.is_available
+    router.repositories = {**router.repositories, **repositories}
+    return router
+
+def test_group_request_fails_over_to_the_next_candidate():
+    async def scenario():
+        router = make_router(openai=FakeRepository(error=AIGenerationException("down")), anthropic=FakeRepository(response="from anthropic"))
+        router.routing.record_success("openai", "fast", 0.1, 0.1)
+        router.routing.record_success("anthropic", "slow", 0.1, 1.0)
+        return await router.route_request("auto", "hello")
+
+    result = asyncio.run(scenario())
+    assert (result.provider, result.model, result.content) == ("anthropic", "slow", "from anthropic")
+
+def test_group_stream_fails_over_only_before_the_first_chunk():
+    async def read(router):
+        return "".join([chunk async for chunk in router.stream_request("auto", "hello")])
+
+    async def scenario():
+        router = make_router(openai=FakeRepository(chunks=0, error=AIGenerationException("down")), anthropic=FakeRepository(chunks=2))
+        text = await read(router)
+        router = make_router(openai=FakeRepository(chunks=2, error=AIGenerationException("cut off")), anthropic=FakeRepository(chunks=2))
+        with pytest.raises(AIGenerationException):
+            await read(router)
+        return text
+
+    assert asyncio.run(scenario()) == "token-0 token-1 "
@@ -0,0 +1,60 @@
+from app.router.scheduler import BULK, INTERACTIVE, FairQueue, parse_priority, parse_timeout
+
+class Waiter:
+    def __init__(self, name: str):
+        self.name = name
+        self.cancelled = False
+
+    def done(self) -> bool:
+        return self.cancelled
+
+def drain(queue: FairQueue):
+    order = []
+    waiter = queue.pop()
+    while waiter is not None:
+        order.append(waiter.name)
+        waiter = queue.pop()
+    return order
+
+def test_interactive_request_overtakes_a_bulk_backlog():
+    queue = FairQueue()
+    for index in range(20):
+        queue.push((BULK, "batch"), Waiter(f"bulk-{index}"))
+    queue.push((INTERACTIVE, "user"), Waiter("interactive"))
+    assert drain(queue).index("interactive") <= 1
+
+def test_tenants_share_a_class_by_weight():
+    queue = FairQueue(tenant_weights={"big": 3.0})
+    for index in range(8):
+        queue.push((BULK, "big"), Waiter("big"))
+        queue.push((BULK, "small"), Waiter("small"))
+    assert drain(queue)[:8].count("big") == 6
+
+def test_one_tenant_backlog_does_not_starve_a_newcomer():
+    queue = FairQueue()
+    for index in range(10):
+        queue.push((INTERACTIVE, "noisy"), Waiter("noisy"))
+    queue.pop()
+    queue.push((INTERACTIVE, "quiet"), Waiter("quiet"))
+    assert drain(queue).index("quiet") <= 1
+
+def test_waiters_that_gave_up_are_skipped_and_not_counted():
+    queue = FairQueue()
+    gone, waiting = Waiter("gone"), Waiter("waiting")
+    queue.push((INTERACTIVE, "a"), gone)
+    queue.push((BULK, "a"), waiting)
+    gone.cancelled = True
+    assert queue.queued() == {INTERACTIVE: 0, BULK: 1}
+    assert queue.pop() is waiting
+    assert not queue
+    assert queue.pop() is None
+
+def test_parse_priority_and_timeout():
+    assert parse_priority(" Bulk ") == BULK
+    assert parse_priority("urgent") == INTERACTIVE
+    assert parse_priority(None, default=BULK) == BULK
+    assert parse_timeout("2.5") == 2.5
+    assert parse_timeout("0") is None
+    assert parse_timeout("-1") is None
+    assert parse_timeout("soon") is None
+    assert parse_timeout(None) is None
@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+from app.cache.base import make_cache_key
+
+pytest.importorskip("numpy")
+
+from app.cache.semantic_cache import SemanticResponseCache, normalize_prompt
+from app.router.router import AIRouter
+from tests.fakes import FakeRepository
+
+SCOPE = make_cache_key("openai", "gpt", "", 64, {"temperature": "0"})
+OTHER_SCOPE = make_cache_key("openai", "gpt", "", 128, {"temperature": "0"})
+PROMPT = "What is the capital city of France?"
+
+def make_cache(**settings) -> SemanticResponseCache:
+    return SemanticResponseCache(**{"threshold": 0.9, "max_entries": 4, "audit_sample_rate": 0.0, **settings})
+
+def test_normalize_prompt_folds_case_width_and_whitespace():
+    assert normalize_prompt("  What  IS\tthe ＡＢＣ? ") == "what is the abc?"
+
+def test_near_duplicate_in_the_same_scope_hits():
+    cache = make_cache()
+    cache.add(SCOPE, PROMPT, "Paris")
+    hit = cache.lookup("openai", SCOPE, "what is the capital city of france ?")
+    assert hit is not None and hit.response == "Paris" and hit.similarity >= 0.9
+    assert cache.lookup("openai", OTHER_SCOPE, PROMPT) is None
+    assert cache.lookup("openai", SCOPE, "How do I bake sourdough bread at home?") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+def test_short_prompts_and_expired_entries_never_match():
+    cache = make_cache(ttl_seconds=0)
+    cache.add(SCOPE, PROMPT, "Paris")
+    assert cache.lookup("openai", SCOPE, PROMPT) is None
+    cache = make_cache(min_prompt_chars=16)
+    cache.add(SCOPE, "hi", "hello")
+    assert cache.lookup("openai", SCOPE, "hi") is None
+
+def test_index_is_a_bounded_ring():
+    cache = make_cache(max_entries=2)
+    for index in range(3):
+        cache.add(SCOPE, f"{PROMPT} variant number {index} of the question", f"answer {index}")
+    assert cache.stats()["entries"] == 2 and cache.stats()["evictions"] == 1
+
+def test_audit_mismatch_stops_serving_the_entry():
+    cache = make_cache(audit_sample_rate=1.0)
+    cache.add(SCOPE, PROMPT, "Paris is the capital of France.")
+    hit = cache.lookup("openai", SCOPE, PROMPT)
+    assert hit.audit
+    assert not cache.record_audit("openai", hit, PROMPT, "Bread needs flour, water, salt and a starter.")
+    assert cache.lookup("openai", SCOPE, PROMPT) is None
+    assert cache.stats()["audit_mismatches"] == 1
+
+def test_router_serves_near_duplicates_without_an_upstream_call():
+    async def scenario():
+        router = AIRouter()
+        router.semantic_cache = make_cache()
+        router.cache = None
+        repository = FakeRepository(response="Paris")
+        router.repositories = {name: repository for name in router.repositories}
+        first = await router.route_request("openai", PROMPT, parameters={"temperature": "0"})
+        second = await router.route_request("openai", "what is the capital city of FRANCE", parameters={"temperature": "0"})
+        sampled = await router.route_request("openai", PROMPT, parameters={"temperature": "0.9"})
+        return repository.calls, first, second, sampled
+
+    calls, first, second, sampled = asyncio.run(scenario())
+    assert calls == 2
+    assert not first.cached and second.cached and second.content == "Paris"
+    assert not sampled.cached
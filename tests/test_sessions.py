@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from app.exceptions import ConfigurationException
+from app.repositories.base import Message
+from app.router.router import AIRouter
+from app.router.sessions import SessionStore
+from app.router.tenants import current_tenant
+from tests.fakes import FakeRepository
+
+def test_history_marks_the_last_turn_as_cacheable():
+    async def scenario():
+        store = SessionStore()
+        async with store.turn("acme", "s1") as session:
+            store.append(session, [Message("user", "hi"), Message("assistant", "hello")])
+        async with store.turn("acme", "s1") as session:
+            return session.history()
+
+    history = asyncio.run(scenario())
+    assert [message.content for message in history] == ["hi", "hello"]
+    assert [message.cache_breakpoint for message in history] == [False, True]
+
+def test_truncation_keeps_system_messages_and_the_latest_question():
+    async def scenario():
+        store = SessionStore(max_history_tokens=100, truncate_to=0.5)
+        async with store.turn("acme", "s1") as session:
+            turns = [Message("system", "be brief")]
+            for index in range(6):
+                turns += [Message("user", f"question {index} " * 4), Message("assistant", f"answer {index} " * 4)]
+            store.append(session, turns + [Message("user", "last question")])
+            return session
+
+    session = asyncio.run(scenario())
+    assert session.truncations >= 1
+    assert session.total_tokens <= 50
+    assert session.total_tokens == sum(session.tokens)
+    assert session.messages[0].role == "system"
+    assert session.messages[1].role == "user"
+    assert session.messages[-1].content == "last question"
+
+def test_sessions_are_evicted_least_recently_used_but_not_mid_turn():
+    async def scenario():
+        store = SessionStore(max_sessions=2)
+        async with store.turn("acme", "busy"):
+            async with store.turn("acme", "idle"):
+                pass
+            async with store.turn("acme", "new"):
+                pass
+        return store
+
+    store = asyncio.run(scenario())
+    assert set(key for _, key in store._sessions) == {"busy", "new"}
+    assert store.stats()["evictions"] == 1
+
+def test_idle_sessions_expire():
+    async def scenario():
+        store = SessionStore(ttl_seconds=10)
+        async with store.turn("acme", "s1") as session:
+            store.append(session, [Message("user", "hi")])
+        session.updated_at -= 100
+        async with store.turn("acme", "s1") as session:
+            return store, session.messages
+
+    store, messages = asyncio.run(scenario())
+    assert messages == []
+    assert store.expirations == 1
+
+def test_truncate_to_must_be_a_fraction():
+    with pytest.raises(ConfigurationException):
+        SessionStore(truncate_to=0)
+
+def make_router(repository) -> AIRouter:
+    router = AIRouter()
+    router.admission.enabled = False
+    router.cache = None
+    router.repositories = {name: repository for name in router.repositories}
+    return router
+
+def test_router_sends_the_stored_history_with_each_turn():
+    async def scenario():
+        repository = FakeRepository(response="noted")
+        router = make_router(repository)
+        await router.route_request("openai", "my name is Ada", session_id="s1")
+        await router.route_request("openai", "what is my name?", session_id="s1")
+        current_tenant.set("other")
+        await router.route_request("openai", "what is my name?", session_id="s1")
+        return repository.messages
+
+    first, second, other_tenant = asyncio.run(scenario())
+    assert [message.content for message in first] == ["my name is Ada"]
+    assert [message.content for message in second] == ["my name is Ada", "noted", "what is my name?"]
+    assert [message.content for message in other_tenant] == ["what is my name?"]
+
+def test_streamed_turn_is_stored_only_when_it_completes():
+    async def scenario():
+        repository = FakeRepository(chunks=3)
+        router = make_router(repository)
+        stream = router.stream_request("openai", "abandoned", session_id="s1")
+        await stream.__anext__()
+        await stream.aclose()
+        async for _ in router.stream_request("openai", "finished", session_id="s1"):
+            pass
+        async for _ in router.stream_request("openai", "next", session_id="s1"):
+            pass
+        return repository.messages
+
+    messages = asyncio.run(scenario())
+    assert [message.content for message in messages[1]] == ["finished"]
+    assert [message.content for message in messages[2]] == ["finished", "token-0 token-1 token-2 ", "next"]
@@ -0,0 +1,56 @@
+import asyncio
+from app.exceptions import AIGenerationException
+from app.router.router import AIRouter
+from app.router.routing import LatencyAwareSelector, RouteResult
+from app.router.scheduler import BULK, current_priority
+from tests.fakes import FakeRepository
+
+def make_router(openai: FakeRepository, anthropic: FakeRepository) -> AIRouter:
+    router = AIRouter()
+    router.admission.enabled = False
+    router.cache = None
+    router.max_retries = 0
+    router.routing = LatencyAwareSelector({
+        "groups": {"auto": [{"provider": "openai", "model": "first"}, {"provider": "anthropic", "model": "second"}]},
+        "explore_ratio": 0,
+        "speculative_streaming": {"enabled": True, "candidates": 2, "priorities": ["interactive"]},
+    }, ["openai", "anthropic"])
+    router.repositories = {**router.repositories, "openai": openai, "anthropic": anthropic}
+    return router
+
+async def read(router: AIRouter, result: RouteResult) -> str:
+    return "".join([chunk async for chunk in router.stream_request("auto", "hello", result=result)])
+
+def test_first_candidate_to_send_text_wins_and_the_other_is_closed():
+    async def scenario():
+        slow, fast = FakeRepository(chunks=5, delay=0.05), FakeRepository(chunks=3)
+        router = make_router(slow, fast)
+        result = RouteResult()
+        text = await read(router, result)
+        return text, result, slow.produced, router.speculative_streams
+
+    text, result, slow_produced, races = asyncio.run(scenario())
+    assert text == "token-0 token-1 token-2 "
+    assert (result.provider, result.model) == ("anthropic", "second")
+    assert result.usage is not None
+    assert slow_produced == 0
+    assert races == 1
+
+def test_failed_racer_does_not_stop_the_race():
+    async def scenario():
+        router = make_router(FakeRepository(chunks=0, error=AIGenerationException("down")), FakeRepository(chunks=2, delay=0.01))
+        result = RouteResult()
+        return await read(router, result), result.provider
+
+    assert asyncio.run(scenario()) == ("token-0 token-1 ", "anthropic")
+
+def test_priorities_outside_the_race_stream_from_one_candidate():
+    async def scenario():
+        current_priority.set(BULK)
+        first, second = FakeRepository(chunks=2, delay=0.05), FakeRepository(chunks=2)
+        router = make_router(first, second)
+        result = RouteResult()
+        text = await read(router, result)
+        return text, result.provider, second.calls, router.speculative_streams
+
+    assert asyncio.run(scenario()) == ("token-0 token-1 ", "openai", 0, 0)
@@ -0,0 +1,89 @@
+import asyncio
+import json
+from fastapi.testclient import TestClient
+from app import http_gateway
+from app.router.router import AIRouter
+from app.sse import ReplayStore, encode_event
+from app.transports import InProcessTransport
+from tests.fakes import FakeRepository
+
+def test_single_line_event_is_one_data_field():
+    assert encode_event("hello") == b"data: hello\n\n"
+    assert encode_event("hello", event_id=b"s-3") == b"id: s-3\ndata: hello\n\n"
+
+def test_newlines_in_data_become_separate_data_fields():
+    assert encode_event("a\nb\r\nc") == b"data: a\ndata: b\ndata: c\n\n"
+    assert encode_event("{}", b"usage", b"s-0") == b"id: s-0\nevent: usage\ndata: {}\n\n"
+
+async def numbered(count: int):
+    for index in range(count):
+        yield None, str(index)
+        await asyncio.sleep(0)
+
+async def collect(frames) -> bytes:
+    return b"".join([frame async for frame in frames])
+
+def test_replay_log_resumes_after_the_last_event_id():
+    async def scenario():
+        store = ReplayStore({"replay_events": 8})
+        log = store.start("acme", numbered(5))
+        first = await collect(log.follow())
+        found = store.find("acme", f"{log.stream_id}-2")
+        resumed = await collect(found[0].follow(found[1]))
+        return log.stream_id, first, resumed, store
+
+    stream_id, first, resumed, store = asyncio.run(scenario())
+    assert first.count(b"data: ") == 5
+    assert first.startswith(f"id: {stream_id}-0\ndata: 0\n\n".encode())
+    assert resumed == f"id: {stream_id}-3\ndata: 3\n\nid: {stream_id}-4\ndata: 4\n\n".encode()
+
+def test_streams_of_other_tenants_or_unknown_events_cannot_be_resumed():
+    async def scenario():
+        store = ReplayStore({"replay_events": 8})
+        log = store.start("acme", numbered(3))
+        await collect(log.follow())
+        return store, log.stream_id
+
+    store, stream_id = asyncio.run(scenario())
+    assert store.find("acme", f"{stream_id}-1") is not None
+    assert store.find("intruder", f"{stream_id}-1") is None
+    assert store.find("acme", f"{stream_id}-7") is None
+    assert store.find("acme", "unknown-1") is None
+
+def test_producer_waits_for_unsent_events_instead_of_dropping_them():
+    async def scenario():
+        store = ReplayStore({"replay_events": 4})
+        log = store.start("acme", numbered(20))
+        await asyncio.sleep(0.01)
+        produced_before_reading = log.next_sequence
+        frames = await collect(log.follow())
+        return produced_before_reading, frames
+
+    produced_before_reading, frames = asyncio.run(scenario())
+    assert produced_before_reading == 4
+    assert [int(line[6:]) for line in frames.split(b"\n") if line.startswith(b"data: ")] == list(range(20))
+
+def parse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n") if not line.startswith(":"))
+        events.append(fields)
+    return events
+
+def test_stream_endpoint_frames_tokens_usage_and_errors(monkeypatch):
+    router = AIRouter()
+    router.admission.enabled = False
+    router.repositories = {name: FakeRepository(chunks=3) for name in router.repositories}
+    monkeypatch.setattr(http_gateway, "transport", InProcessTransport(router))
+    with TestClient(http_gateway.app) as client:
+        events = parse_events(client.post("/stream", json={"provider": "openai", "prompt": "hello", "bypass_cache": True}).text)
+        assert "".join(event["data"] for event in events if "event" not in event) == "token-0 token-1 token-2 "
+        assert json.loads(events[-1]["data"])["completion_tokens"] > 0 and events[-1]["event"] == "usage"
+
+        resumed = client.post("/stream", headers={"last-event-id": events[0]["id"]}).text
+        assert [event["id"] for event in parse_events(resumed)] == [event["id"] for event in events[1:]]
+        assert client.post("/stream", headers={"last-event-id": "gone-0"}).status_code == 404
+
+        error = parse_events(client.post("/stream", json={"provider": "nope", "prompt": "hello"}).text)[-1]
+        assert error["event"] == "error"
+        assert json.loads(error["data"])["status_code"] == 400
@@ -0,0 +1,33 @@
+import grpc
+import pytest
+from fastapi.testclient import TestClient
+from app import http_gateway
+from app.exceptions import (AIGenerationException, AdmissionTimeoutException, InvalidRequestException, ModelNotFoundException,
+                            ProviderNotFoundException, RateLimitedException)
+from app.router.router import AIRouter
+from app.status_codes import grpc_status_for, http_status_for
+from app.transports import InProcessTransport
+from tests.fakes import FakeRepository
+
+@pytest.mark.parametrize("error, grpc_code, http_code", [
+    (ProviderNotFoundException("Unsupported provider: nope"), grpc.StatusCode.INVALID_ARGUMENT, 400),
+    (ModelNotFoundException("No default model"), grpc.StatusCode.INVALID_ARGUMENT, 400),
+    (InvalidRequestException("bad role"), grpc.StatusCode.INVALID_ARGUMENT, 400),
+    (RateLimitedException("429 from provider"), grpc.StatusCode.RESOURCE_EXHAUSTED, 429),
+    (AdmissionTimeoutException("queue timeout"), grpc.StatusCode.RESOURCE_EXHAUSTED, 429),
+    (AIGenerationException("provider failed"), grpc.StatusCode.INTERNAL, 500),
+])
+def test_router_exceptions_map_to_grpc_and_http_statuses(error, grpc_code, http_code):
+    assert grpc_status_for(error) == grpc_code
+    assert http_status_for(error) == http_code
+
+def test_unknown_provider_is_a_bad_request_in_process(monkeypatch):
+    router = AIRouter()
+    router.repositories = {name: FakeRepository() for name in router.repositories}
+    monkeypatch.setattr(http_gateway, "transport", InProcessTransport(router))
+    with TestClient(http_gateway.app) as client:
+        response = client.post("/generate", json={"provider": "nope", "prompt": "hello"})
+        assert response.status_code == 400
+        response = client.post("/generate_batch", json={"requests": [{"provider": "nope", "prompt": "hello"}]})
+        assert response.status_code == 200
+        assert response.json()["results"][0]["status_code"] == 400
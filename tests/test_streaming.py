@@ -0,0 +1,59 @@
+import asyncio
+from app.router.router import AIRouter
+from app.streaming import StreamSettings, coalesce_chunks
+from tests.fakes import FakeRepository
+from typing import Optional
+
+def test_slow_client_pauses_the_provider_stream():
+    async def scenario():
+        router = AIRouter()
+        repository = FakeRepository(500)
+        router.repositories = {name: repository for name in router.repositories}
+        router.coalescing_enabled = True
+        router.stream_coalescer.buffer_size = 32
+        settings = StreamSettings({"flush_size": 64, "flush_interval_ms": 1, "max_pending_chunks": 8})
+        received = 0
+        max_read_ahead = 0
+        async for frame in coalesce_chunks(router.stream_request("openai", "hello", parameters={"temperature": "0"}), settings):
+            received += frame.count("token-")
+            max_read_ahead = max(max_read_ahead, repository.produced - received)
+            await asyncio.sleep(0.0005)
+        return router, received, max_read_ahead
+
+    router, received, max_read_ahead = asyncio.run(scenario())
+    assert received == 500
+    assert router.stream_coalescer.stats()["dropped_subscribers"] == 0
+    assert max_read_ahead <= 32 + 8 + 8
+
+async def tokens(count: int, error: Optional[Exception] = None):
+    for index in range(count):
+        yield f"t{index} "
+    if error is not None:
+        raise error
+
+async def frames_of(stream, settings: StreamSettings):
+    return [frame async for frame in coalesce_chunks(stream, settings)]
+
+def test_first_chunk_is_sent_alone_and_the_rest_are_merged():
+    settings = StreamSettings({"flush_size": 12, "flush_interval_ms": 50})
+    frames = asyncio.run(frames_of(tokens(10), settings))
+    assert frames[0] == "t0 "
+    assert "".join(frames) == "".join(f"t{index} " for index in range(10))
+    assert len(frames) < 10
+    assert all(len(frame) < 12 + 3 for frame in frames)
+
+def test_upstream_error_is_raised_after_the_chunks_before_it():
+    async def scenario():
+        received = []
+        try:
+            async for frame in coalesce_chunks(tokens(3, RuntimeError("upstream broke")), StreamSettings({})):
+                received.append(frame)
+        except RuntimeError as e:
+            return "".join(received), str(e)
+
+    assert asyncio.run(scenario()) == ("t0 t1 t2 ", "upstream broke")
+
+def test_coalescing_can_be_turned_off():
+    settings = StreamSettings({"flush_size": 0})
+    assert not settings.enabled
+    assert asyncio.run(frames_of(tokens(4), settings)) == ["t0 ", "t1 ", "t2 ", "t3 "]
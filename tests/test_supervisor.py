@@ -0,0 +1,51 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from app.supervisor import WorkerSupervisor, bind_socket
+
+def sleep_forever() -> None:
+    signal.signal(signal.SIGTERM, lambda signum, frame: os._exit(0))
+    while True:
+        time.sleep(1)
+
+def ignore_sigterm(ready) -> None:
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    ready.set()
+    while True:
+        time.sleep(1)
+
+def test_shared_socket_is_listening_and_inheritable():
+    sock = bind_socket("127.0.0.1", 0)
+    try:
+        assert sock.get_inheritable()
+        client = socket.create_connection(sock.getsockname(), timeout=1)
+        client.close()
+    finally:
+        sock.close()
+
+def test_dead_worker_is_restarted_and_all_are_stopped():
+    supervisor = WorkerSupervisor(sleep_forever, (), 2, shutdown_timeout=5, min_uptime=0)
+    try:
+        for index in range(2):
+            supervisor._start_worker(index)
+        first = supervisor._processes[0]
+        first.kill()
+        first.join()
+        supervisor._supervise()
+        replacement = supervisor._processes[0]
+        assert replacement is not None and replacement.pid != first.pid and replacement.is_alive()
+    finally:
+        supervisor._shutdown()
+    assert all(not process.is_alive() for process in supervisor._processes)
+
+def test_worker_that_ignores_sigterm_is_killed_after_the_timeout():
+    ready = multiprocessing.get_context("spawn").Event()
+    supervisor = WorkerSupervisor(ignore_sigterm, (ready,), 1, shutdown_timeout=0.5)
+    supervisor._start_worker(0)
+    assert ready.wait(30)
+    started_at = time.monotonic()
+    supervisor._shutdown()
+    assert time.monotonic() - started_at < 5
+    assert supervisor._processes[0].exitcode == -signal.SIGKILL
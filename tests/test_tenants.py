@@ -0,0 +1,50 @@
+import asyncio
+from app.router.router import AIRouter
+from app.router.tenants import current_tenant
+from tests.fakes import FakeRepository
+
+DETERMINISTIC = {"temperature": "0"}
+
+def make_router(repository) -> AIRouter:
+    router = AIRouter()
+    router.admission.enabled = False
+    router.cache = None
+    router.coalescing_enabled = True
+    router.repositories = {name: repository for name in router.repositories}
+    return router
+
+def test_requests_of_different_tenants_are_not_coalesced():
+    async def call(router, tenant):
+        current_tenant.set(tenant)
+        return await router.route_request("openai", "hello", parameters=DETERMINISTIC)
+
+    async def scenario():
+        repository = FakeRepository(chunks=20, delay=0.01)
+        router = make_router(repository)
+        await asyncio.gather(call(router, "tenant-a"), call(router, "tenant-b"), call(router, "tenant-a"))
+        return repository.calls, router.budgets.stats()["tenants"]
+
+    calls, tenants = asyncio.run(scenario())
+    assert calls == 2
+    assert tenants["tenant-a"]["requests"] == 1
+    assert tenants["tenant-b"]["requests"] == 1
+
+def test_coalesced_stream_is_charged_when_its_starter_leaves_early():
+    async def scenario():
+        repository = FakeRepository(chunks=20, delay=0.01)
+        router = make_router(repository)
+        starter = router.stream_request("openai", "hello", parameters=DETERMINISTIC)
+        await starter.__anext__()
+        follower = asyncio.ensure_future(read_all(router.stream_request("openai", "hello", parameters=DETERMINISTIC)))
+        await asyncio.sleep(0.02)
+        await starter.aclose()
+        chunks = await follower
+        return chunks, router.budgets.stats()["tenants"]
+
+    async def read_all(stream):
+        return [chunk async for chunk in stream]
+
+    chunks, tenants = asyncio.run(scenario())
+    assert chunks
+    assert tenants["default"]["requests"] == 1
+    assert tenants["default"]["completion_tokens"] > 0
@@ -0,0 +1,62 @@
+import pytest
+from app.exceptions import TokenBudgetExceededException
+from app.repositories.base import Message, Usage
+from app.router.tenants import TenantBudgets
+from app.router.tokens import MESSAGE_OVERHEAD_TOKENS, estimate_prompt_tokens, estimate_text_tokens
+
+def test_estimate_is_at_least_four_characters_per_token():
+    assert estimate_text_tokens("") == 0
+    assert estimate_text_tokens("a" * 40) == 10
+
+def test_estimate_counts_words_and_symbols_in_code():
+    code = "f(x)=x*2;"
+    assert estimate_text_tokens(code) == 1 + 5
+
+def test_estimate_counts_wide_characters_individually():
+    assert estimate_text_tokens("日本語のテキスト") >= 8
+    assert estimate_text_tokens("안녕하세요") >= 5
+
+def test_prompt_estimate_uses_messages_when_given():
+    messages = [Message("system", "be brief"), Message("user", "hello there")]
+    expected = sum(estimate_text_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+    assert estimate_prompt_tokens("ignored prompt", messages) == expected
+    assert estimate_prompt_tokens("hello there") == estimate_text_tokens("hello there")
+
+def make_budgets(**overrides) -> TenantBudgets:
+    budget_config = {"enabled": True, "tokens_per_second": 10, "burst_seconds": 10, "min_max_tokens": 16}
+    budget_config.update(overrides)
+    return TenantBudgets(budget_config)
+
+def test_request_that_fits_keeps_its_max_tokens():
+    reservation = make_budgets().reserve("acme", 20, 50)
+    assert reservation.max_tokens == 50
+    assert reservation.reserved == 70
+
+def test_request_over_budget_is_clipped_to_what_is_left():
+    budgets = make_budgets()
+    reservation = budgets.reserve("acme", 20, 500)
+    assert 16 <= reservation.max_tokens <= 80
+    assert budgets.stats()["tenants"]["acme"]["clipped"] == 1
+
+def test_request_is_rejected_when_clipping_leaves_too_little():
+    budgets = make_budgets()
+    with pytest.raises(TokenBudgetExceededException):
+        budgets.reserve("acme", 95, 500)
+    assert budgets.stats()["tenants"]["acme"]["rejected"] == 1
+
+def test_reject_mode_never_clips():
+    with pytest.raises(TokenBudgetExceededException):
+        make_budgets(over_budget="reject").reserve("acme", 20, 500)
+
+def test_settle_refunds_what_was_not_used():
+    budgets = make_budgets()
+    reservation = budgets.reserve("acme", 20, 60)
+    budgets.settle(reservation, Usage(prompt_tokens=20, completion_tokens=10), "openai")
+    assert budgets.stats()["tenants"]["acme"]["budget_available"] >= 70
+    budgets.settle(reservation, Usage(prompt_tokens=20, completion_tokens=10), "openai")
+    assert budgets.stats()["tenants"]["acme"]["requests"] == 1
+
+def test_tenant_overrides_and_disabled_budgets():
+    budgets = make_budgets(tenants={"big": {"tokens_per_second": 1000}})
+    assert budgets.reserve("big", 20, 5000).max_tokens == 5000
+    assert TenantBudgets({"enabled": False}).reserve("acme", 10**6, 10**6).bucket is None
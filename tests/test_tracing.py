@@ -0,0 +1,37 @@
+from app.tracing import TRACEPARENT_HEADER, InMemorySpanExporter, Tracer, inject
+
+def make_tracer(sample_ratio: float) -> Tracer:
+    return Tracer({"enabled": True, "exporter": "memory", "sample_ratio": sample_ratio})
+
+def test_unsampled_traces_get_their_own_ids():
+    tracer = make_tracer(0.0)
+    first = tracer.start_span("gateway")
+    second = tracer.start_span("gateway")
+    assert not first.recording and not second.recording
+    assert first.trace_id != second.trace_id
+    assert first.traceparent.endswith("-00")
+
+def test_children_of_unsampled_trace_propagate_its_context():
+    tracer = make_tracer(0.0)
+    with tracer.span("gateway") as root:
+        child = tracer.start_span("router")
+        assert child is root
+        assert inject() == ((TRACEPARENT_HEADER, root.traceparent),)
+
+def test_sampled_trace_is_exported_with_parent_links():
+    tracer = make_tracer(1.0)
+    root = tracer.start_span("gateway")
+    child = tracer.start_span("router", parent=root)
+    tracer.end(child)
+    tracer.end(root)
+    spans = tracer.exporter.trace(root.trace_id)
+    assert isinstance(tracer.exporter, InMemorySpanExporter)
+    assert [span.name for span in spans] == ["gateway", "router"]
+    assert child.parent_id == root.span_id
+
+def test_remote_traceparent_decides_sampling():
+    tracer = make_tracer(0.0)
+    sampled = tracer.start_span("server", traceparent=f"00-{'a' * 32}-{'b' * 16}-01")
+    unsampled = tracer.start_span("server", traceparent=f"00-{'c' * 32}-{'d' * 16}-00")
+    assert sampled.recording and sampled.trace_id == "a" * 32 and sampled.parent_id == "b" * 16
+    assert not unsampled.recording and unsampled.trace_id == "c" * 32
@@ -0,0 +1,56 @@
+import asyncio
+import grpc
+from app import ai_router_pb2_grpc
+from app.grpc_pool import GrpcChannelPool
+from app.grpc_server import AIRouterServicer
+from app.router.router import AIRouter
+from app.router.routing import RouteResult
+from app.router.tenants import current_tenant
+from app.schemas import AIRequest, BatchRequest
+from app.transports import GrpcTransport, InProcessTransport
+from tests.fakes import FakeRepository
+
+async def exercise(transport):
+    current_tenant.set("acme")
+    request = AIRequest(provider="openai", prompt="hello", bypass_cache=True)
+    generated = await transport.generate(request)
+    route = RouteResult()
+    streamed = "".join([chunk async for chunk in transport.stream(request, route)])
+    batch = await transport.generate_batch(BatchRequest(requests=[request, AIRequest(provider="nope", prompt="hello")]))
+    return generated, streamed, route.usage, batch
+
+def make_router() -> AIRouter:
+    router = AIRouter()
+    router.admission.enabled = False
+    router.repositories = {name: FakeRepository(chunks=3) for name in router.repositories}
+    return router
+
+def test_in_process_and_grpc_transports_answer_alike():
+    async def over_grpc():
+        router = make_router()
+        server = grpc.aio.server()
+        ai_router_pb2_grpc.add_AIRouterServicer_to_server(AIRouterServicer(router), server)
+        port = server.add_insecure_port("127.0.0.1:0")
+        await server.start()
+        transport = GrpcTransport(GrpcChannelPool(f"127.0.0.1:{port}", 1))
+        await transport.start()
+        try:
+            return await exercise(transport), router.budgets.stats()["tenants"]
+        finally:
+            await transport.close()
+            await server.stop(None)
+
+    async def in_process():
+        router = make_router()
+        return await exercise(InProcessTransport(router)), router.budgets.stats()["tenants"]
+
+    grpc_outcome, grpc_tenants = asyncio.run(over_grpc())
+    in_process_outcome, in_process_tenants = asyncio.run(in_process())
+    assert grpc_outcome == in_process_outcome
+    generated, streamed, usage, batch = in_process_outcome
+    assert generated["content"] == "hello" and generated["provider"] == "openai"
+    assert streamed == "token-0 token-1 token-2 "
+    assert usage is not None and usage.completion_tokens > 0
+    assert batch[0]["content"] == "hello"
+    assert batch[1]["status_code"] == 400
+    assert grpc_tenants["acme"]["requests"] == in_process_tenants["acme"]["requests"] == 3